@@ -126,7 +126,7 @@ setup(
     # pip to create the appropriate form of executable for the target platform.
     entry_points={
         'console_scripts': [
-            'sample=sample:main',
+            'simple-nlp=simple_nlp.cli:main',
         ],
     },
 )
\ No newline at end of file
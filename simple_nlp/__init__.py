@@ -7,23 +7,52 @@ from __future__ import print_function
 
 __author__ = 'ronny'
 
-import nltk
+import importlib
+import re
 
-#TODO: Check that "maxent_treebank_pos_tagger" is installed, if not then:
-#      nltk.download("maxent_treebank_pos_tagger")
-#      this is required for POS tagging.
+from simple_nlp import profiling
+from simple_nlp.cache import LRUCache, ResultCache
+from simple_nlp.compact import (CompactDocument, TagVocabulary,
+                                _first_token, _nesting_level)
+
+
+# ==============================================================================
+#                                                                    LAZY IMPORT
+# ==============================================================================
+class _LazyModule(object):
+    """
+    Stand-in for a module that only gets imported the first time that one of
+    its attributes is used. At that point it replaces itself with the real
+    module in the namespace it was assigned to, so later uses cost nothing
+    extra.
+    """
+    def __init__(self, name, namespace):
+        self._name = name
+        self._namespace = namespace
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        self._namespace[self._name] = module
+        return getattr(module, attr)
+
+
+# nltk takes a while to import, so it is not imported until it is needed.
+nltk = _LazyModule("nltk", globals())
 
 # ==============================================================================
 #                                                                       TOKENIZE
 # ==============================================================================
-def tokenize(text, levels_out=1):
+def tokenize(text, levels_out=1, lazy=False, compact=False, engine="nltk",
+             spans=False):
     """
     Takes a string of text, and returns a list of tokenized words.
 
     You can chose to have the tokenized words nested at different levels if you
     wish to group by sentences (levels_out=2), or paragraphs (levels_out=3).
 
-    :param text: (string) The input string that you want to tokenize
+    :param text: (string) The input string that you want to tokenize. If
+                 lazy=True, then this can also be a file object, or any other
+                 iterable of lines of text.
     :param levels_out: (int) nesting level of the word tokens.
                        (1) if you want a single list of all word tokens.
                            (Default)
@@ -33,40 +62,347 @@ def tokenize(text, levels_out=1):
                        (3) if you want it split up into a list of paragraphs,
                            where paragraphs are lists of sentences, which are
                            lists of word tokens.
+    :param lazy: (boolean) If True, then instead of returning a list, it
+                 returns a generator that reads the text one line at a time,
+                 and yields one sentence (levels_out=2) or one paragraph
+                 (levels_out=3) at a time. This keeps memory use proportional
+                 to a single paragraph, no matter how big the text is. Each
+                 line is treated as a paragraph, so sentences never span
+                 across lines. Only levels_out=2 and levels_out=3 are
+                 supported in lazy mode.
+    :param compact: (boolean) If True, then it returns a CompactDocument,
+                 which stores the tokens in flat arrays, using much less memory
+                 than nested lists, but still behaves like the nested list
+                 would. It can be passed on to pos_tag() as is.
+    :param engine: (str) The tokenizer engine to use.
+                 "nltk" (Default) uses nltk.sent_tokenize and
+                     nltk.word_tokenize.
+                 "fast" uses the same punkt sentence splitter and treebank
+                     word tokenizer that nltk does, but calls them directly,
+                     splitting each piece of text into sentences only once.
+                     nltk.word_tokenize splits its input into sentences
+                     again, so the default engine splits every sentence
+                     twice. The tokens are the same as with the default
+                     engine, apart from rare cases where punkt would split an
+                     already split sentence differently the second time
+                     around. See TOKENIZER_ENGINES
+    :param spans: (boolean) If True, then each token is returned as a
+                 SpanToken, a string that also has the *start* and *end*
+                 character offsets of the token in the text as attributes, ie
+                 text[token.start:token.end] is the token. (Quotes are the
+                 exception, since nltk turns " into `` or '', but their
+                 offsets still point to the original quote characters).
+                 SpanTokens behave just like ordinary strings, and pos_tag(),
+                 chunk() and named_entities() keep them in their output, so
+                 the offsets stay attached to each token. When lazy=True, the
+                 offsets count from the start of the first line.
     :return: Depending on the value of levels used, it returns a list of
              strings,or a list of list of strings, or a list of list of list of
-             strings.
+             strings. If lazy=True, then it returns a generator of the
+             elements of that list instead.
+
+    :examples:
+        # Tokenize, tag and chunk a large file, one paragraph at a time
+        with open("big_file.txt") as f:
+            paragraphs = tokenize(f, levels_out=3, lazy=True)
+            for chunked_paragraph in chunk(pos_tag(paragraphs)):
+                ...
+
+        # Keep track of where each token came from
+        tokens = tokenize("Hello world. Bye.", levels_out=2, spans=True)
+        # [[SpanToken('Hello', 0, 5), SpanToken('world', 6, 11),
+        #   SpanToken('.', 11, 12)],
+        #  [SpanToken('Bye', 13, 16), SpanToken('.', 16, 17)]]
+        word, tag = pos_tag(tokens)[0][1]
+        word.start, word.end    # (6, 11)
     """
-    assert isinstance(text, str), \
-        "Argument *text* in tokenize() must be a string"
     assert isinstance(levels_out, int), \
         "Argument *levels_out* in tokenize() must be an integer"
     assert (levels_out >=1) and (levels_out <=3), \
         "Argument *levels_out* in tokenize() can only take the values 1, 2 or 3"
+    assert engine in TOKENIZER_ENGINES, \
+        "Argument *engine* in tokenize() can only take the values " \
+        "'nltk' or 'fast'"
+    if lazy:
+        assert (levels_out == 2) or (levels_out == 3), \
+            "Argument *levels_out* in tokenize() can only take the values 2 " \
+            "or 3 when lazy=True"
+        if isinstance(text, str):
+            text = text.split("\n")
+        assert not compact, \
+            "Arguments *lazy* and *compact* in tokenize() cannot both be True"
+        return _iter_tokenize(text, levels_out, engine, spans)
+
+    assert isinstance(text, str), \
+        "Argument *text* in tokenize() must be a string"
+
+    if compact:
+        assert not spans, \
+            "Arguments *compact* and *spans* in tokenize() cannot both be True"
+        if (levels_out == 1):
+            paragraphs = [[_tokenize_words(text, engine)]]
+        elif (levels_out == 2):
+            paragraphs = [tokenize(text, levels_out=2, engine=engine)]
+        else:
+            paragraphs = _iter_tokenize(text.split("\n"), 3, engine)
+        return CompactDocument.from_paragraphs(paragraphs, levels=levels_out)
 
     if (levels_out == 1):
-        return(nltk.word_tokenize(text))
+        tokens = _tokenize_words(text, engine)
+        return(_with_spans(tokens, text) if spans else tokens)
     if (levels_out == 2):
-        sentences = nltk.sent_tokenize(text)
-        return([nltk.word_tokenize(sentence) for sentence in sentences])
+        return(_tokenize_sentences(text, engine, spans))
     if (levels_out == 3):
-        paragraphs = text.split("\n")
+        # Each line is a paragraph, handled the same way as in lazy mode
+        return(list(_iter_tokenize(text.split("\n"), 3, engine, spans)))
+
+
+def _iter_tokenize(lines, levels_out, engine="nltk", spans=False):
+    """
+    Generator used by tokenize() when lazy=True. Takes an iterable of lines,
+    and yields tokenized sentences (levels_out=2) or tokenized paragraphs
+    (levels_out=3), one line at a time.
+    """
+    offset = 0      # Character offset of the current line
+    for line in lines:
+        line_offset = offset
+        # Lines from files end in a newline, lines from str.split() do not
+        offset += len(line) if line.endswith("\n") else len(line) + 1
+        line = line.rstrip("\n")
+
+        # Skip blank lines
+        if line == "":
+            continue
+
+        sentences = _tokenize_sentences(line, engine, spans, line_offset)
+        if levels_out == 2:
+            for sentence in sentences:
+                yield sentence
+        else:
+            yield sentences
+
+
+def _tokenize_sentences(text, engine="nltk", spans=False, offset=0):
+    """
+    Splits text into sentences, and returns a list of the tokens in each one.
+    If spans=True, then the tokens are SpanTokens, with the character offsets
+    counted from *offset*.
+    """
+    sentences = _sent_tokenize(text, engine)
+    if not spans:
+        return [_word_tokenize(sentence, engine) for sentence in sentences]
+
+    tokenized = []
+    point = 0
+    for sentence in sentences:
+        start = text.find(sentence, point)
+        if start < 0:
+            raise ValueError("Could not find the sentence {0!r} in the text "
+                             "when working out its character offsets"
+                             "".format(sentence))
+        point = start + len(sentence)
+        tokenized.append(_with_spans(_word_tokenize(sentence, engine),
+                                     sentence, offset + start))
+    return tokenized
+
+
+def _tokenize_words(text, engine="nltk"):
+    """ Splits a whole text into a single list of word token strings. """
+    if engine == "nltk":
+        return _word_tokenize(text, engine)
+    return [token for sentence in _sent_tokenize(text, engine)
+            for token in _word_tokenize(sentence, engine)]
+
+
+def _sent_tokenize(text, engine="nltk"):
+    """ Splits text into a list of sentence strings. """
+    split = nltk.sent_tokenize if engine == "nltk" \
+            else _get_fast_tokenizer()[0]
+    return profiling.timed_call("sent_tokenize", profiling.count_nothing,
+                                split, text)
+
+
+def _word_tokenize(text, engine="nltk"):
+    """
+    Splits text into a list of word token strings. With the "fast" engine,
+    the text must be a single sentence.
+    """
+    split = nltk.word_tokenize if engine == "nltk" \
+            else _get_fast_tokenizer()[1]
+    if not profiling.enabled():
+        return split(text)
+    start = profiling.timer()
+    tokens = split(text)
+    profiling.record("word_tokenize", profiling.timer() - start, len(tokens))
+    return tokens
+
+
+def _is_stream(x):
+    """
+    Returns True if x is a lazy stream of elements (eg a generator or a file
+    object), as opposed to a list or a string.
+    """
+    return (not isinstance(x, (list, tuple, str))) and hasattr(x, "__iter__")
+
+
+# ==============================================================================
+#                                                              TOKENIZER ENGINES
+# ==============================================================================
+# The values that the *engine* argument of tokenize() can take.
+TOKENIZER_ENGINES = ("nltk", "fast")
+
+# (sentence splitting function, word splitting function) used by the "fast"
+# engine. Created on first use.
+_fast_tokenizer = None
+
+
+def _get_fast_tokenizer():
+    """
+    Returns the sentence and word splitting functions used by the "fast"
+    tokenizer engine. These are the same punkt sentence tokenizer and
+    (precompiled, regular expression based) treebank word tokenizer that
+    nltk.sent_tokenize and nltk.word_tokenize use, but loaded only once, and
+    called directly.
+    """
+    global _fast_tokenizer
+    if _fast_tokenizer is None:
+        tokenize_module = nltk.tokenize
+        if hasattr(tokenize_module, "_get_punkt_tokenizer"):
+            punkt = tokenize_module._get_punkt_tokenizer("english")
+        else:
+            # Older versions of nltk
+            punkt = nltk.data.load("tokenizers/punkt/english.pickle")
+        treebank = getattr(tokenize_module, "_treebank_word_tokenizer", None)
+        if treebank is None:
+            treebank = tokenize_module.TreebankWordTokenizer()
+        _fast_tokenizer = (punkt.tokenize, treebank.tokenize)
+    return _fast_tokenizer
+
+
+# ==============================================================================
+#                                                                CHARACTER SPANS
+# ==============================================================================
+class SpanToken(str):
+    """
+    A token string that also remembers where it came from in the original
+    text. It behaves exactly like an ordinary string (including comparisons),
+    but has two extra attributes:
+
+        - start: character offset of the start of the token
+        - end:   character offset of the end of the token
+
+    Created by tokenize(..., spans=True)
+    """
+    __slots__ = ("start", "end")
+
+    def __new__(cls, token, start, end):
+        self = str.__new__(cls, token)
+        self.start = start
+        self.end = end
+        return self
+
+    def __reduce__(self):
+        return (SpanToken, (str(self), self.start, self.end))
 
-        # Remove blank elements
-        paragraphs = [item for item in paragraphs if item is not ""]
+    def __repr__(self):
+        return "SpanToken({0}, {1}, {2})".format(str.__repr__(self),
+                                                  self.start, self.end)
 
-        tokenized = []
-        for paragraph in paragraphs:
-            sentences = nltk.sent_tokenize(paragraph)
-            tokenized.append([nltk.word_tokenize(sentence) for sentence in sentences])
-        return(tokenized)
+
+# nltk's word tokenizers turn double quotes into `` or ''
+_QUOTE_TOKENS = ("``", "''", '"')
+_QUOTE_PATTERN = re.compile(r"``|''|\"")
+
+
+def _with_spans(tokens, text, offset=0):
+    """
+    Takes the tokens of text, and returns them as SpanTokens, with the
+    character offsets of each token in text, plus *offset*. The tokens are in
+    the same order as in the text, so this only takes a single pass over it.
+    """
+    spanned = []
+    point = 0
+    for token in tokens:
+        if token in _QUOTE_TOKENS:
+            match = _QUOTE_PATTERN.search(text, point)
+            start, end = match.span() if match else (-1, -1)
+        else:
+            start = text.find(token, point)
+            end = start + len(token)
+        if start < 0:
+            raise ValueError("Could not find the token {0!r} in the text when "
+                             "working out its character offsets".format(token))
+        spanned.append(SpanToken(token, offset + start, offset + end))
+        point = end
+    return spanned
+
+
+def _span_funcs(tagged, restore, level1_func, level2_func):
+    """
+    Wraps the functions that process a single sentence and a list of
+    sentences, so that sentences made of SpanTokens are passed on as plain
+    strings (so the results are cached the same way no matter where the
+    sentence came from), and the SpanTokens are put back into the output by
+    restore(output, sentence).
+
+    :param tagged: (boolean) Do the functions take (token, tag) tuples, rather
+                   than token strings?
+    """
+    def has_spans(sentence):
+        if len(sentence) == 0:
+            return False
+        token = sentence[0][0] if tagged else sentence[0]
+        return isinstance(token, SpanToken)
+
+    def strip(sentence):
+        if tagged:
+            return [(str(token), tag) for token, tag in sentence]
+        return [str(token) for token in sentence]
+
+    def span_level1_func(sentence, **kwargs):
+        if not has_spans(sentence):
+            return level1_func(sentence, **kwargs)
+        return restore(level1_func(strip(sentence), **kwargs), sentence)
+
+    def span_level2_func(sentences, **kwargs):
+        sentences = list(sentences)
+        if not any(has_spans(sentence) for sentence in sentences):
+            return level2_func(sentences, **kwargs)
+        processed = level2_func([strip(sentence) if has_spans(sentence)
+                                 else sentence for sentence in sentences],
+                                **kwargs)
+        return [restore(output, sentence) if has_spans(sentence) else output
+                for output, sentence in zip(processed, sentences)]
+    return span_level1_func, span_level2_func
+
+
+def _restore_tagged_spans(tagged, sentence):
+    """ Puts the SpanTokens of *sentence* back into its tagged tuples """
+    return [(token, tag) for token, (word, tag) in zip(sentence, tagged)]
+
+
+def _restore_tree_spans(tree, sentence):
+    """
+    Replaces the leaves of a chunk tree with the tagged tuples of *sentence*,
+    that still contain its SpanTokens.
+    """
+    tokens = iter(sentence)
+
+    def walk(node):
+        for i, child in enumerate(node):
+            if isinstance(child, nltk.Tree):
+                walk(child)
+            else:
+                node[i] = next(tokens)
+    walk(tree)
+    return tree
 
 
 # ==============================================================================
 #                                                                    POS TAGGING
 # ==============================================================================
 # TODO: make it accept a single string that is not nested in a list.
-def pos_tag(tokens):
+def pos_tag(tokens, batch=False, max_batch_size=None):
     """
     Takes a list of tokens and returns a list of "Part of Speech" (POS) Tagged
     tupples.
@@ -82,9 +418,27 @@ def pos_tag(tokens):
     - If you have grouped by paragraphs (tokens[i][j][0] returns a string token)
       then levels_out=3.
 
-    :param tokens: (list) The list of token strings
+    :param tokens: (list) The list of token strings. If they are SpanTokens
+                   (see tokenize()), then the same SpanTokens are used in the
+                   tagged tuples. It can also be a generator (eg from
+                   tokenize(..., lazy=True)) that yields tokenized sentences
+                   or paragraphs, or a CompactDocument, in which case a tagged
+                   CompactDocument is returned.
+    :param batch: (boolean) If True, then all the sentences (across all
+                   paragraphs) are gathered up and tagged in one single call to
+                   the tagger, instead of one call per paragraph. If *tokens* is
+                   a generator, then the sentences of several consecutive
+                   elements (eg several documents) are tagged together. The
+                   output is the same either way, but this avoids the set up
+                   cost of each call to the tagger when there are lots of small
+                   paragraphs.
+    :param max_batch_size: (int) Maximum number of sentences tagged in a
+                   single call when batch=True. Defaults to no limit for lists,
+                   and STREAM_BATCH_SIZE for generators.
     :return: (list) Depending on how deep the nesting of tokens is, it returns
              a list of tuples, where the tuples are nested at the same level.
+             If *tokens* is a generator, then it returns a generator that
+             tags each element as it is consumed.
 
     :examples:
         # one level deep
@@ -101,29 +455,78 @@ def pos_tag(tokens):
         pos_tag(a)
         pos_tag(b)
         pos_tag(d)
+
+        # Tag the sentences of many documents together, in batches
+        for tagged_doc in pos_tag(iter(docs), batch=True, max_batch_size=5000):
+            ...
     """
     # ==========================================================================
+    if isinstance(tokens, CompactDocument):
+        return _pos_tag_compact(tokens, batch, max_batch_size)
+
+    if batch:
+        return _batched_call(tokens,
+                             list_type="token",
+                             level2_func=_pos_tag_funcs()[1],
+                             max_batch_size=max_batch_size)
+
+    if _is_stream(tokens):
+        return (pos_tag(item) for item in tokens)
+
+    # eg a paragraph of a whitespace only line, from a lazy tokenize() stream
+    if len(tokens) == 0:
+        return []
+
     levels = get_level(tokens)
+    level1_func, level2_func = _pos_tag_funcs()
     return _multilevel_call(tokens,
                             list_type = "token",
-                            level1_func = nltk.pos_tag,
-                            level2_func = nltk.pos_tag_sents)
+                            levels = levels,
+                            level1_func = level1_func,
+                            level2_func = level2_func)
+
+
+def _pos_tag_compact(doc, batch=False, max_batch_size=None):
+    """
+    POS tags an untagged CompactDocument, one paragraph at a time (or in
+    batches of sentences if batch=True), and returns a tagged CompactDocument
+    that shares the same token arrays.
+    """
+    assert not doc.is_tagged, \
+        "The CompactDocument passed to pos_tag() has already been tagged"
+    pos_tag_sents = _pos_tag_funcs()[1]
+    if batch:
+        tagged = _call_in_batches(list(doc.sentences()), pos_tag_sents,
+                                  max_batch_size)
+    else:
+        tagged = (sentence
+                  for paragraph in doc.paragraphs()
+                  for sentence in pos_tag_sents(paragraph))
+    return doc.with_tags(tag for sentence in tagged for word, tag in sentence)
 
 
 # ==============================================================================
 #                                                                      GET LEVEL
 # ==============================================================================
-# TODO: test that all elements of the list are consistently the same depth.
-def get_level(x, type="token", max_level=3):
+def get_level(x, type="token", max_level=3, check_consistent=False):
     """
     Takes a list of token strings, and returns how many levels deep the tokens
     are.
 
+    By default, the depth is worked out by only looking at the first element at
+    each level of nesting (skipping over any empty lists, such as the
+    paragraph of a whitespace only line). If you want to make sure that every
+    branch of the list is the same depth, then set check_consistent=True. This
+    walks over the whole list once, and the error message gives the index of
+    the first element that is out of place.
+
     :param x: (list) The list of tokens
     :param type: (string) the type of element to look for.
                  type="token" looks for token strings
                  type="pos_tagged" looks for tuples with two string elements.
     :param max_level (int) maximum allowed nested depth.
+    :param check_consistent: (boolean) check that all branches of the list are
+                 the same depth?
     :return: (int) an integer representing how many levels deep the desired
               items are
     """
@@ -142,17 +545,17 @@ def get_level(x, type="token", max_level=3):
         data_type = tuple
         data_type_description = "tuples"
 
-    current_nest = x[0]
-    level = 1
-    while level <= max_level:
-        if isinstance(current_nest, data_type):
-            break
-        else:
-            assert isinstance(current_nest, list), \
-                "Your {0} list must be a nested list of {1}"\
-                "".format(type, data_type_description)
-            current_nest = current_nest[0]
-            level += 1
+    # Empty lists (eg the paragraph of a whitespace only line) are skipped
+    # over, so the depth is read from the first element that is not a list
+    found = _first_token(x)
+    if found is None:
+        # Nothing but empty lists, so go by how deeply they are nested
+        level = _nesting_level(x)
+    else:
+        level, first = found
+        assert isinstance(first, data_type), \
+            "Your {0} list must be a nested list of {1}"\
+            "".format(type, data_type_description)
     if (level > max_level):
         #TODO: throw an error exception
         assert level <= max_level, \
@@ -160,9 +563,42 @@ def get_level(x, type="token", max_level=3):
              "deeper than {1} levels deep.".format(type, max_level)
         return(None)
     else:
+        if check_consistent:
+            _check_consistent_level(x, level, data_type, data_type_description)
         return(level)
 
 
+def _check_consistent_level(x, level, data_type, data_type_description):
+    """
+    Makes a single pass over the nested list x, checking that every branch
+    contains lists all the way down to *level*, and elements of *data_type* at
+    that level. The error message gives the index of the first element that
+    is out of place, eg x[2][0].
+    """
+    branches = [((), x)]
+    for depth in range(1, level + 1):
+        next_branches = []
+        for path, branch in branches:
+            for i, item in enumerate(branch):
+                if depth < level:
+                    assert isinstance(item, list), \
+                        _inconsistent_level_message(path + (i,), item, "lists")
+                    next_branches.append((path + (i,), item))
+                else:
+                    assert isinstance(item, data_type), \
+                        _inconsistent_level_message(path + (i,), item,
+                                                    data_type_description)
+        branches = next_branches
+
+
+def _inconsistent_level_message(path, item, expected):
+    """ Error message for an element at the index *path* of the wrong type """
+    return "The elements in your list have inconsistent nesting levels. " \
+           "Expected all elements at depth {0} to be {1}, but x{2} is {3!r}" \
+           "".format(len(path), expected,
+                     "".join("[{0}]".format(i) for i in path), item)
+
+
 # ==============================================================================
 #                                                          CHUNK PRESET PATTERNS
 # ==============================================================================
@@ -196,10 +632,65 @@ CHUNKED_NP:     {<DT><WP><VBP>*<RB>*<VBN><IN><NN>}
 CHUNK_PATTERN_NP3 = """CHUNKED_NP: {<RB.?>*<VB.?>*<NNP>+<NN>?}"""
 
 
+# ==============================================================================
+#                                                                  CHUNKER CACHE
+# ==============================================================================
+# Maximum number of compiled chunkers for user supplied patterns that are kept
+# around. The preset patterns are always kept, and do not count towards this.
+CHUNKER_CACHE_SIZE = 64
+
+_PRESET_PATTERNS = (CHUNK_PATTERN_NP1, CHUNK_PATTERN_NP2, CHUNK_PATTERN_NP3)
+_preset_chunkers = LRUCache(maxsize=None)
+_chunker_cache = LRUCache(maxsize=CHUNKER_CACHE_SIZE)
+
+
+def get_chunker(pattern):
+    """
+    Returns a compiled nltk.RegexpParser for the chunking pattern.
+
+    Compiling a pattern is relatively expensive, so compiled chunkers are
+    cached, keyed by the text of the pattern. The preset patterns
+    (CHUNK_PATTERN_NP1, CHUNK_PATTERN_NP2, CHUNK_PATTERN_NP3) are compiled the
+    first time they are used, and are never evicted. Other patterns are kept in
+    a least recently used cache of up to CHUNKER_CACHE_SIZE chunkers.
+
+    This is safe to call from multiple threads.
+
+    :param pattern: (str) a chunking pattern
+    :return: a nltk.RegexpParser object
+    """
+    assert isinstance(pattern, str), \
+        "Argument *pattern* in get_chunker() must be a string"
+    cache = _preset_chunkers if pattern in _PRESET_PATTERNS else _chunker_cache
+    return cache.get_or_create(pattern, lambda: nltk.RegexpParser(pattern))
+
+
+def chunker_cache_info():
+    """
+    Returns the statistics of the compiled chunker cache, as a named tuple with
+    the fields: hits, misses, maxsize, currsize. The counts include the
+    preset patterns.
+    """
+    preset = _preset_chunkers.info()
+    other = _chunker_cache.info()
+    return other._replace(hits=preset.hits + other.hits,
+                          misses=preset.misses + other.misses,
+                          currsize=preset.currsize + other.currsize)
+
+
+def clear_chunker_cache():
+    """
+    Removes all compiled chunkers from the cache, and resets its statistics.
+    """
+    _preset_chunkers.clear()
+    _chunker_cache.clear()
+
+
 # ==============================================================================
 #                                                                          CHUNK
 # ==============================================================================
-def chunk(tagged_list, pattern=CHUNK_PATTERN_NP2, ne=False, binary=False):
+def chunk(tagged_list, pattern=CHUNK_PATTERN_NP2, ne=False, binary=False,
+          batch=False, max_batch_size=None):
     """
     Takes a list of POS tagged items, and chunks them according to the pattern.
 
@@ -212,7 +703,13 @@ def chunk(tagged_list, pattern=CHUNK_PATTERN_NP2, ne=False, binary=False):
     curly brackets in reverse  eg:
          } patern_here {
 
-    :param tagged_list: a list of POS tagged items.
+    :param tagged_list: a list of POS tagged items, or a tagged
+                        CompactDocument. If the tokens are SpanTokens (see
+                        tokenize()), then so are the tokens in the leaves of
+                        the trees. It can also be a generator (eg from
+                        pos_tag() on a lazy stream) that yields tagged
+                        sentences or paragraphs, in which case a generator of
+                        chunked elements is returned.
     :param pattern: a chunking pattern. Several preset patterns exist:
 
                     - CHUNK_PATTERN_NP1  A simple pattern for Noun Phrases
@@ -228,6 +725,10 @@ def chunk(tagged_list, pattern=CHUNK_PATTERN_NP2, ne=False, binary=False):
                       - False - will classify the Named Entities into different
                         types, such as PERSON, ORGANIZATION, FACILITY, ... etc.
 
+    :param batch: (boolean) Batch the sentences together when using the built
+                  in Named Entity Recognition. See named_entities()
+    :param max_batch_size: (int) Maximum number of sentences in a batch.
+
     :return: returns a list of trees, with certain tokens chunked together based
              on rules specified by the *pattern* variable.
 
@@ -253,20 +754,74 @@ def chunk(tagged_list, pattern=CHUNK_PATTERN_NP2, ne=False, binary=False):
     # ==========================================================================
     # Handle the use of the built in Named Entity Recognition
     if ne:
-        return (named_entities(tagged_list, binary))
+        return (named_entities(tagged_list, binary, batch=batch,
+                               max_batch_size=max_batch_size))
+
+    if isinstance(tagged_list, CompactDocument):
+        tagged_list = tagged_list.tolist()
+
+    # Handle lazy streams of tagged sentences or paragraphs
+    if _is_stream(tagged_list):
+        return (chunk(item, pattern=pattern) for item in tagged_list)
+
+    if len(tagged_list) == 0:
+        return []
 
     # Perform Chunking based on Regex Pattern
     levels = get_level(tagged_list, type="pos_tagged") # Depth of tagged_list
-    chunker = nltk.RegexpParser(pattern)               # nltk regex object
+    chunker = get_chunker(pattern)                     # nltk regex object
     return _multilevel_call(tagged_list,
                                 list_type = "pos_tagged",
-                                level1_func = chunker.parse)
+                                levels = levels,
+                                level1_func = profiling.timed(
+                                    "chunk", chunker.parse,
+                                    profiling.count_sentence_tokens))
+
+
+# ==============================================================================
+#                                                                    CHUNK MULTI
+# ==============================================================================
+def chunk_multi(tagged_list, patterns):
+    """
+    Chunks a list of POS tagged items with several patterns, and returns the
+    results for all of them in a dictionary. This gives the same results as
+    calling chunk() once for each pattern.
+
+    :param tagged_list: a list of POS tagged items (nested 1 to 3 levels
+                        deep), or a tagged CompactDocument. It can also be a
+                        generator of tagged sentences or paragraphs, in which
+                        case a generator of dictionaries is returned.
+    :param patterns: (dict) The chunking patterns to use, keyed by the name
+                     you want to give to each one.
+    :return: (dict) For each name in *patterns*, the list of trees that
+             chunk(tagged_list, pattern=patterns[name]) would return.
+
+    :examples:
+        chunked = chunk_multi(pos_tagged, {"np1": CHUNK_PATTERN_NP1,
+                                           "np2": CHUNK_PATTERN_NP2,
+                                           "np3": CHUNK_PATTERN_NP3})
+        chunked["np2"][0][0].draw()
+    """
+    # ==========================================================================
+    assert isinstance(patterns, dict) and len(patterns) > 0, \
+        "Argument *patterns* in chunk_multi() must be a non-empty dictionary"
+
+    if isinstance(tagged_list, CompactDocument):
+        tagged_list = tagged_list.tolist()
+
+    # Each element of a stream is only seen once, so it is chunked with all of
+    # the patterns before moving on to the next one.
+    if _is_stream(tagged_list):
+        return (chunk_multi(item, patterns) for item in tagged_list)
+
+    return dict((name, chunk(tagged_list, pattern=pattern))
+                for name, pattern in patterns.items())
 
 
 # ==============================================================================
 #                                                                 NAMED ENTITIES
 # ==============================================================================
-def named_entities(tagged_list, binary):
+def named_entities(tagged_list, binary, batch=False, max_batch_size=None):
     """
     Takes a list of nested POS tagged tuples, and chunks them using nltk's
     recomended named entity chunker.
@@ -277,27 +832,58 @@ def named_entities(tagged_list, binary):
     You can specify that you want the named entities to be classified by
     different types of category by setting *binary* to False.
 
-    :param tagged_list: (list) A nested list of POS tagged tuples
+    :param tagged_list: (list) A nested list of POS tagged tuples, or a tagged
+                        CompactDocument. If the tokens are SpanTokens (see
+                        tokenize()), then so are the tokens in the leaves of
+                        the trees. It can also be a generator of tagged
+                        sentences or paragraphs, in which case a generator is
+                        returned.
     :param binary: (boolean) should it use binary Named Entity classification?
 
                    - True  - Anything that is a named entity will be labelled NE
                    - False - Will classify the Named Entities into different
                              types,like PERSON, ORGANIZATION, FACILITY, ... etc.
+    :param batch: (boolean) If True, then all the sentences (across all
+                   paragraphs, or across consecutive elements of a generator)
+                   are chunked together in one single call to the chunker,
+                   instead of one call per paragraph.
+    :param max_batch_size: (int) Maximum number of sentences chunked in a
+                   single call when batch=True. Defaults to no limit for lists,
+                   and STREAM_BATCH_SIZE for generators.
     :return: returns a list of trees, with certain tokens chunked together.
     """
     # ==========================================================================
+    if isinstance(tagged_list, CompactDocument):
+        tagged_list = tagged_list.tolist()
+
+    if batch:
+        return _batched_call(tagged_list,
+                             list_type="pos_tagged",
+                             level2_func=_ne_chunk_funcs()[1],
+                             max_batch_size=max_batch_size,
+                             binary=binary)
+
+    if _is_stream(tagged_list):
+        return (named_entities(item, binary) for item in tagged_list)
+
+    if len(tagged_list) == 0:
+        return []
+
     levels = get_level(tagged_list, type="pos_tagged")  # Depth of tagged_list
+    level1_func, level2_func = _ne_chunk_funcs()
     return _multilevel_call(tagged_list,
                             list_type="pos_tagged",
-                            level1_func=nltk.ne_chunk,
-                            level2_func=nltk.ne_chunk_sents,
+                            levels=levels,
+                            level1_func=level1_func,
+                            level2_func=level2_func,
                             binary=binary)
 
 
 # ==============================================================================
 #                                                                MULTILEVEL CALL
 # ==============================================================================
-def _multilevel_call(x, list_type, level1_func, level2_func=None, **kwargs):
+def _multilevel_call(x, list_type, level1_func, level2_func=None, levels=None,
+                     **kwargs):
     """
     A convenience function that takes a list of nested elements and a pointer
     to a function that processes the elements, and returns another nested list
@@ -314,13 +900,16 @@ def _multilevel_call(x, list_type, level1_func, level2_func=None, **kwargs):
 
     :param level1_func: The function that processes individual elements
     :param level2_func: The function that processes 2nd level lists (optional)
+    :param levels: (int) The depth of the list, if the caller has already
+                   worked it out with get_level(). (optional)
     :param **kwargs: Additional arguments to be passed on to the functions other
                    than the list itself
     :return: returns the output of the functions specified, applied to the
              elements of the list x.
     """
     # ==========================================================================
-    levels = get_level(x, type=list_type, max_level=3)  # Get the depth of list
+    if levels is None:
+        levels = get_level(x, type=list_type, max_level=3)  # Depth of list
     try:
         # -------------------------------------------------- Level 1
         if (levels == 1):
@@ -328,6 +917,8 @@ def _multilevel_call(x, list_type, level1_func, level2_func=None, **kwargs):
 
         # -------------------------------------------------- Level 2
         elif (levels == 2):
+            if profiling.enabled():
+                profiling.record_fanout(2, len(x))
             if level2_func is not None:
                 return level2_func(x, **kwargs)
             else:
@@ -335,12 +926,15 @@ def _multilevel_call(x, list_type, level1_func, level2_func=None, **kwargs):
 
         # -------------------------------------------------- Level 3
         elif (levels == 3):
+            if profiling.enabled():
+                profiling.record_fanout(3, len(x))
             processed = []
             for paragraph in x:
                 processed_sentences = _multilevel_call(paragraph,
                                                        list_type,
                                                        level1_func,
                                                        level2_func,
+                                                       levels=2,
                                                        **kwargs)
                 processed.append(processed_sentences)
             return processed
@@ -351,12 +945,400 @@ def _multilevel_call(x, list_type, level1_func, level2_func=None, **kwargs):
             "inconsistent nesting levels. Please make sure that if you \n"\
             "have lists within lists (within lists), that all branches \n"\
             "are the same depth.")
-    except Exception as e:
-        raise e("Oh ohh! _multilevel_call() function went funny! Please \n"\
-            "double check the values of the arguments you fed, make sure \n"\
-            "the assumptions are met. ")
-        #print(str(e))
-        return(None)
 
 
+# ==============================================================================
+#                                                                   BATCHED CALL
+# ==============================================================================
+# Default maximum number of sentences per batch when batching a generator.
+STREAM_BATCH_SIZE = 1024
+
+
+def _batched_call(x, list_type, level2_func, max_batch_size=None, **kwargs):
+    """
+    Like _multilevel_call(), but instead of calling *level2_func* once per
+    paragraph, it flattens all the sentences into one big list, calls
+    *level2_func* on it (in slices of up to *max_batch_size* sentences), and
+    then nests the results back into the same shape as the input.
+
+    If x is a generator, then the sentences of consecutive elements are
+    gathered until there are at least *max_batch_size* of them (defaults to
+    STREAM_BATCH_SIZE), processed together, and the results are yielded one
+    element at a time.
+
+    :param x: (list or generator) The nested list of elements
+    :param list_type: The type of elements the list contains. "token" or
+                      "pos_tagged"
+    :param level2_func: The function that processes a list of sentences
+    :param max_batch_size: (int) Maximum number of sentences per call
+    :param **kwargs: Additional arguments to be passed on to level2_func
+    :return: the output of level2_func, nested in the same way as x
+    """
+    assert (max_batch_size is None) or \
+           (isinstance(max_batch_size, int) and max_batch_size >= 1), \
+        "Argument *max_batch_size* must be None or a positive integer"
+
+    if _is_stream(x):
+        if max_batch_size is None:
+            max_batch_size = STREAM_BATCH_SIZE
+        return _iter_batched_call(x, list_type, level2_func, max_batch_size,
+                                  **kwargs)
+
+    sentences = []
+    layout = _flatten_sentences(x, list_type, sentences)
+    processed = _call_in_batches(sentences, level2_func, max_batch_size,
+                                 **kwargs)
+    return _nest_sentences(processed, [layout])[0]
+
+
+def _iter_batched_call(x, list_type, level2_func, max_batch_size, **kwargs):
+    """ Generator used by _batched_call() when x is a generator. """
+    sentences = []
+    layouts = []
+    for item in x:
+        layouts.append(_flatten_sentences(item, list_type, sentences))
+        if len(sentences) >= max_batch_size:
+            processed = _call_in_batches(sentences, level2_func,
+                                         max_batch_size, **kwargs)
+            for result in _nest_sentences(processed, layouts):
+                yield result
+            sentences = []
+            layouts = []
+    if layouts:
+        processed = _call_in_batches(sentences, level2_func, max_batch_size,
+                                     **kwargs)
+        for result in _nest_sentences(processed, layouts):
+            yield result
+
+
+def _flatten_sentences(x, list_type, sentences):
+    """
+    Appends all the sentences in the nested list x onto the list *sentences*,
+    and returns a layout that records how to nest them back again:
+
+        - (1, None)    x was a single sentence
+        - (2, n)       x was a list of n sentences
+        - (3, [n,...]) x was a list of paragraphs with n sentences each
+
+    An empty x (eg a paragraph of a whitespace only line) is treated as a list
+    of 0 sentences.
+    """
+    if len(x) == 0:
+        return (2, 0)
+    levels = get_level(x, type=list_type)
+    if levels == 1:
+        sentences.append(x)
+        return (1, None)
+    elif levels == 2:
+        if profiling.enabled():
+            profiling.record_fanout(2, len(x))
+        sentences.extend(x)
+        return (2, len(x))
+    else:
+        if profiling.enabled():
+            profiling.record_fanout(3, len(x))
+            for paragraph in x:
+                profiling.record_fanout(2, len(paragraph))
+        for paragraph in x:
+            sentences.extend(paragraph)
+        return (3, [len(paragraph) for paragraph in x])
+
+
+def _call_in_batches(sentences, func, max_batch_size, **kwargs):
+    """
+    Calls func on slices of up to max_batch_size sentences at a time, and
+    returns a single list with all of the outputs.
+    """
+    step = max_batch_size if max_batch_size is not None else len(sentences)
+    processed = []
+    for start in range(0, len(sentences), max(step, 1)):
+        processed.extend(func(sentences[start:start + step], **kwargs))
+    return processed
+
+
+def _nest_sentences(processed, layouts):
+    """
+    Takes a flat list of processed sentences, and the layouts recorded by
+    _flatten_sentences(), and returns a list with one nested element for each
+    layout.
+    """
+    nested = []
+    i = 0
+    for levels, shape in layouts:
+        if levels == 1:
+            nested.append(processed[i])
+            i += 1
+        elif levels == 2:
+            nested.append(processed[i:i + shape])
+            i += shape
+        else:
+            paragraphs = []
+            for n_sentences in shape:
+                paragraphs.append(processed[i:i + n_sentences])
+                i += n_sentences
+            nested.append(paragraphs)
+    return nested
+
+
+# ==============================================================================
+#                                                                   RESULT CACHE
+# ==============================================================================
+# The cache used to memoize tagging and named entity results. Disabled (None)
+# until enable_result_cache() is called.
+_result_cache = None
+
+
+def enable_result_cache(maxsize=100000, path=None):
+    """
+    Turns on memoization of the results of pos_tag() and named_entities().
+
+    Each sentence is looked up in the cache by a hash of its tokens (together
+    with the tagger or chunker used, and the *binary* flag), and only the
+    sentences that have not been seen before are passed on to nltk. This
+    helps a lot when the same sentences come up again and again, eg
+    boilerplate paragraphs, quoted text, or templated emails.
+
+    :param maxsize: (int) Maximum number of sentence results kept in memory.
+    :param path: (str) Path to an SQLite database file in which to also store
+                 the results on disk, so that they can be reused across runs.
+                 If None, results are only kept in memory.
+    :return: the ResultCache object being used.
+
+    :examples:
+        enable_result_cache(maxsize=50000, path="nlp_cache.sqlite")
+        tagged = pos_tag(tokens)
+        result_cache_info()     # hits, disk_hits, misses, hit_rate, ...
+    """
+    global _result_cache
+    disable_result_cache()
+    _result_cache = ResultCache(maxsize=maxsize, path=path)
+    return _result_cache
+
+
+def disable_result_cache():
+    """ Turns off memoization of the results of pos_tag() and named_entities()"""
+    global _result_cache
+    if _result_cache is not None:
+        _result_cache.close()
+    _result_cache = None
+
+
+def result_cache_info():
+    """
+    Returns the statistics of the result cache as a named tuple with the
+    fields: hits, disk_hits, misses, hit_rate, currsize, maxsize. Returns None
+    if the cache is not enabled.
+    """
+    if _result_cache is None:
+        return None
+    return _result_cache.info()
+
+
+def _cached_funcs(name, level1_func, level2_func, copy):
+    """
+    Returns the pair of functions (level1_func, level2_func), that process a
+    single sentence and a list of sentences respectively, wrapped by the result
+    cache. If the cache is not enabled, then they are returned unchanged.
+
+    The name of the function and the version of nltk are included in the cache
+    keys, so results from different taggers or chunkers are never mixed up.
+    """
+    if _result_cache is None:
+        return level1_func, level2_func
+    namespace = "{0}:{1}.{2}:{3}".format(name, level2_func.__module__,
+                                         level2_func.__name__, nltk.__version__)
+    cached_level2_func = _result_cache.cached_sents_func(level2_func, namespace,
+                                                         copy=copy)
+
+    def cached_level1_func(sentence, **kwargs):
+        return cached_level2_func([sentence], **kwargs)[0]
+    return cached_level1_func, cached_level2_func
+
+
+def _pos_tag_funcs():
+    return _span_funcs(False, _restore_tagged_spans,
+                       *_profiled_funcs("pos_tag",
+                                        *_cached_funcs("pos_tag",
+                                                       nltk.pos_tag,
+                                                       nltk.pos_tag_sents,
+                                                       copy=list)))
+
 
+def _copy_tree(tree):
+    return tree.copy(deep=True)
+
+
+def _ne_chunk_funcs():
+    return _span_funcs(True, _restore_tree_spans,
+                       *_profiled_funcs("ne_chunk",
+                                        *_cached_funcs("ne_chunk",
+                                                       _ne_chunk,
+                                                       _ne_chunk_sents,
+                                                       copy=_copy_tree)))
+
+
+def _profiled_funcs(stage, level1_func, level2_func):
+    """
+    Wraps the sentence and list of sentences functions so that their calls
+    are recorded under *stage* by any active profilers.
+    """
+    return (profiling.timed(stage, level1_func,
+                            profiling.count_sentence_tokens),
+            profiling.timed(stage, level2_func,
+                            profiling.count_sentences_tokens))
+
+
+# ==============================================================================
+#                                                                         MODELS
+# ==============================================================================
+# The named entity chunkers loaded so far, keyed by the *binary* flag.
+_ne_chunkers = {}
+
+
+def _get_ne_chunker(binary):
+    """
+    Returns nltk's recommended named entity chunker, loading it only once.
+    Returns None for versions of nltk that do not have nltk.ne_chunker(), in
+    which case nltk.ne_chunk() takes care of caching the model itself.
+    """
+    chunker = _ne_chunkers.get(binary)
+    if (chunker is None) and hasattr(nltk, "ne_chunker"):
+        chunker = nltk.ne_chunker(fmt="binary" if binary else "multiclass")
+        _ne_chunkers[binary] = chunker
+    return chunker
+
+
+def _ne_chunk(tagged_sentence, binary=False):
+    """ Named entity chunks a single POS tagged sentence. """
+    chunker = _get_ne_chunker(binary)
+    if chunker is None:
+        return nltk.ne_chunk(tagged_sentence, binary=binary)
+    return chunker.parse(tagged_sentence)
+
+
+def _ne_chunk_sents(tagged_sentences, binary=False):
+    """
+    Named entity chunks a list of POS tagged sentences. nltk's chunkers return
+    a lazy generator, which is turned into a list here, so that the result can
+    be reused and pickled.
+    """
+    chunker = _get_ne_chunker(binary)
+    if chunker is None:
+        return list(nltk.ne_chunk_sents(tagged_sentences, binary=binary))
+    return list(chunker.parse_sents(tagged_sentences))
+
+
+# Small calls that force each stage to load the nltk models it needs.
+_WARM_UP_CALLS = {
+    "tokenize": lambda: [nltk.word_tokenize(sentence)
+                         for sentence in nltk.sent_tokenize("Warm up. Go.")],
+    "pos_tag":  lambda: nltk.pos_tag(["Warm", "up"]),
+    "ne_chunk": lambda: [_ne_chunk([("Warm", "VB"), ("up", "RP")], binary)
+                         for binary in (False, True)],
+}
+
+
+def missing_resources(stages=("tokenize", "pos_tag", "ne_chunk"),
+                      download=False):
+    """
+    Checks that the nltk resources (models) needed by each stage are
+    installed, by loading them.
+
+    :param stages: (list of strings) The stages to check. Any of "tokenize",
+                   "pos_tag" and "ne_chunk" (named entity recognition).
+    :param download: (boolean) Download any missing resources using
+                   nltk.download()?
+    :return: (list of strings) The names of the resources that are missing.
+             An empty list if everything is installed.
+    """
+    for stage in stages:
+        assert stage in _WARM_UP_CALLS, \
+            "Stages can only take the values 'tokenize', 'pos_tag' or " \
+            "'ne_chunk'"
+    missing = []
+    for stage in stages:
+        downloaded = set()
+        while True:
+            try:
+                _WARM_UP_CALLS[stage]()
+                break
+            except LookupError as e:
+                resource = _missing_resource_name(e)
+                if download and (resource is not None) \
+                        and (resource not in downloaded):
+                    downloaded.add(resource)
+                    nltk.download(resource, quiet=True)
+                    continue
+                missing.append(resource if resource is not None else stage)
+                break
+    return missing
+
+
+def _missing_resource_name(error):
+    """
+    Extracts the name of the missing resource from the LookupError that nltk
+    raises when a resource is not installed.
+    """
+    message = str(error)
+    match = re.search(r"nltk\.download\(\s*u?['\"]([^'\"]+)['\"]", message)
+    if match is None:
+        match = re.search(r"Resource\s+(?:\x1b\[\d+m)?u?'?([^'\s\x1b]+)",
+                          message)
+    return match.group(1) if match is not None else None
+
+
+def warm_up(stages=("tokenize", "pos_tag", "ne_chunk"), download=False):
+    """
+    Imports nltk, and loads the models used by each stage, so that the first
+    real call does not have to. This is handy for gating traffic with a
+    readiness check in services, or for loading models up front in short
+    lived jobs.
+
+    :param stages: (list of strings) The stages to load. Any of "tokenize",
+                   "pos_tag" and "ne_chunk" (named entity recognition).
+    :param download: (boolean) Download any missing resources using
+                   nltk.download()?
+    :raises LookupError: if any of the required resources is not installed.
+
+    :examples:
+        warm_up()                               # Load everything
+        warm_up(stages=["tokenize", "pos_tag"]) # Skip the NE chunker
+        warm_up(download=True)                  # Download what is missing
+    """
+    missing = missing_resources(stages, download=download)
+    if missing:
+        raise LookupError(
+            "The following nltk resources are not installed: {0}\n"
+            "Install them by running:\n"
+            "{1}".format(", ".join(missing),
+                         "\n".join("    nltk.download('{0}')".format(name)
+                                   for name in missing)))
+
+
+# ==============================================================================
+#                                                                     SUBMODULES
+# ==============================================================================
+# Imported at the end, since they make use of the functions defined above.
+from simple_nlp.corpus import (CorpusWriter, MappedCorpus, load_corpus,
+                               save_corpus)
+from simple_nlp.extract import Chunk, extract_chunks, iter_extract_chunks
+from simple_nlp.incremental import IncrementalDocument
+from simple_nlp.pipeline import Pipeline, process_corpus
+from simple_nlp.profiling import Profiler
+from simple_nlp.stats import (TagStatistics, phrase_frequencies,
+                              tag_bigram_matrix, tag_bigrams, tag_frequencies)
+
+# The asyncio functions are only imported when they are first used, since
+# importing asyncio adds a lot to the time taken by "import simple_nlp". This
+# relies on module level __getattr__ (Python 3.7 or later). On older versions,
+# import them from simple_nlp.aio instead.
+_AIO_NAMES = ("AsyncNLP", "async_tokenize", "async_pos_tag", "async_chunk",
+              "async_named_entities")
+
+
+def __getattr__(name):
+    if name in _AIO_NAMES:
+        aio = importlib.import_module("simple_nlp.aio")
+        return getattr(aio, name)
+    raise AttributeError("module 'simple_nlp' has no attribute '{0}'"
+                         "".format(name))
@@ -0,0 +1,275 @@
+"""====================================================
+                    AIO
+
+Asyncio friendly versions of tokenize, pos_tag, chunk and named_entities, for
+use in asyncio based services. The work is done in an executor so that it does
+not block the event loop, with limits on how many requests are processed at
+once. Sentences from requests that arrive within a short window of each other
+are tagged together, in a single call to the tagger.
+
+Requires Python 3.5 or later.
+=======================================================
+"""
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import simple_nlp
+
+
+# ==============================================================================
+#                                                                       ASYNCNLP
+# ==============================================================================
+class AsyncNLP(object):
+    """
+    Runs simple_nlp functions in an executor, for use from asyncio code.
+
+    Calls to pos_tag() and named_entities() that arrive within *batch_window*
+    seconds of each other are gathered up, and all their sentences are
+    processed in a single call to nltk's pos_tag_sents / ne_chunk_sents, which
+    is much more efficient under load than one call per request. The results
+    are the same as the synchronous functions.
+
+    :param executor: (concurrent.futures.Executor) The executor to run the
+                     work in. Defaults to a ThreadPoolExecutor with
+                     *max_workers* threads. Pass a ProcessPoolExecutor to make
+                     use of several CPUs.
+    :param max_workers: (int) Number of threads in the default executor.
+    :param max_concurrency: (int) Maximum number of jobs running in the
+                     executor at a time.
+    :param max_pending: (int) Maximum number of requests being handled at a
+                     time. Further requests wait until there is room, so that
+                     a burst of traffic cannot queue up unbounded work.
+    :param batch_window: (float) Seconds to wait for more requests before
+                     running a batch.
+    :param max_batch_size: (int) A batch is run straight away once it has at
+                     least this many sentences.
+
+    :examples:
+        nlp = AsyncNLP(max_workers=4)
+
+        async def handle(text):
+            tokens = await nlp.tokenize(text, levels_out=2)
+            tagged = await nlp.pos_tag(tokens)
+            return await nlp.chunk(tagged)
+    """
+    def __init__(self, executor=None, max_workers=None, max_concurrency=8,
+                 max_pending=1024, batch_window=0.005, max_batch_size=256):
+        assert isinstance(max_concurrency, int) and max_concurrency >= 1, \
+            "Argument *max_concurrency* in AsyncNLP() must be a positive integer"
+        assert isinstance(max_pending, int) and max_pending >= 1, \
+            "Argument *max_pending* in AsyncNLP() must be a positive integer"
+        assert isinstance(max_batch_size, int) and max_batch_size >= 1, \
+            "Argument *max_batch_size* in AsyncNLP() must be a positive integer"
+        assert batch_window >= 0, \
+            "Argument *batch_window* in AsyncNLP() cannot be negative"
+
+        self._owns_executor = executor is None
+        self.executor = ThreadPoolExecutor(max_workers=max_workers) \
+                        if executor is None else executor
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._loop = None
+
+    # --------------------------------------------------------------------------
+    #                                                           PUBLIC FUNCTIONS
+    # --------------------------------------------------------------------------
+    async def tokenize(self, text, levels_out=1):
+        """ Asynchronous version of simple_nlp.tokenize() """
+        async with self._state()["pending"]:
+            return await self._run(simple_nlp.tokenize, text, levels_out)
+
+    async def pos_tag(self, tokens):
+        """
+        Asynchronous version of simple_nlp.pos_tag(). The sentences are tagged
+        together with those of other requests arriving at about the same time.
+        """
+        async with self._state()["pending"]:
+            return await self._batched("pos_tag", tokens, "token")
+
+    async def chunk(self, tagged_list, pattern=simple_nlp.CHUNK_PATTERN_NP2,
+                    ne=False, binary=False):
+        """ Asynchronous version of simple_nlp.chunk() """
+        if ne:
+            return await self.named_entities(tagged_list, binary)
+        async with self._state()["pending"]:
+            return await self._run(simple_nlp.chunk, tagged_list, pattern)
+
+    async def named_entities(self, tagged_list, binary=False):
+        """
+        Asynchronous version of simple_nlp.named_entities(). The sentences are
+        chunked together with those of other requests arriving at about the
+        same time.
+        """
+        async with self._state()["pending"]:
+            return await self._batched("ne_chunk", tagged_list, "pos_tagged",
+                                       binary=binary)
+
+    def close(self, wait=True):
+        """ Shuts down the executor, if it was created by this object. """
+        if self._owns_executor:
+            self.executor.shutdown(wait=wait)
+
+    # --------------------------------------------------------------------------
+    #                                                                   INTERNAL
+    # --------------------------------------------------------------------------
+    def _state(self):
+        """
+        Returns the semaphores and batchers for the running event loop. They
+        are created again if a different event loop is being used.
+        """
+        loop = asyncio.get_event_loop()
+        if (self._loop is None) or (self._loop[0] is not loop):
+            self._loop = (loop, {
+                "pending": asyncio.Semaphore(self.max_pending),
+                "concurrency": asyncio.Semaphore(self.max_concurrency),
+                "batchers": {},
+                "tasks": set()})
+        return self._loop[1]
+
+    async def _run(self, func, *args):
+        """ Runs func(*args) in the executor, within the concurrency limit. """
+        loop = asyncio.get_event_loop()
+        async with self._state()["concurrency"]:
+            return await loop.run_in_executor(self.executor, func, *args)
+
+    async def _batched(self, kind, x, list_type, **kwargs):
+        """
+        Flattens the sentences of x, submits them to the batcher for *kind*,
+        and nests the results back into the shape of x.
+        """
+        assert isinstance(x, list), \
+            "Only lists can be processed by the asynchronous functions"
+        sentences = []
+        layout = simple_nlp._flatten_sentences(x, list_type, sentences)
+        key = (kind, tuple(sorted(kwargs.items())))
+        batchers = self._state()["batchers"]
+        batcher = batchers.get(key)
+        if batcher is None:
+            batcher = batchers[key] = _MicroBatcher(self, kind, kwargs)
+        processed = await batcher.submit(sentences)
+        return simple_nlp._nest_sentences(processed, [layout])[0]
+
+
+# ==============================================================================
+#                                                                  MICRO BATCHER
+# ==============================================================================
+class _MicroBatcher(object):
+    """
+    Gathers the sentences of requests that arrive within a short window, and
+    processes them all in one go in the executor.
+    """
+    def __init__(self, owner, kind, kwargs):
+        self.owner = owner
+        self.kind = kind
+        self.kwargs = kwargs
+        self.pending = []
+        self.n_sentences = 0
+        self.timer = None
+
+    def submit(self, sentences):
+        """
+        Adds a request's sentences to the current batch, and returns a future
+        for their results.
+        """
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self.pending.append((sentences, future))
+        self.n_sentences += len(sentences)
+        if self.n_sentences >= self.owner.max_batch_size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.owner.batch_window, self.flush)
+        return future
+
+    def flush(self):
+        """ Starts processing the current batch. """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        # Leave out the requests whose callers have given up waiting
+        pending = [(sentences, future) for sentences, future in self.pending
+                   if not future.cancelled()]
+        self.pending = []
+        self.n_sentences = 0
+        if pending:
+            tasks = self.owner._state()["tasks"]
+            task = asyncio.ensure_future(self._process(pending))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    async def _process(self, pending):
+        sentences = [sentence for request, future in pending
+                     for sentence in request]
+        try:
+            results = await self.owner._run(_process_batch, self.kind,
+                                            sentences, self.kwargs)
+        except asyncio.CancelledError:
+            for request, future in pending:
+                future.cancel()
+            raise
+        except Exception as e:
+            for request, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        i = 0
+        for request, future in pending:
+            if not future.done():
+                future.set_result(results[i:i + len(request)])
+            i += len(request)
+
+
+def _process_batch(kind, sentences, kwargs):
+    """
+    Processes a batch of sentences in the executor. This is a module level
+    function so that it can also be sent to a ProcessPoolExecutor.
+    """
+    if kind == "pos_tag":
+        level2_func = simple_nlp._pos_tag_funcs()[1]
+    else:
+        level2_func = simple_nlp._ne_chunk_funcs()[1]
+    return list(level2_func(sentences, **kwargs))
+
+
+# ==============================================================================
+#                                                         CONVENIENCE FUNCTIONS
+# ==============================================================================
+# Shared AsyncNLP object used by the async_* functions. Created on first use.
+_default_nlp = None
+
+
+def _get_default_nlp():
+    global _default_nlp
+    if _default_nlp is None:
+        _default_nlp = AsyncNLP()
+    return _default_nlp
+
+
+async def async_tokenize(text, levels_out=1):
+    """ Asynchronous version of tokenize(), using a shared AsyncNLP object """
+    return await _get_default_nlp().tokenize(text, levels_out)
+
+
+async def async_pos_tag(tokens):
+    """ Asynchronous version of pos_tag(), using a shared AsyncNLP object """
+    return await _get_default_nlp().pos_tag(tokens)
+
+
+async def async_chunk(tagged_list, pattern=simple_nlp.CHUNK_PATTERN_NP2,
+                      ne=False, binary=False):
+    """ Asynchronous version of chunk(), using a shared AsyncNLP object """
+    return await _get_default_nlp().chunk(tagged_list, pattern, ne, binary)
+
+
+async def async_named_entities(tagged_list, binary=False):
+    """
+    Asynchronous version of named_entities(), using a shared AsyncNLP object
+    """
+    return await _get_default_nlp().named_entities(tagged_list, binary)
@@ -0,0 +1,508 @@
+"""====================================================
+                    BENCHMARK
+
+Measures the throughput and peak memory use of the simple_nlp wrapper
+functions, and of the equivalent raw nltk calls, over synthetic corpora of
+different sizes and nesting depths. Results are written out as JSON so that
+different versions can be compared.
+
+Run it from the command line with:
+
+    python -m simple_nlp.benchmark --sizes 10 100 1000 --output results.json
+    python -m simple_nlp.benchmark --compare old_results.json
+    python -m simple_nlp.benchmark --check-tokenizers
+
+The synthetic corpus is generated on the fly, so no corpus needs to be
+downloaded. The tokenize, pos_tag and named_entities benchmarks do need the
+relevant nltk models to be installed, and are reported as errors otherwise.
+
+--check-tokenizers checks that the "fast" tokenizer engine produces the same
+tokens as the default "nltk" engine, on a reference text (or on a text file
+of your own), instead of running the benchmarks.
+=======================================================
+"""
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import nltk
+
+import simple_nlp
+
+try:
+    _timer = time.perf_counter
+except AttributeError:
+    _timer = time.time
+
+
+# ==============================================================================
+#                                                               SYNTHETIC CORPUS
+# ==============================================================================
+# Words grouped by the POS tag they are given in the synthetic corpus.
+_WORDS = {
+    "DT":  ["the", "a", "this", "every"],
+    "JJ":  ["quick", "humorous", "tall", "windy", "bright", "old"],
+    "NN":  ["dog", "comedian", "mountain", "road", "ticket", "show", "clown"],
+    "NNS": ["dogs", "tickets", "roads", "mountains"],
+    "NNP": ["Alice", "Bob", "Joe", "Sydney", "London", "Acme"],
+    "VBD": ["gave", "entertained", "frightened", "climbed", "drove"],
+    "IN":  ["to", "towards", "over", "with"],
+    "CC":  ["and", "or"],
+    "RB":  ["quickly", "however", "loudly"],
+}
+
+# Sequences of tags that sentences in the synthetic corpus are built from.
+_SENTENCE_TEMPLATES = [
+    ["NNP", "NNP", "VBD", "DT", "NNS", "IN", "DT", "NN"],
+    ["DT", "JJ", "NN", "VBD", "NNP", "CC", "NNP"],
+    ["DT", "NN", "RB", "VBD", "DT", "JJ", "JJ", "NN"],
+    ["NNP", "VBD", "IN", "DT", "JJ", "NNS", "IN", "NNP"],
+]
+
+
+def synthetic_corpus(n_paragraphs, sentences_per_paragraph=5, seed=0):
+    """
+    Generates a random, but reproducible, POS tagged corpus.
+
+    :param n_paragraphs: (int) number of paragraphs to generate
+    :param sentences_per_paragraph: (int) number of sentences per paragraph
+    :param seed: (int) random seed
+    :return: a list of paragraphs, which are lists of sentences, which are
+             lists of (word, tag) tuples. Ie, the same shape as
+             pos_tag(tokenize(text, levels_out=3)).
+    """
+    rng = random.Random(seed)
+    paragraphs = []
+    for _ in range(n_paragraphs):
+        paragraph = []
+        for _ in range(sentences_per_paragraph):
+            template = rng.choice(_SENTENCE_TEMPLATES)
+            sentence = [(rng.choice(_WORDS[tag]), tag) for tag in template]
+            word, tag = sentence[0]
+            sentence[0] = (word[0].upper() + word[1:], tag)
+            sentence.append((".", "."))
+            paragraph.append(sentence)
+        paragraphs.append(paragraph)
+    return paragraphs
+
+
+def corpus_text(tagged_paragraphs):
+    """ Turns a synthetic tagged corpus back into a string of text. """
+    return "\n".join(
+        " ".join(" ".join(word for word, tag in sentence[:-1]) + "."
+                 for sentence in paragraph)
+        for paragraph in tagged_paragraphs)
+
+
+def _strip_tags(tagged_paragraphs):
+    return [[[word for word, tag in sentence] for sentence in paragraph]
+            for paragraph in tagged_paragraphs]
+
+
+def _nest(paragraphs, levels):
+    """ Re-nests a list of paragraphs to the desired nesting level. """
+    if levels == 3:
+        return paragraphs
+    sentences = [sentence for paragraph in paragraphs for sentence in paragraph]
+    if levels == 2:
+        return sentences
+    return [token for sentence in sentences for token in sentence]
+
+
+# ==============================================================================
+#                                                                     BENCHMARKS
+# ==============================================================================
+def _raw_tokenize(text):
+    return [[nltk.word_tokenize(sentence)
+             for sentence in nltk.sent_tokenize(paragraph)]
+            for paragraph in text.split("\n") if paragraph != ""]
+
+
+def _raw_pos_tag(paragraphs):
+    return [nltk.pos_tag_sents(paragraph) for paragraph in paragraphs]
+
+
+def _raw_chunk(parser, paragraphs):
+    return [[parser.parse(sentence) for sentence in paragraph]
+            for paragraph in paragraphs]
+
+
+def _raw_named_entities(paragraphs):
+    return [list(nltk.ne_chunk_sents(paragraph)) for paragraph in paragraphs]
+
+
+def _consume(x):
+    """
+    Turns any lazy generators in the nested output of a function into lists,
+    so that the time spent generating the results is included in the
+    measurement, as it is in the raw nltk baselines.
+    """
+    if isinstance(x, list) and not isinstance(x, nltk.Tree):
+        return [_consume(item) for item in x]
+    if not isinstance(x, (nltk.Tree, tuple, str)) and hasattr(x, "__iter__"):
+        return [_consume(item) for item in x]
+    return x
+
+
+def _benchmarks():
+    """
+    Returns a list of (name, levels, setup) tuples. setup takes a synthetic
+    tagged corpus, and returns a function with no arguments that runs the
+    benchmark.
+    """
+    benchmarks = []
+
+    # Tokenize
+    for levels in (1, 2, 3):
+        benchmarks.append(("tokenize", levels,
+            lambda corpus, levels=levels:
+                (lambda text=corpus_text(corpus):
+                    simple_nlp.tokenize(text, levels_out=levels))))
+    for levels in (1, 2, 3):
+        benchmarks.append(("tokenize_fast", levels,
+            lambda corpus, levels=levels:
+                (lambda text=corpus_text(corpus):
+                    simple_nlp.tokenize(text, levels_out=levels,
+                                        engine="fast"))))
+    benchmarks.append(("nltk_tokenize", 3,
+        lambda corpus: (lambda text=corpus_text(corpus): _raw_tokenize(text))))
+
+    # POS tagging
+    for levels in (1, 2, 3):
+        benchmarks.append(("pos_tag", levels,
+            lambda corpus, levels=levels:
+                (lambda tokens=_nest(_strip_tags(corpus), levels):
+                    simple_nlp.pos_tag(tokens))))
+    benchmarks.append(("pos_tag_batch", 3,
+        lambda corpus: (lambda tokens=_strip_tags(corpus):
+            simple_nlp.pos_tag(tokens, batch=True))))
+    benchmarks.append(("nltk_pos_tag", 3,
+        lambda corpus: (lambda tokens=_strip_tags(corpus):
+            _raw_pos_tag(tokens))))
+
+    # Chunking
+    presets = [("NP1", simple_nlp.CHUNK_PATTERN_NP1),
+               ("NP2", simple_nlp.CHUNK_PATTERN_NP2),
+               ("NP3", simple_nlp.CHUNK_PATTERN_NP3)]
+    for preset_name, pattern in presets:
+        for levels in (2, 3):
+            benchmarks.append(("chunk_" + preset_name, levels,
+                lambda corpus, levels=levels, pattern=pattern:
+                    (lambda tagged=_nest(corpus, levels):
+                        simple_nlp.chunk(tagged, pattern=pattern))))
+        benchmarks.append(("nltk_chunk_" + preset_name, 3,
+            lambda corpus, pattern=pattern:
+                (lambda parser=nltk.RegexpParser(pattern):
+                    _raw_chunk(parser, corpus))))
+
+    # Chunking with all the presets at once, and with one chunk() per preset
+    patterns = dict(presets)
+    for levels in (2, 3):
+        benchmarks.append(("chunk_multi", levels,
+            lambda corpus, levels=levels:
+                (lambda tagged=_nest(corpus, levels):
+                    simple_nlp.chunk_multi(tagged, patterns))))
+        benchmarks.append(("chunk_presets", levels,
+            lambda corpus, levels=levels:
+                (lambda tagged=_nest(corpus, levels):
+                    dict((name, simple_nlp.chunk(tagged, pattern=pattern))
+                         for name, pattern in presets))))
+
+    # Named entities
+    for levels in (2, 3):
+        benchmarks.append(("named_entities", levels,
+            lambda corpus, levels=levels:
+                (lambda tagged=_nest(corpus, levels):
+                    _consume(simple_nlp.named_entities(tagged,
+                                                       binary=False)))))
+    benchmarks.append(("nltk_named_entities", 3,
+        lambda corpus: (lambda: _raw_named_entities(corpus))))
+
+    return benchmarks
+
+
+def benchmark_names():
+    """ Returns the names of all the available benchmarks. """
+    names = []
+    for name, levels, setup in _benchmarks():
+        if name not in names:
+            names.append(name)
+    return names
+
+
+# ==============================================================================
+#                                                                 RUN BENCHMARKS
+# ==============================================================================
+def _measure(func, repeat):
+    """
+    Runs func() *repeat* times and returns the fastest time in seconds, and
+    then runs it once more while tracing memory allocations to get the peak
+    memory use in bytes (None if tracemalloc is not available).
+    """
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = _timer()
+        func()
+        elapsed = _timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    peak = None
+    if tracemalloc is not None:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+
+def run_benchmarks(sizes=(10, 100, 1000), repeat=3, names=None,
+                   sentences_per_paragraph=5, verbose=False):
+    """
+    Runs the benchmarks over synthetic corpora of each size.
+
+    :param sizes: (list of ints) The corpus sizes, in number of paragraphs.
+    :param repeat: (int) Number of times each benchmark is timed. The fastest
+                   time is reported.
+    :param names: (list of strings) Only run the benchmarks with these names.
+                  Runs all of them by default. See benchmark_names()
+    :param sentences_per_paragraph: (int) sentences in each paragraph
+    :param verbose: (boolean) print each result as it is measured?
+    :return: (dict) The results, along with information about the environment
+             they were measured in. Each result has the keys: name, levels,
+             size, tokens, seconds, tokens_per_second, peak_memory_bytes and
+             error.
+    """
+    results = []
+    for size in sizes:
+        corpus = synthetic_corpus(size, sentences_per_paragraph)
+        n_tokens = sum(len(sentence) for paragraph in corpus
+                       for sentence in paragraph)
+        for name, levels, setup in _benchmarks():
+            if (names is not None) and (name not in names):
+                continue
+            result = {"name": name, "levels": levels, "size": size,
+                      "tokens": n_tokens, "seconds": None,
+                      "tokens_per_second": None, "peak_memory_bytes": None,
+                      "error": None}
+            try:
+                seconds, peak = _measure(setup(corpus), repeat)
+                result["seconds"] = seconds
+                result["tokens_per_second"] = n_tokens / seconds \
+                                              if seconds > 0 else None
+                result["peak_memory_bytes"] = peak
+            except LookupError as e:
+                # A required nltk model is not installed
+                result["error"] = _error_message(e)
+            results.append(result)
+            if verbose:
+                print(_format_result(result), file=sys.stderr)
+
+    return {"simple_nlp_version": _version(),
+            "nltk_version": nltk.__version__,
+            "python_version": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+            "results": results}
+
+
+def _error_message(e):
+    """ Returns the first meaningful line of an nltk LookupError message. """
+    for line in str(e).split("\n"):
+        line = line.strip()
+        if line and not line.startswith("*"):
+            return line
+    return repr(e)
+
+
+def _version():
+    version_file = os.path.join(os.path.dirname(__file__), "VERSION")
+    try:
+        with open(version_file) as f:
+            return f.read().strip()
+    except IOError:
+        return None
+
+
+def _format_result(result):
+    if result["error"] is not None:
+        return "{0:<22} levels={1} size={2:<6} ERROR: {3}".format(
+            result["name"], result["levels"], result["size"], result["error"])
+    peak = result["peak_memory_bytes"]
+    return "{0:<22} levels={1} size={2:<6} {3:>10.4f}s {4:>12.0f} tok/s " \
+           "{5:>10} peak".format(result["name"], result["levels"],
+                                 result["size"], result["seconds"],
+                                 result["tokens_per_second"] or 0,
+                                 "-" if peak is None else _format_bytes(peak))
+
+
+def _format_bytes(n):
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return "{0:.1f}{1}".format(n, unit)
+        n /= 1024.0
+    return "{0:.1f}GB".format(n)
+
+
+# ==============================================================================
+#                                                                        COMPARE
+# ==============================================================================
+def compare(old, new):
+    """
+    Compares two sets of results returned by run_benchmarks() (or loaded from
+    their JSON output), matching up the benchmarks by name, levels and size.
+
+    :return: (list of dicts) with the keys: name, levels, size, old_seconds,
+             new_seconds, speedup (old/new time, > 1 means new is faster),
+             old_peak_memory_bytes, new_peak_memory_bytes.
+    """
+    def key(result):
+        return (result["name"], result["levels"], result["size"])
+    old_results = dict((key(r), r) for r in old["results"])
+    comparison = []
+    for result in new["results"]:
+        previous = old_results.get(key(result))
+        if (previous is None) or previous["seconds"] is None \
+                or result["seconds"] is None:
+            continue
+        comparison.append({
+            "name": result["name"], "levels": result["levels"],
+            "size": result["size"],
+            "old_seconds": previous["seconds"],
+            "new_seconds": result["seconds"],
+            "speedup": previous["seconds"] / result["seconds"]
+                       if result["seconds"] > 0 else None,
+            "old_peak_memory_bytes": previous["peak_memory_bytes"],
+            "new_peak_memory_bytes": result["peak_memory_bytes"]})
+    return comparison
+
+
+# ==============================================================================
+#                                                   TOKENIZER ENGINE COMPATIBILITY
+# ==============================================================================
+# Text with the kinds of things that tokenizers tend to trip up on:
+# abbreviations, initials, quotes, contractions, numbers, ellipses, brackets,
+# urls and blank lines.
+REFERENCE_TEXT = (
+    "Mr. Smith paid $3.50 for a 1.5kg bag of flour at 9 a.m. on Jan. 3rd. "
+    "He didn't think it was worth it... but Mrs. O'Neil said it's the best "
+    "in the U.S.A. and she'd know.\n"
+    "\n"
+    "\"Can't we just go home?\" asked J. R. R. Tolkien (or was it "
+    "C.S. Lewis?). Nobody answered! The e-mail from info@example.com "
+    "pointed to https://www.example.com/faq?id=12, which was 404'd.\n"
+    "Dr. Who's 2nd-best episode aired in '63; it ran for 25 min., i.e. "
+    "about half an hour. Prices rose 12.5% vs. last year -- a record.\n"
+    "   \n"
+    "'Quoted,' she said. \"Nested 'quotes' too,\" he replied. What about "
+    "St. Louis, Washington D.C. and No. 10 Downing St.? They're fine.\n")
+
+
+def check_tokenizer_engines(text=REFERENCE_TEXT, levels=(1, 2, 3)):
+    """
+    Checks that tokenize() with engine="fast" gives the same tokens as the
+    default engine="nltk".
+
+    :param text: (str) the text to tokenize. Defaults to REFERENCE_TEXT
+    :param levels: (list of ints) the values of levels_out to check
+    :return: (list of dicts) one for each difference found, with the keys:
+             levels, index (position of the first differing element), nltk
+             and fast (the differing elements). Empty if the tokens match.
+    """
+    differences = []
+    for level in levels:
+        expected = simple_nlp.tokenize(text, levels_out=level, engine="nltk")
+        actual = simple_nlp.tokenize(text, levels_out=level, engine="fast")
+        if expected == actual:
+            continue
+        # Report the first element that differs
+        n = min(len(expected), len(actual))
+        index = next((i for i in range(n) if expected[i] != actual[i]), n)
+        differences.append({
+            "levels": level, "index": index,
+            "nltk": expected[index] if index < len(expected) else None,
+            "fast": actual[index] if index < len(actual) else None})
+    return differences
+
+
+# ==============================================================================
+#                                                                           MAIN
+# ==============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m simple_nlp.benchmark",
+        description="Benchmark the simple_nlp wrapper functions against raw "
+                    "nltk calls, on synthetic corpora.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000],
+                        help="corpus sizes, in paragraphs (default: 10 100 1000)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of timing runs per benchmark (default: 3)")
+    parser.add_argument("--only", nargs="+", default=None, metavar="NAME",
+                        choices=benchmark_names(),
+                        help="only run these benchmarks")
+    parser.add_argument("--output", default=None,
+                        help="file to write the JSON results to "
+                             "(default: standard output)")
+    parser.add_argument("--compare", default=None, metavar="OLD_JSON",
+                        help="JSON results of a previous run to compare with")
+    parser.add_argument("--check-tokenizers", nargs="?", const="",
+                        default=None, metavar="TEXT_FILE",
+                        help="instead of benchmarking, check that the 'fast' "
+                             "tokenizer engine gives the same tokens as the "
+                             "default one, on TEXT_FILE, or on a built in "
+                             "reference text")
+    args = parser.parse_args(argv)
+
+    if args.check_tokenizers is not None:
+        text = REFERENCE_TEXT
+        if args.check_tokenizers:
+            with open(args.check_tokenizers) as f:
+                text = f.read()
+        differences = check_tokenizer_engines(text)
+        for difference in differences:
+            print("levels={0} element {1}:\n    nltk: {2!r}\n    fast: {3!r}"
+                  .format(difference["levels"], difference["index"],
+                          difference["nltk"], difference["fast"]),
+                  file=sys.stderr)
+        print("Tokenizer engines {0}".format(
+            "differ" if differences else "match"), file=sys.stderr)
+        return 1 if differences else 0
+
+    results = run_benchmarks(sizes=args.sizes, repeat=args.repeat,
+                             names=args.only, verbose=True)
+    if args.compare is not None:
+        with open(args.compare) as f:
+            results["comparison"] = compare(json.load(f), results)
+        for row in results["comparison"]:
+            print("{0:<22} levels={1} size={2:<6} speedup x{3:.2f}".format(
+                row["name"], row["levels"], row["size"], row["speedup"] or 0),
+                file=sys.stderr)
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""====================================================
+                    CACHE
+
+Small, thread safe caching utilities used to avoid recomputing expensive
+objects, such as compiled chunkers, and the results of tagging sentences.
+=======================================================
+"""
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict, namedtuple
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+# ==============================================================================
+#                                                                      LRU CACHE
+# ==============================================================================
+class LRUCache(object):
+    """
+    A bounded, thread safe mapping that evicts the least recently used item
+    once it holds more than *maxsize* items. It also keeps count of the number
+    of cache hits and misses.
+
+    :param maxsize: (int) Maximum number of items to hold. If None, then the
+                    cache grows without bound.
+
+    :examples:
+        cache = LRUCache(maxsize=2)
+        parser = cache.get_or_create(pattern, lambda: nltk.RegexpParser(pattern))
+        cache.info()    # CacheInfo(hits=0, misses=1, maxsize=2, currsize=1)
+    """
+    def __init__(self, maxsize=128):
+        assert (maxsize is None) or (isinstance(maxsize, int) and maxsize >= 0),\
+            "Argument *maxsize* in LRUCache() must be None or a non-negative " \
+            "integer"
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        """
+        Returns the item stored under *key*, marking it as the most recently
+        used, or *default* if it is not in the cache.
+        """
+        with self._lock:
+            try:
+                value = self._items.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._items[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Stores *value* under *key*, evicting the least recently used items if
+        the cache is full.
+        """
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = value
+            if self.maxsize is not None:
+                while len(self._items) > self.maxsize:
+                    self._items.popitem(last=False)
+
+    def get_or_create(self, key, factory):
+        """
+        Returns the item stored under *key*. If it is not in the cache, then
+        it calls factory() to create it, and stores the result.
+
+        The factory is called outside of the lock, so slow factories do not
+        block other threads from using the cache.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """ Removes all items, and resets the hit and miss counts. """
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """ Returns a CacheInfo tuple with the hit/miss statistics. """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize,
+                             len(self._items))
+
+
+# ==============================================================================
+#                                                                   RESULT CACHE
+# ==============================================================================
+ResultCacheInfo = namedtuple("ResultCacheInfo", ["hits", "disk_hits", "misses",
+                                                 "hit_rate", "currsize",
+                                                 "maxsize"])
+
+
+class ResultCache(object):
+    """
+    Memoizes the output of sentence level functions (such as POS tagging or
+    named entity chunking), so that sentences that have been seen before are
+    not processed again.
+
+    Results are keyed by a hash of the sentence's tokens, together with a name
+    that identifies the function that produced them, and any extra arguments
+    (such as *binary*). The most recently used results are kept in memory, and
+    optionally, all results are also saved to an SQLite database on disk, so
+    they can be reused across runs and processes.
+
+    :param maxsize: (int) Maximum number of results to keep in memory.
+    :param path: (str) Path to an SQLite database file used to store results
+                 on disk. If None, then results are only kept in memory.
+
+    :examples:
+        cache = ResultCache(maxsize=100000, path="tagged_cache.sqlite")
+        tag_sents = cache.cached_sents_func(nltk.pos_tag_sents, "pos_tag")
+        tag_sents([["Hello", "world"], ["Hello", "world"]])
+        cache.info()
+    """
+    def __init__(self, maxsize=100000, path=None):
+        self.memory = LRUCache(maxsize=maxsize)
+        self.path = path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._store = None
+
+    # --------------------------------------------------------------------------
+    #                                                                       KEYS
+    # --------------------------------------------------------------------------
+    @staticmethod
+    def make_key(namespace, sentence, **kwargs):
+        """
+        Returns a hash that identifies the result of processing *sentence*
+        with the function identified by *namespace* and the extra arguments
+        in **kwargs.
+        """
+        content = repr((namespace, tuple(sentence), sorted(kwargs.items())))
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    # --------------------------------------------------------------------------
+    #                                                                 GET AND PUT
+    # --------------------------------------------------------------------------
+    def get(self, key, default=None):
+        """
+        Returns the result stored under *key*, looking in memory first, and
+        then on disk. Returns *default* if it is not in the cache.
+        """
+        missing = object()
+        value = self.memory.get(key, missing)
+        if value is not missing:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        store = self._get_store()
+        if store is not None:
+            value = store.get(key, missing)
+            if value is not missing:
+                self.memory.put(key, value)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """ Stores *value* under *key*, in memory, and on disk if enabled. """
+        self.put_many([(key, value)])
+
+    def put_many(self, items):
+        """
+        Stores a list of (key, value) pairs. When saving to disk, they are all
+        written in a single transaction.
+        """
+        for key, value in items:
+            self.memory.put(key, value)
+        store = self._get_store()
+        if store is not None:
+            store.put_many(items)
+
+    def _get_store(self):
+        if self.path is None:
+            return None
+        # Each process opens its own connection to the database. The lock
+        # stops several threads from opening one each at the same time.
+        store = self._store
+        if (store is None) or (store.pid != os.getpid()):
+            with self._lock:
+                store = self._store
+                if (store is None) or (store.pid != os.getpid()):
+                    store = SQLiteStore(self.path)
+                    self._store = store
+        return store
+
+    # --------------------------------------------------------------------------
+    #                                                            CACHED FUNCTIONS
+    # --------------------------------------------------------------------------
+    def cached_sents_func(self, func, namespace, copy=None):
+        """
+        Wraps a function that processes a list of sentences (such as
+        nltk.pos_tag_sents), so that only the sentences that are not already
+        in the cache get passed on to it.
+
+        :param func: The function to wrap. It must take a list of sentences
+                     as its first argument and return a list of results, one
+                     per sentence.
+        :param namespace: (str) A name that identifies the function (and the
+                     model it uses), so results from different functions are
+                     never mixed up.
+        :param copy: A function used to copy a result before it is returned,
+                     so that callers modifying their results do not modify
+                     the cached ones. (optional)
+        :return: the wrapped function
+        """
+        def cached_func(sentences, **kwargs):
+            sentences = list(sentences)
+            keys = [self.make_key(namespace, sentence, **kwargs)
+                    for sentence in sentences]
+            missing = object()
+            results = [self.get(key, missing) for key in keys]
+            todo = [i for i, result in enumerate(results) if result is missing]
+            if todo:
+                computed = list(func([sentences[i] for i in todo], **kwargs))
+                for i, result in zip(todo, computed):
+                    results[i] = result
+                self.put_many([(keys[i], results[i]) for i in todo])
+            if copy is not None:
+                results = [copy(result) for result in results]
+            return results
+        return cached_func
+
+    # --------------------------------------------------------------------------
+    #                                                                 STATISTICS
+    # --------------------------------------------------------------------------
+    def info(self):
+        """
+        Returns a ResultCacheInfo tuple with the fields: hits, disk_hits,
+        misses, hit_rate, currsize (number of results in memory), maxsize.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            hit_rate = float(self.hits) / total if total > 0 else 0.0
+            return ResultCacheInfo(self.hits, self.disk_hits, self.misses,
+                                   hit_rate, len(self.memory),
+                                   self.memory.maxsize)
+
+    def clear(self):
+        """
+        Removes all results held in memory, and resets the statistics. Results
+        stored on disk are kept.
+        """
+        self.memory.clear()
+        with self._lock:
+            self.hits = 0
+            self.disk_hits = 0
+            self.misses = 0
+
+    def close(self):
+        """ Closes the connection to the on disk database, if it is open. """
+        with self._lock:
+            store, self._store = self._store, None
+        if store is not None:
+            store.close()
+
+
+# ==============================================================================
+#                                                                   SQLITE STORE
+# ==============================================================================
+class SQLiteStore(object):
+    """
+    A simple persistent key/value store, backed by an SQLite database. Values
+    are pickled. Used by ResultCache to keep results across runs.
+
+    :param path: (str) Path to the database file. It is created if it does
+                 not exist.
+    """
+    def __init__(self, path):
+        import sqlite3
+        self.path = path
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, value BLOB)")
+            self._connection.commit()
+
+    def get(self, key, default=None):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return default
+        return pickle.loads(bytes(row[0]))
+
+    def put(self, key, value):
+        self.put_many([(key, value)])
+
+    def put_many(self, items):
+        rows = [(key, memoryview(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+                for key, value in items]
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)",
+                rows)
+            self._connection.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
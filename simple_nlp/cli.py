@@ -0,0 +1,427 @@
+"""====================================================
+                    CLI
+
+The simple-nlp command line tool. Runs the tokenize -> pos_tag -> chunk
+stages over a whole collection of documents, read from directories of text
+files or from JSONL files, and writes the results out as JSONL, or as a
+corpus directory (see save_corpus()).
+
+    simple-nlp docs/ -o chunked.jsonl --workers 8 --progress
+    simple-nlp articles.jsonl --stages tokenize pos_tag --format corpus \\
+        -o tagged_corpus
+    simple-nlp articles.jsonl -o out.jsonl --checkpoint out.ckpt --resume
+
+Run simple-nlp --help for all of the options.
+=======================================================
+"""
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import argparse
+import collections
+import fnmatch
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing.pool import ThreadPool
+
+import simple_nlp
+from simple_nlp.corpus import CorpusWriter
+from simple_nlp.pipeline import STAGES, Pipeline
+
+# Names that can be given to --pattern instead of a chunking pattern
+PATTERN_PRESETS = {"NP1": simple_nlp.CHUNK_PATTERN_NP1,
+                   "NP2": simple_nlp.CHUNK_PATTERN_NP2,
+                   "NP3": simple_nlp.CHUNK_PATTERN_NP3}
+
+# Size of the buffers used for reading and writing files
+IO_BUFFER_SIZE = 1 << 20
+
+
+# ==============================================================================
+#                                                                          INPUT
+# ==============================================================================
+def _iter_sources(inputs, input_format, file_pattern, text_field="text",
+                  id_field="id"):
+    """
+    Generator that yields a (document_id, path, text) tuple for each document
+    in the inputs, in a fixed order. For documents stored in their own file,
+    text is None, and path is the file to read it from. For documents from
+    JSONL files, text is the text of the document, and path is None.
+    """
+    for source in inputs:
+        if source == "-":
+            for item in _iter_jsonl(sys.stdin, "<stdin>", text_field,
+                                    id_field):
+                yield item
+        elif os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for name in sorted(files):
+                    if fnmatch.fnmatch(name, file_pattern):
+                        path = os.path.join(root, name)
+                        yield (os.path.relpath(path, source), path, None)
+        elif _is_jsonl(source, input_format):
+            with io.open(source, encoding="utf-8",
+                         buffering=IO_BUFFER_SIZE) as f:
+                for item in _iter_jsonl(f, source, text_field, id_field):
+                    yield item
+        else:
+            yield (source, source, None)
+
+
+def _is_jsonl(path, input_format):
+    if input_format == "auto":
+        return os.path.splitext(path)[1].lower() in (".jsonl", ".ndjson")
+    return input_format == "jsonl"
+
+
+def _iter_jsonl(f, name, text_field, id_field):
+    """
+    Yields a (document_id, None, text) tuple for each line of a JSONL file.
+    Each line is either a JSON string, or an object with the text of the
+    document in its *text_field*. Documents without an *id_field* are
+    identified by the file name and line number.
+    """
+    for i, line in enumerate(f):
+        if line.strip() == "":
+            continue
+        record = json.loads(line)
+        default_id = "{0}:{1}".format(name, i + 1)
+        if isinstance(record, dict):
+            yield (record.get(id_field, default_id), None,
+                   record[text_field])
+        else:
+            yield (default_id, None, record)
+
+
+def _read_file(path):
+    with io.open(path, encoding="utf-8", buffering=IO_BUFFER_SIZE) as f:
+        return f.read()
+
+
+def _iter_documents(sources, skip=0, readers=4, read_ahead=64):
+    """
+    Generator that yields (document_id, text) for each document, skipping the
+    first *skip* documents without reading them. Files are read a batch of
+    *read_ahead* at a time, by a pool of *readers* threads.
+    """
+    pool = ThreadPool(readers)
+    try:
+        batch = []
+        for i, source in enumerate(sources):
+            if i < skip:
+                continue
+            batch.append(source)
+            if len(batch) >= read_ahead:
+                for document in _read_batch(pool, batch):
+                    yield document
+                batch = []
+        for document in _read_batch(pool, batch):
+            yield document
+    finally:
+        pool.terminate()
+
+
+def _read_batch(pool, batch):
+    paths = [path for document_id, path, text in batch if text is None]
+    contents = iter(pool.map(_read_file, paths))
+    return [(document_id, next(contents) if text is None else text)
+            for document_id, path, text in batch]
+
+
+# ==============================================================================
+#                                                                         OUTPUT
+# ==============================================================================
+def to_json(x):
+    """
+    Converts the output of tokenize(), pos_tag() or chunk() into something
+    that can be serialized as JSON. Trees become {"label": ..., "children":
+    [...]} dictionaries, and (word, tag) tuples become [word, tag] lists.
+    """
+    if isinstance(x, simple_nlp.nltk.Tree):
+        return {"label": x.label(), "children": [to_json(child)
+                                                 for child in x]}
+    if isinstance(x, (list, tuple)):
+        return [to_json(item) for item in x]
+    return x
+
+
+class _JSONLOutput(object):
+    """
+    Writes one JSON object per document, as {"id": ..., "result": ...}.
+    Lines are buffered and written in bulk by flush().
+    """
+    def __init__(self, path, resume_position=None):
+        if path == "-":
+            self.file = sys.stdout
+        else:
+            mode = "w" if resume_position is None else "r+"
+            self.file = io.open(path, mode, encoding="utf-8",
+                                buffering=IO_BUFFER_SIZE)
+            if resume_position is not None:
+                # Throw away anything written after the last checkpoint
+                self.file.seek(resume_position)
+                self.file.truncate()
+        self.lines = []
+
+    def write(self, document_id, result):
+        self.lines.append(json.dumps({"id": document_id,
+                                      "result": to_json(result)}) + "\n")
+
+    def flush(self):
+        """ Writes out the buffered lines, and returns the file position """
+        self.file.write("".join(self.lines))
+        self.lines = []
+        self.file.flush()
+        return self.file.tell() if self.file is not sys.stdout else None
+
+    def close(self):
+        self.flush()
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class _CorpusOutput(object):
+    """
+    Saves the documents to a corpus directory, along with a document_ids.txt
+    file listing the id of each document.
+    """
+    def __init__(self, path):
+        self.writer = CorpusWriter(path)
+        self.ids = io.open(os.path.join(path, "document_ids.txt"), "w",
+                           encoding="utf-8", buffering=IO_BUFFER_SIZE)
+
+    def write(self, document_id, result):
+        self.writer.add(result)
+        self.ids.write(u"{0}\n".format(document_id))
+
+    def flush(self):
+        return None
+
+    def close(self):
+        self.writer.close()
+        self.ids.close()
+
+
+# ==============================================================================
+#                                                                    CHECKPOINTS
+# ==============================================================================
+def _load_checkpoint(path):
+    """ Returns the saved checkpoint, or None if there is not one. """
+    if (path is None) or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_checkpoint(path, documents_done, output_position):
+    """
+    Records how many documents have been written so far, and where the end
+    of the output file was at that point. The file is replaced atomically so
+    that a crash can never leave a half written checkpoint.
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump({"documents_done": documents_done,
+                   "output_position": output_position}, f)
+    if hasattr(os, "replace"):
+        os.replace(temp_path, path)
+    else:
+        os.rename(temp_path, path)
+
+
+# ==============================================================================
+#                                                                       PROGRESS
+# ==============================================================================
+class _Progress(object):
+    """ Keeps count of the work done, and reports it on standard error. """
+    def __init__(self, enabled, interval=2.0, already_done=0):
+        self.enabled = enabled
+        self.interval = interval
+        self.already_done = already_done
+        self.documents = 0
+        self.characters = 0
+        self.start = time.time()
+        self.last_report = self.start
+
+    def update(self, n_characters):
+        self.documents += 1
+        self.characters += n_characters
+        if self.enabled and (time.time() - self.last_report >= self.interval):
+            self.report()
+
+    def report(self, final=False):
+        self.last_report = time.time()
+        elapsed = max(self.last_report - self.start, 1e-9)
+        print("{0}{1} documents ({2} this run) in {3:.1f}s: {4:.1f} docs/s, "
+              "{5:.2f} MB/s".format("Done: " if final else "",
+                                    self.already_done + self.documents,
+                                    self.documents, elapsed,
+                                    self.documents / elapsed,
+                                    self.characters / elapsed / 1e6),
+              file=sys.stderr)
+
+
+# ==============================================================================
+#                                                                           MAIN
+# ==============================================================================
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog="simple-nlp",
+        description="Tokenize, POS tag and chunk a collection of documents.")
+    parser.add_argument("inputs", nargs="+", metavar="INPUT",
+                        help="directories of text files, text files, or JSONL "
+                             "files with one document per line. '-' reads "
+                             "JSONL from standard input")
+    parser.add_argument("-o", "--output", default="-",
+                        help="output file (JSONL) or directory (corpus "
+                             "format). Default: standard output")
+    parser.add_argument("--format", default="jsonl", choices=["jsonl", "corpus"],
+                        help="output format (default: jsonl). The corpus "
+                             "format can only hold tokenized or tagged "
+                             "output, not chunks")
+
+    group = parser.add_argument_group("input options")
+    group.add_argument("--input-format", default="auto",
+                       choices=["auto", "text", "jsonl"],
+                       help="how to read files given as inputs. 'auto' treats "
+                            "files ending in .jsonl or .ndjson as JSONL, and "
+                            "anything else as a single text document")
+    group.add_argument("--file-pattern", default="*.txt",
+                       help="only read files in directories that match this "
+                            "pattern (default: *.txt)")
+    group.add_argument("--text-field", default="text",
+                       help="field holding the text in JSONL records")
+    group.add_argument("--id-field", default="id",
+                       help="field holding the document id in JSONL records")
+
+    group = parser.add_argument_group("processing options")
+    group.add_argument("--stages", nargs="+", default=list(STAGES),
+                       choices=STAGES, help="stages to run (default: all)")
+    group.add_argument("--levels", type=int, default=3, choices=[1, 2, 3],
+                       help="nesting level of the output (default: 3)")
+    group.add_argument("--pattern", default="NP2",
+                       help="chunking pattern, or the name of a preset: NP1, "
+                            "NP2, NP3 (default: NP2)")
+    group.add_argument("--ne", action="store_true",
+                       help="use named entity chunking instead of a pattern")
+    group.add_argument("--binary", action="store_true",
+                       help="use binary named entity classification")
+    group.add_argument("--engine", default="nltk",
+                       choices=simple_nlp.TOKENIZER_ENGINES,
+                       help="tokenizer engine (default: nltk)")
+
+    group = parser.add_argument_group("performance options")
+    group.add_argument("--workers", type=int, default=None,
+                       help="number of worker processes (default: number of "
+                            "CPUs)")
+    group.add_argument("--chunksize", type=int, default=16,
+                       help="documents sent to a worker at a time")
+    group.add_argument("--max-pending", type=int, default=None,
+                       help="most documents read ahead of the output "
+                            "(default: 2 * workers * chunksize)")
+    group.add_argument("--readers", type=int, default=4,
+                       help="number of threads reading input files")
+    group.add_argument("--flush-every", type=int, default=256,
+                       help="documents to buffer before writing them out "
+                            "(and saving a checkpoint)")
+
+    group = parser.add_argument_group("checkpoints and progress")
+    group.add_argument("--checkpoint", default=None, metavar="FILE",
+                       help="file to record progress in, so an interrupted "
+                            "run can be resumed. Only for JSONL output to a "
+                            "file")
+    group.add_argument("--resume", action="store_true",
+                       help="carry on from the checkpoint, rather than "
+                            "starting again")
+    group.add_argument("--progress", action="store_true",
+                       help="report progress on standard error")
+    group.add_argument("--progress-interval", type=float, default=2.0,
+                       help="seconds between progress reports")
+    return parser
+
+
+def main(argv=None):
+    parser = _parser()
+    args = parser.parse_args(argv)
+
+    if args.format == "corpus":
+        if args.stages[-1] == "chunk":
+            parser.error("the corpus format cannot hold the output of the "
+                         "chunk stage. Use --stages tokenize pos_tag")
+        if args.output == "-":
+            parser.error("the corpus format needs an output directory (-o)")
+    if args.checkpoint is not None:
+        if (args.format != "jsonl") or (args.output == "-"):
+            parser.error("--checkpoint can only be used with JSONL output to "
+                         "a file")
+    if args.resume and (args.checkpoint is None):
+        parser.error("--resume needs a --checkpoint file")
+    workers = args.workers or multiprocessing.cpu_count()
+    max_pending = args.max_pending or 2 * workers * args.chunksize
+    if max_pending < args.chunksize:
+        parser.error("--max-pending must be at least --chunksize")
+
+    pipeline = Pipeline(stages=args.stages, levels_out=args.levels,
+                        pattern=PATTERN_PRESETS.get(args.pattern, args.pattern),
+                        ne=args.ne, binary=args.binary, engine=args.engine)
+
+    checkpoint = _load_checkpoint(args.checkpoint) if args.resume else None
+    skip = checkpoint["documents_done"] if checkpoint else 0
+    if args.format == "corpus":
+        output = _CorpusOutput(args.output)
+    else:
+        output = _JSONLOutput(args.output, checkpoint["output_position"]
+                              if checkpoint else None)
+
+    # The ids are kept aside while the texts go through the worker pool. The
+    # results come back in order, so they can be matched up again.
+    # process_corpus() takes at most max_pending texts ahead of the results,
+    # which bounds the pending ids, and the files read ahead are bounded too.
+    sources = _iter_sources(args.inputs, args.input_format, args.file_pattern,
+                            args.text_field, args.id_field)
+    documents = _iter_documents(sources, skip=skip, readers=args.readers,
+                                read_ahead=max(min(args.flush_every,
+                                                   max_pending), 1))
+    pending = collections.deque()
+
+    def texts():
+        for document_id, text in documents:
+            assert len(pending) < max_pending, \
+                "more than max_pending documents taken by process_corpus()"
+            # JSONL records can also hold documents that are already tokenized
+            pending.append((document_id,
+                            len(text) if isinstance(text, str) else 0))
+            yield text
+
+    progress = _Progress(args.progress, args.progress_interval, skip)
+    done = skip
+    try:
+        for result in pipeline.process_corpus(texts(), workers=workers,
+                                              chunksize=args.chunksize,
+                                              max_pending=max_pending):
+            document_id, n_characters = pending.popleft()
+            output.write(document_id, result)
+            done += 1
+            progress.update(n_characters)
+            if done % args.flush_every == 0:
+                position = output.flush()
+                if args.checkpoint is not None:
+                    _save_checkpoint(args.checkpoint, done, position)
+    finally:
+        position = output.flush()
+        output.close()
+        if args.checkpoint is not None:
+            _save_checkpoint(args.checkpoint, done, position)
+    if args.progress:
+        progress.report(final=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,381 @@
+"""====================================================
+                    COMPACT
+
+A compact, array backed representation of tokenized (and optionally POS
+tagged) text. Rather than nested lists of strings and tuples, all the tokens
+are stored in one flat string, with integer arrays marking where each token,
+sentence and paragraph ends, and tags stored as small integer codes.
+=======================================================
+"""
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import threading
+from array import array
+
+# Array typecodes used for offsets and tag codes
+_OFFSET_TYPE = "I"
+_TAG_TYPE = "H"
+
+
+# ==============================================================================
+#                                                                 TAG VOCABULARY
+# ==============================================================================
+class TagVocabulary(object):
+    """
+    Maps POS tags to small integer codes and back again. Each distinct tag is
+    stored only once, no matter how many tokens use it. New tags are given the
+    next free code the first time they are seen.
+
+    :param tags: (list of strings) tags to add to the vocabulary straight away
+
+    :examples:
+        vocab = TagVocabulary()
+        vocab.encode("NN")      # 0
+        vocab.encode("JJ")      # 1
+        vocab.decode(0)         # "NN"
+    """
+    def __init__(self, tags=()):
+        self.tags = []
+        self.codes = {}
+        self._lock = threading.Lock()
+        for tag in tags:
+            self.encode(tag)
+
+    def __len__(self):
+        return len(self.tags)
+
+    def __contains__(self, tag):
+        return tag in self.codes
+
+    def encode(self, tag):
+        """ Returns the integer code for *tag*, adding it if it is new. """
+        code = self.codes.get(tag)
+        if code is None:
+            with self._lock:
+                code = self.codes.get(tag)
+                if code is None:
+                    code = len(self.tags)
+                    self.tags.append(tag)
+                    self.codes[tag] = code
+        return code
+
+    def decode(self, code):
+        """ Returns the tag string for the integer *code*. """
+        return self.tags[code]
+
+    def __getstate__(self):
+        return {"tags": self.tags}
+
+    def __setstate__(self, state):
+        self.__init__(state["tags"])
+
+
+# The vocabulary shared by all compact documents unless told otherwise.
+DEFAULT_VOCABULARY = TagVocabulary()
+
+
+# ==============================================================================
+#                                                                  NESTING LEVEL
+# ==============================================================================
+def _nesting_level(x):
+    """
+    Returns how many levels deep the tokens in the nested list x are. Empty
+    lists (eg a whitespace only line, which tokenize() turns into a paragraph
+    with no sentences) are skipped over, so the level is read from the first
+    token. If there are no tokens at all, the level is read from the nesting
+    of the first elements.
+    """
+    found = _first_token(x)
+    if found is not None:
+        return found[0]
+    level = 1
+    while (len(x) > 0) and isinstance(x[0], list):
+        x = x[0]
+        level += 1
+    return level
+
+
+def _first_token(x, level=1):
+    """
+    Returns (level, token) for the first element of the nested list x that
+    is not a list, or None if there is not one.
+    """
+    for item in x:
+        if not isinstance(item, list):
+            return level, item
+        found = _first_token(item, level + 1)
+        if found is not None:
+            return found
+    return None
+
+
+# ==============================================================================
+#                                                               COMPACT DOCUMENT
+# ==============================================================================
+class CompactDocument(object):
+    """
+    A memory efficient stand-in for the nested lists returned by tokenize()
+    and pos_tag().
+
+    It behaves like the nested list it replaces: you can iterate over it, take
+    its len(), and index into it, and you get back the same lists of token
+    strings (or lists of (word, tag) tuples, if it has been tagged) that the
+    nested list would contain. pos_tag(), chunk() and named_entities() accept
+    it in place of a nested list.
+
+    Internally it stores:
+
+        - buffer:           all of the tokens joined together in one string
+        - token_ends:       array with the end offset of each token in buffer
+        - sentence_bounds:  array with the index of the first token of each
+                            sentence, plus the total number of tokens
+        - paragraph_bounds: array with the index of the first sentence of
+                            each paragraph, plus the total number of sentences
+        - tags:             array with the tag code of each token (or None)
+
+    You will not normally create one directly, instead use
+    tokenize(text, compact=True), or CompactDocument.from_nested(x).
+
+    :param levels: (int) The nesting level that the document mimics. (1) a
+                   flat list of tokens, (2) a list of sentences, (3) a list of
+                   paragraphs.
+    :param vocabulary: (TagVocabulary) used to encode the tags.
+    """
+    def __init__(self, levels=3, vocabulary=None):
+        assert levels in (1, 2, 3), \
+            "Argument *levels* in CompactDocument() can only take the values " \
+            "1, 2 or 3"
+        self.levels = levels
+        self.vocabulary = DEFAULT_VOCABULARY if vocabulary is None \
+                          else vocabulary
+        self.buffer = ""
+        self.token_ends = array(_OFFSET_TYPE)
+        self.sentence_bounds = array(_OFFSET_TYPE, [0])
+        self.paragraph_bounds = array(_OFFSET_TYPE, [0])
+        self.tags = None
+
+    # --------------------------------------------------------------------------
+    #                                                               CONSTRUCTION
+    # --------------------------------------------------------------------------
+    @classmethod
+    def from_paragraphs(cls, paragraphs, levels=3, vocabulary=None):
+        """
+        Builds a compact document from an iterable of paragraphs, where each
+        paragraph is a list of sentences, and each sentence is a list of token
+        strings or a list of (word, tag) tuples. Only one paragraph needs to
+        be held in memory at a time.
+
+        :param paragraphs: (iterable) the paragraphs of the document
+        :param levels: (int) the nesting level the document should mimic.
+        :param vocabulary: (TagVocabulary) used to encode the tags.
+        :return: a CompactDocument
+        """
+        doc = cls(levels=levels, vocabulary=vocabulary)
+        pieces = []
+        end = 0
+        n_tokens = 0
+        tags = None
+        for paragraph in paragraphs:
+            paragraph_pieces = []
+            for sentence in paragraph:
+                for token in sentence:
+                    if isinstance(token, tuple):
+                        token, tag = token
+                        if tags is None:
+                            assert n_tokens == 0, \
+                                "All tokens in a CompactDocument must either " \
+                                "be tagged or not tagged"
+                            tags = array(_TAG_TYPE)
+                        tags.append(doc.vocabulary.encode(tag))
+                    else:
+                        assert tags is None, \
+                            "All tokens in a CompactDocument must either be " \
+                            "tagged or not tagged"
+                    paragraph_pieces.append(token)
+                    end += len(token)
+                    n_tokens += 1
+                    doc.token_ends.append(end)
+                doc.sentence_bounds.append(n_tokens)
+            # Join each paragraph as we go, to avoid keeping lots of small
+            # string objects around
+            pieces.append("".join(paragraph_pieces))
+            doc.paragraph_bounds.append(len(doc.sentence_bounds) - 1)
+        doc.buffer = "".join(pieces)
+        doc.tags = tags
+        return doc
+
+    @classmethod
+    def from_nested(cls, x, vocabulary=None):
+        """
+        Builds a compact document from a nested list of tokens or POS tagged
+        tuples, such as the output of tokenize() or pos_tag(). The nesting
+        level is detected from the first token, skipping over any empty
+        paragraphs before it.
+
+        :param x: (list) nested list of tokens or (word, tag) tuples
+        :param vocabulary: (TagVocabulary) used to encode the tags.
+        :return: a CompactDocument that mimics x
+        """
+        assert isinstance(x, list), \
+            "Argument *x* in CompactDocument.from_nested() must be a list"
+        levels = _nesting_level(x)
+        assert levels <= 3, \
+            "The elements in your list must be no deeper than 3 levels deep."
+
+        if levels == 1:
+            paragraphs = [[x]]
+        elif levels == 2:
+            paragraphs = [x]
+        else:
+            paragraphs = x
+        return cls.from_paragraphs(paragraphs, levels=levels,
+                                   vocabulary=vocabulary)
+
+    def with_tags(self, tags):
+        """
+        Returns a new document with the same tokens and structure, but tagged
+        with *tags*. The token buffer and offset arrays are shared, not copied.
+
+        :param tags: (iterable of strings) one tag for every token, in order.
+        :return: a CompactDocument
+        """
+        doc = self.__class__(levels=self.levels, vocabulary=self.vocabulary)
+        doc.buffer = self.buffer
+        doc.token_ends = self.token_ends
+        doc.sentence_bounds = self.sentence_bounds
+        doc.paragraph_bounds = self.paragraph_bounds
+        encode = self.vocabulary.encode
+        doc.tags = array(_TAG_TYPE, [encode(tag) for tag in tags])
+        assert len(doc.tags) == len(self.token_ends), \
+            "Argument *tags* in with_tags() must have one tag for every token"
+        return doc
+
+    # --------------------------------------------------------------------------
+    #                                                                      SIZES
+    # --------------------------------------------------------------------------
+    @property
+    def is_tagged(self):
+        return self.tags is not None
+
+    @property
+    def n_tokens(self):
+        return len(self.token_ends)
+
+    @property
+    def n_sentences(self):
+        return len(self.sentence_bounds) - 1
+
+    @property
+    def n_paragraphs(self):
+        return len(self.paragraph_bounds) - 1
+
+    # --------------------------------------------------------------------------
+    #                                                                      VIEWS
+    # --------------------------------------------------------------------------
+    def token(self, i):
+        """
+        Returns token i, as a string, or as a (word, tag) tuple if the document
+        is tagged.
+        """
+        start = self.token_ends[i - 1] if i > 0 else 0
+        word = self.buffer[start:self.token_ends[i]]
+        if self.tags is None:
+            return word
+        return (word, self.vocabulary.decode(self.tags[i]))
+
+    def tokens(self, start=0, stop=None):
+        """ Returns a list of the tokens from index start up to stop. """
+        if stop is None:
+            stop = self.n_tokens
+        ends = self.token_ends
+        buffer = self.buffer
+        offset = ends[start - 1] if start > 0 else 0
+        words = []
+        for i in range(start, stop):
+            words.append(buffer[offset:ends[i]])
+            offset = ends[i]
+        if self.tags is None:
+            return words
+        decode = self.vocabulary.tags
+        return [(word, decode[code])
+                for word, code in zip(words, self.tags[start:stop])]
+
+    def sentence(self, i):
+        """ Returns sentence i as a list of tokens. """
+        return self.tokens(self.sentence_bounds[i], self.sentence_bounds[i + 1])
+
+    def paragraph(self, i):
+        """ Returns paragraph i as a list of sentences. """
+        return [self.sentence(j) for j in range(self.paragraph_bounds[i],
+                                                self.paragraph_bounds[i + 1])]
+
+    def sentences(self):
+        """ Generator that yields each sentence as a list of tokens. """
+        for i in range(self.n_sentences):
+            yield self.sentence(i)
+
+    def paragraphs(self):
+        """ Generator that yields each paragraph as a list of sentences. """
+        for i in range(self.n_paragraphs):
+            yield self.paragraph(i)
+
+    def tolist(self):
+        """ Returns the document as the nested list that it mimics. """
+        if self.levels == 1:
+            return self.tokens()
+        elif self.levels == 2:
+            return list(self.sentences())
+        else:
+            return list(self.paragraphs())
+
+    # --------------------------------------------------------------------------
+    #                                                      LIST-LIKE BEHAVIOUR
+    # --------------------------------------------------------------------------
+    def _element(self, i):
+        if self.levels == 1:
+            return self.token(i)
+        elif self.levels == 2:
+            return self.sentence(i)
+        else:
+            return self.paragraph(i)
+
+    def __len__(self):
+        if self.levels == 1:
+            return self.n_tokens
+        elif self.levels == 2:
+            return self.n_sentences
+        else:
+            return self.n_paragraphs
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._element(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("CompactDocument index out of range")
+        return self._element(i)
+
+    def __iter__(self):
+        if self.levels == 1:
+            return iter(self.tokens())
+        elif self.levels == 2:
+            return self.sentences()
+        else:
+            return self.paragraphs()
+
+    def __eq__(self, other):
+        if isinstance(other, CompactDocument):
+            other = other.tolist()
+        return self.tolist() == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return "<CompactDocument levels={0} paragraphs={1} sentences={2} " \
+               "tokens={3} tagged={4}>".format(self.levels, self.n_paragraphs,
+                                               self.n_sentences, self.n_tokens,
+                                               self.is_tagged)
@@ -0,0 +1,448 @@
+"""====================================================
+                    CORPUS
+
+An on-disk format for storing large tokenized or POS tagged corpora, and
+reading them back through memory maps, so that loading a corpus is instant,
+and only the parts of it that are actually used get read from disk.
+
+A corpus is a directory of columns, each stored as a flat binary array:
+
+    - text.bin:             all of the tokens, UTF-8 encoded, one after the
+                            other
+    - token_ends.bin:       the byte offset in text.bin of the end of each
+                            token
+    - tags.bin:             the tag code of each token (only if tagged)
+    - sentence_bounds.bin:  the index of the first token of each sentence,
+                            plus the total number of tokens
+    - paragraph_bounds.bin: the index of the first sentence of each
+                            paragraph, plus the total number of sentences
+    - document_bounds.bin:  the index of the first paragraph of each
+                            document, plus the total number of paragraphs
+    - document_levels.bin:  the nesting level of each document (1, 2 or 3)
+    - meta.json:            the tag vocabulary, sizes and format details
+=======================================================
+"""
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import json
+import mmap
+import os
+import sys
+from array import array
+
+from simple_nlp.compact import (CompactDocument, TagVocabulary,
+                                _nesting_level)
+
+FORMAT_NAME = "simple_nlp-corpus"
+FORMAT_VERSION = 1
+
+# Array typecodes of each column
+_COLUMNS = {
+    "token_ends": "Q",
+    "tags": "H",
+    "sentence_bounds": "Q",
+    "paragraph_bounds": "Q",
+    "document_bounds": "Q",
+    "document_levels": "B",
+}
+_BOUNDS = ("sentence_bounds", "paragraph_bounds", "document_bounds")
+
+
+# ==============================================================================
+#                                                                  SAVE AND LOAD
+# ==============================================================================
+def save_corpus(documents, path):
+    """
+    Saves an iterable of tokenized or POS tagged documents to a corpus
+    directory, which can be loaded back with load_corpus(). The documents are
+    written one at a time, so the iterable can be a generator, eg the output
+    of pos_tag() on a lazy stream.
+
+    :param documents: (iterable) Documents, each of which is a list of tokens
+                      or (word, tag) tuples nested 1 to 3 levels deep, or a
+                      CompactDocument. All of the documents must either be
+                      tagged or not tagged.
+    :param path: (str) The directory to save the corpus to. It is created if
+                 it does not exist.
+    :return: (int) The number of documents saved.
+
+    :examples:
+        with open("big_file.txt") as f:
+            save_corpus(pos_tag(tokenize(f, levels_out=3, lazy=True)),
+                        "tagged_corpus")
+    """
+    with CorpusWriter(path) as writer:
+        for document in documents:
+            writer.add(document)
+        return writer.n_documents
+
+
+def load_corpus(path):
+    """
+    Opens a corpus directory created by save_corpus(), memory mapping its
+    columns. Nothing is read from disk until it is used.
+
+    :param path: (str) The corpus directory.
+    :return: (MappedCorpus)
+
+    :examples:
+        corpus = load_corpus("tagged_corpus")
+        corpus[1000]                            # document 1000
+        for chunked in chunk(corpus, pattern=CHUNK_PATTERN_NP1):
+            ...
+    """
+    return MappedCorpus(path)
+
+
+# ==============================================================================
+#                                                                  CORPUS WRITER
+# ==============================================================================
+class CorpusWriter(object):
+    """
+    Writes documents to a corpus directory one at a time. The corpus is only
+    complete once close() has been called. Use it as a context manager to make
+    sure that happens.
+
+    :param path: (str) The directory to save the corpus to.
+
+    :examples:
+        with CorpusWriter("tagged_corpus") as writer:
+            for document in documents:
+                writer.add(pos_tag(tokenize(document, levels_out=3)))
+    """
+    def __init__(self, path):
+        self.path = path
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        # Remove any metadata from a previous corpus, so a partly written
+        # corpus can never be loaded by mistake
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+
+        self.vocabulary = TagVocabulary()
+        self.tagged = None
+        self.n_documents = 0
+        self.n_paragraphs = 0
+        self.n_sentences = 0
+        self.n_tokens = 0
+        self.n_bytes = 0
+        self._files = {}
+        for name in ["text"] + sorted(_COLUMNS):
+            self._files[name] = open(os.path.join(path, name + ".bin"), "wb")
+        for name in _BOUNDS:
+            array(_COLUMNS[name], [0]).tofile(self._files[name])
+
+    def add(self, document):
+        """
+        Appends a document to the corpus.
+
+        :param document: a list of tokens or (word, tag) tuples nested 1 to 3
+                         levels deep, or a CompactDocument.
+        """
+        levels, paragraphs = _paragraphs_of(document)
+
+        # Check the whole document before writing any of it, so that a bad
+        # document is rejected without leaving the corpus half updated
+        tagged = self.tagged
+        for paragraph in paragraphs:
+            for sentence in paragraph:
+                for token in sentence:
+                    if tagged is None:
+                        tagged = isinstance(token, tuple)
+                    assert isinstance(token, tuple) == tagged, \
+                        "All tokens in a corpus must either be tagged or " \
+                        "not tagged"
+                    assert isinstance(token[0] if tagged else token, str), \
+                        "The tokens saved to a corpus must be strings"
+
+        text = []
+        columns = dict((name, array(typecode))
+                       for name, typecode in _COLUMNS.items())
+        encode = self.vocabulary.encode
+        n_bytes = self.n_bytes
+        n_tokens = self.n_tokens
+        n_sentences = self.n_sentences
+        n_paragraphs = self.n_paragraphs
+        for paragraph in paragraphs:
+            for sentence in paragraph:
+                for token in sentence:
+                    if tagged:
+                        token, tag = token
+                        columns["tags"].append(encode(tag))
+                    data = token.encode("utf-8")
+                    text.append(data)
+                    n_bytes += len(data)
+                    n_tokens += 1
+                    columns["token_ends"].append(n_bytes)
+                n_sentences += 1
+                columns["sentence_bounds"].append(n_tokens)
+            n_paragraphs += 1
+            columns["paragraph_bounds"].append(n_sentences)
+        columns["document_bounds"].append(n_paragraphs)
+        columns["document_levels"].append(levels)
+
+        self._files["text"].write(b"".join(text))
+        for name, column in columns.items():
+            column.tofile(self._files[name])
+        self.tagged = tagged
+        self.n_documents += 1
+        self.n_paragraphs = n_paragraphs
+        self.n_sentences = n_sentences
+        self.n_tokens = n_tokens
+        self.n_bytes = n_bytes
+
+    def close(self):
+        """ Finishes writing the corpus. """
+        if not self._files:
+            return
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+        if not self.tagged:
+            os.remove(os.path.join(self.path, "tags.bin"))
+        meta = {"format": FORMAT_NAME,
+                "version": FORMAT_VERSION,
+                "byteorder": sys.byteorder,
+                "tagged": bool(self.tagged),
+                "tags": self.vocabulary.tags,
+                "n_documents": self.n_documents,
+                "n_paragraphs": self.n_paragraphs,
+                "n_sentences": self.n_sentences,
+                "n_tokens": self.n_tokens}
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _paragraphs_of(document):
+    """
+    Returns the nesting level of a document, and its contents as a list of
+    paragraphs, which are lists of sentences. The level is read from the
+    first token, so empty paragraphs at the start do not throw it off.
+    """
+    if isinstance(document, CompactDocument):
+        return document.levels, list(document.paragraphs())
+    assert isinstance(document, list), \
+        "The documents saved to a corpus must be lists or CompactDocuments"
+    levels = _nesting_level(document)
+    assert levels <= 3, \
+        "The elements in your list must be no deeper than 3 levels deep."
+    if levels == 1:
+        return levels, [[document]]
+    elif levels == 2:
+        return levels, [document]
+    return levels, document
+
+
+# ==============================================================================
+#                                                                  MAPPED CORPUS
+# ==============================================================================
+class MappedCorpus(object):
+    """
+    A corpus saved by save_corpus(), with its columns memory mapped, so that
+    any document or range of sentences can be read without loading the rest
+    of the corpus.
+
+    It behaves like a read only list of documents: len(corpus) is the number
+    of documents, corpus[i] returns document i as the same nested list that
+    was saved, and iterating over it yields each document in turn. Since it
+    is an iterable of documents, it can be passed straight to pos_tag(),
+    chunk() and named_entities(), which then return a generator with one
+    result per document.
+
+    :param path: (str) The corpus directory.
+    """
+    def __init__(self, path):
+        self.path = path
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            raise ValueError("{0} is not a complete corpus directory. "
+                             "(Was the CorpusWriter closed?)".format(path))
+        with open(meta_path) as f:
+            self.meta = json.load(f)
+        if (self.meta.get("format") != FORMAT_NAME) \
+                or (self.meta.get("version") != FORMAT_VERSION):
+            raise ValueError("{0} is not a version {1} {2} directory"
+                             "".format(path, FORMAT_VERSION, FORMAT_NAME))
+        if self.meta["byteorder"] != sys.byteorder:
+            raise ValueError("The corpus in {0} was saved on a machine with "
+                             "a different byte order".format(path))
+        self.tag_names = self.meta["tags"]
+
+        self._maps = []
+        self.text = self._map("text", None)
+        self.tags = self._map("tags", "H") if self.meta["tagged"] else None
+        self.token_ends = self._map("token_ends", "Q")
+        self.sentence_bounds = self._map("sentence_bounds", "Q")
+        self.paragraph_bounds = self._map("paragraph_bounds", "Q")
+        self.document_bounds = self._map("document_bounds", "Q")
+        self.document_levels = self._map("document_levels", "B")
+
+    def _map(self, name, typecode):
+        """
+        Memory maps a column, returning it as a read only memoryview of
+        *typecode* elements, or as the raw memory map if typecode is None.
+        """
+        with open(os.path.join(self.path, name + ".bin"), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files cannot be memory mapped
+                return b"" if typecode is None else array(typecode)
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        if typecode is None:
+            return mapped
+        view = memoryview(mapped).cast(typecode)
+        self._maps.append(view)
+        return view
+
+    def close(self):
+        """ Closes the memory maps. The corpus cannot be used afterwards. """
+        # The views have to be released before the maps they point into
+        for mapped in reversed(self._maps):
+            if isinstance(mapped, memoryview):
+                mapped.release()
+            else:
+                mapped.close()
+        self._maps = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # --------------------------------------------------------------------------
+    #                                                                      SIZES
+    # --------------------------------------------------------------------------
+    @property
+    def is_tagged(self):
+        return self.tags is not None
+
+    @property
+    def n_documents(self):
+        return len(self.document_bounds) - 1
+
+    @property
+    def n_paragraphs(self):
+        return len(self.paragraph_bounds) - 1
+
+    @property
+    def n_sentences(self):
+        return len(self.sentence_bounds) - 1
+
+    @property
+    def n_tokens(self):
+        return len(self.token_ends)
+
+    # --------------------------------------------------------------------------
+    #                                                                      VIEWS
+    # --------------------------------------------------------------------------
+    def tokens(self, start=0, stop=None):
+        """
+        Returns a list of the tokens from index start up to stop, counting
+        across the whole corpus. Tokens are strings, or (word, tag) tuples if
+        the corpus is tagged.
+        """
+        if stop is None:
+            stop = self.n_tokens
+        if stop <= start:
+            return []
+        ends = self.token_ends[start:stop].tolist()
+        first = self.token_ends[start - 1] if start > 0 else 0
+        data = self.text[first:ends[-1]]
+        text = data.decode("utf-8")
+        words = []
+        offset = 0
+        if len(text) == len(data):
+            # Only single byte characters, so the byte offsets can be used to
+            # slice the decoded text directly
+            for end in ends:
+                words.append(text[offset:end - first])
+                offset = end - first
+        else:
+            for end in ends:
+                words.append(data[offset:end - first].decode("utf-8"))
+                offset = end - first
+        if self.tags is None:
+            return words
+        tag_names = self.tag_names
+        return [(word, tag_names[code])
+                for word, code in zip(words, self.tags[start:stop].tolist())]
+
+    def sentence(self, i):
+        """ Returns sentence i of the corpus as a list of tokens. """
+        return self.tokens(self.sentence_bounds[i], self.sentence_bounds[i + 1])
+
+    def sentences(self, start=0, stop=None):
+        """
+        Returns a list of the sentences from index start up to stop, counting
+        across the whole corpus.
+        """
+        if stop is None:
+            stop = self.n_sentences
+        bounds = self.sentence_bounds[start:stop + 1].tolist()
+        tokens = self.tokens(bounds[0], bounds[-1]) if bounds else []
+        offset = bounds[0] if bounds else 0
+        return [tokens[bounds[j] - offset:bounds[j + 1] - offset]
+                for j in range(len(bounds) - 1)]
+
+    def paragraph(self, i):
+        """ Returns paragraph i of the corpus as a list of sentences. """
+        return self.sentences(self.paragraph_bounds[i],
+                              self.paragraph_bounds[i + 1])
+
+    def document(self, i):
+        """
+        Returns document i as the nested list it was saved as, ie a list of
+        tokens, a list of sentences, or a list of paragraphs.
+        """
+        start = self.document_bounds[i]
+        stop = self.document_bounds[i + 1]
+        sentences = self.sentences(self.paragraph_bounds[start],
+                                   self.paragraph_bounds[stop])
+        levels = self.document_levels[i]
+        if levels == 1:
+            return [token for sentence in sentences for token in sentence]
+        elif levels == 2:
+            return sentences
+
+        bounds = self.paragraph_bounds[start:stop + 1].tolist()
+        return [sentences[bounds[j] - bounds[0]:bounds[j + 1] - bounds[0]]
+                for j in range(len(bounds) - 1)]
+
+    def compact_document(self, i):
+        """ Returns document i as a CompactDocument """
+        return CompactDocument.from_nested(self.document(i))
+
+    # --------------------------------------------------------------------------
+    #                                                      LIST-LIKE BEHAVIOUR
+    # --------------------------------------------------------------------------
+    def __len__(self):
+        return self.n_documents
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.document(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("MappedCorpus index out of range")
+        return self.document(i)
+
+    def __iter__(self):
+        for i in range(self.n_documents):
+            yield self.document(i)
+
+    def __repr__(self):
+        return "<MappedCorpus {0!r} documents={1} paragraphs={2} " \
+               "sentences={3} tokens={4} tagged={5}>".format(
+                   self.path, self.n_documents, self.n_paragraphs,
+                   self.n_sentences, self.n_tokens, self.is_tagged)
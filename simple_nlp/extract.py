@@ -0,0 +1,255 @@
+"""====================================================
+                    EXTRACT
+
+Extracts chunks (eg noun phrases or named entities) from POS tagged text as a
+flat list of records, rather than as nested nltk.Tree objects. Where possible,
+the chunk boundaries are read straight from the chunker's internal encoding,
+so no Trees are built at all.
+=======================================================
+"""
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import re
+from collections import namedtuple
+
+import simple_nlp
+from simple_nlp import profiling
+from simple_nlp.compact import CompactDocument
+
+Chunk = namedtuple("Chunk", ["label", "text", "paragraph", "sentence",
+                             "start", "end", "char_start", "char_end"])
+Chunk.__doc__ = """
+A chunk extracted from a POS tagged text.
+
+    - label:     the label of the chunk, eg "CHUNKED_NP" or "PERSON"
+    - text:      the words of the chunk, joined by spaces
+    - paragraph: index of the paragraph the chunk is in
+    - sentence:  index of the sentence within its paragraph
+    - start:     index of the first token of the chunk within its sentence
+    - end:       index of the token after the last token of the chunk
+    - char_start: character offset of the start of the chunk in the original
+                 text, if the tokens have character spans attached (see
+                 tokenize(..., spans=True)). Otherwise None.
+    - char_end:  character offset of the end of the chunk, or None.
+"""
+
+
+# ==============================================================================
+#                                                                 EXTRACT CHUNKS
+# ==============================================================================
+def extract_chunks(tagged_list, pattern=simple_nlp.CHUNK_PATTERN_NP2, ne=False,
+                   binary=False):
+    """
+    Takes a list of POS tagged items, chunks them in the same way as chunk()
+    does, and returns a flat list of the chunks found, along with where they
+    were found. This is much quicker than calling chunk() and walking through
+    the trees it returns.
+
+    :param tagged_list: a list of POS tagged items nested 1 to 3 levels deep,
+                        or a tagged CompactDocument. It can also be a
+                        generator of tagged documents (or paragraphs), in
+                        which case a generator that yields a list of chunks
+                        for each element is returned.
+    :param pattern: a chunking pattern. See chunk()
+    :param ne: (boolean) Extract named entities using nltk's built in Named
+               Entity Recognition, instead of using the pattern?
+    :param binary: (boolean) Should the Named Entity Recognition use binary
+               classification? See named_entities()
+    :return: (list of Chunk) The chunks in the order they appear. If the input
+             is only nested 1 or 2 levels deep, then the paragraph (and
+             sentence) indices are 0.
+
+    :examples:
+        for c in extract_chunks(pos_tagged):
+            print(c.label, c.text, c.paragraph, c.sentence, c.start, c.end)
+
+        # Character offsets of each chunk in the original text
+        tagged = pos_tag(tokenize(text, levels_out=3, spans=True))
+        for c in extract_chunks(tagged):
+            print(c.text, "|", text[c.char_start:c.char_end])
+
+        people = [c.text for c in extract_chunks(pos_tagged, ne=True)
+                  if c.label == "PERSON"]
+    """
+    # ==========================================================================
+    if isinstance(tagged_list, CompactDocument):
+        tagged_list = tagged_list.tolist()
+
+    if simple_nlp._is_stream(tagged_list):
+        return iter_extract_chunks(tagged_list, pattern=pattern, ne=ne,
+                                   binary=binary)
+
+    if len(tagged_list) == 0:
+        return []
+
+    levels = simple_nlp.get_level(tagged_list, type="pos_tagged")
+    if levels == 1:
+        paragraphs = [[tagged_list]]
+    elif levels == 2:
+        paragraphs = [tagged_list]
+    else:
+        paragraphs = tagged_list
+
+    if ne:
+        sentence_spans = profiling.timed("ne_chunk", _ne_spans_func(binary),
+                                         profiling.count_sentence_tokens)
+    else:
+        sentence_spans = profiling.timed(
+            "chunk", _regexp_spans_func(simple_nlp.get_chunker(pattern)),
+            profiling.count_sentence_tokens)
+
+    chunks = []
+    for i, paragraph in enumerate(paragraphs):
+        for j, sentence in enumerate(paragraph):
+            for label, start, end in sentence_spans(sentence):
+                tokens = sentence[start:end]
+                text = " ".join(token[0] for token in tokens)
+                if isinstance(tokens[0][0], simple_nlp.SpanToken):
+                    char_start, char_end = tokens[0][0].start, tokens[-1][0].end
+                else:
+                    char_start = char_end = None
+                chunks.append(Chunk(label, text, i, j, start, end,
+                                    char_start, char_end))
+    return chunks
+
+
+def iter_extract_chunks(documents, pattern=simple_nlp.CHUNK_PATTERN_NP2,
+                        ne=False, binary=False):
+    """
+    Streaming version of extract_chunks(). Takes an iterable of POS tagged
+    documents, and yields the list of chunks for each one, as it goes.
+
+    :examples:
+        with open("big_file.txt") as f:
+            paragraphs = pos_tag(tokenize(f, levels_out=3, lazy=True))
+            for chunks in iter_extract_chunks(paragraphs):
+                ...
+    """
+    for document in documents:
+        yield extract_chunks(document, pattern=pattern, ne=ne, binary=binary)
+
+
+# ==============================================================================
+#                                                                SENTENCE SPANS
+# ==============================================================================
+# Each of these returns a function that takes a POS tagged sentence, and
+# returns a list of (label, start, end) tuples for the chunks in it.
+def _regexp_spans_func(chunker):
+    """
+    Spans for a RegexpParser. For single stage patterns, the rules are applied
+    to the sentence's ChunkString, and the chunk boundaries are read straight
+    from its string encoding, without building any Trees.
+    """
+    stage = _single_chunk_stage(chunker)
+    if stage is None:
+        return lambda sentence: _tree_spans(chunker.parse(sentence))
+
+    ChunkString = simple_nlp.nltk.chunk.regexp.ChunkString
+    Tree = simple_nlp.nltk.Tree
+    label = stage._chunk_label
+
+    def sentence_spans(sentence):
+        if len(sentence) == 0:
+            return []
+        chunkstr = ChunkString(Tree(stage._root_label, sentence))
+        stage._notrace_apply(chunkstr)
+        chunkstr._verify(chunkstr._str, 1)
+
+        # The encoding alternates between pieces outside and inside of chunks
+        # eg "<DT>{<JJ><NN>}<VBD>"
+        spans = []
+        index = 0
+        in_chunk = False
+        for piece in re.split("[{}]", chunkstr._str):
+            length = piece.count("<")
+            if in_chunk:
+                spans.append((label, index, index + length))
+            index += length
+            in_chunk = not in_chunk
+        return spans
+    return sentence_spans
+
+
+def _single_chunk_stage(chunker):
+    """
+    Returns the only stage of a RegexpParser, if it has a single stage that
+    is applied once without tracing. Otherwise returns None.
+    """
+    stages = getattr(chunker, "_stages", None)
+    if (stages is None) or (len(stages) != 1) \
+            or (getattr(chunker, "_loop", None) != 1) \
+            or getattr(chunker, "_trace", True):
+        return None
+    stage = stages[0]
+    for attribute in ("_notrace_apply", "_root_label", "_chunk_label"):
+        if not hasattr(stage, attribute):
+            return None
+    if getattr(stage, "_trace", True):
+        return None
+    return stage
+
+
+def _ne_spans_func(binary):
+    """
+    Spans for nltk's named entity chunker. Where possible, the IOB tags
+    predicted by the chunker are turned straight into spans, without building
+    any Trees.
+    """
+    # Make use of the result cache if it is enabled
+    if simple_nlp._result_cache is not None:
+        ne_chunk = simple_nlp._ne_chunk_funcs()[0]
+        return lambda sentence: _tree_spans(ne_chunk(sentence, binary=binary))
+
+    chunker = simple_nlp._get_ne_chunker(binary)
+    tagger = getattr(chunker, "_tagger", None)
+    if tagger is None:
+        return lambda sentence: _tree_spans(simple_nlp._ne_chunk(sentence,
+                                                                 binary))
+
+    def sentence_spans(sentence):
+        if len(sentence) == 0:
+            return []
+        return _iob_spans(tag for token, tag in tagger.tag(sentence))
+    return sentence_spans
+
+
+def _iob_spans(iob_tags):
+    """
+    Turns a sequence of IOB tags (eg "B-PERSON", "I-PERSON", "O") into a list
+    of (label, start, end) spans, in the same way that nltk's named entity
+    chunker turns them into Trees.
+    """
+    spans = []
+    for i, tag in enumerate(iob_tags):
+        if tag == "O":
+            continue
+        label = tag[2:]
+        if tag.startswith("I-") and spans and (spans[-1][0] == label) \
+                and (spans[-1][2] == i):
+            spans[-1] = (label, spans[-1][1], i + 1)
+        elif tag.startswith("B-") or tag.startswith("I-"):
+            spans.append((label, i, i + 1))
+    return spans
+
+
+def _tree_spans(tree):
+    """
+    Walks through a chunk tree, and returns the (label, start, end) spans of
+    all its subtrees, where start and end are token indices.
+    """
+    Tree = simple_nlp.nltk.Tree
+    spans = []
+
+    def walk(node, start):
+        for child in node:
+            if isinstance(child, Tree):
+                end = start + len(child.leaves())
+                spans.append((child.label(), start, end))
+                walk(child, start)
+                start = end
+            else:
+                start += 1
+    walk(tree, 0)
+    return spans
@@ -0,0 +1,118 @@
+"""====================================================
+                    INCREMENTAL
+
+Incremental processing of documents that get edited over time. The results
+of each paragraph are kept, keyed by a hash of the paragraph's text, so that
+when the document changes, only the paragraphs that were added or edited
+need to be tokenized, tagged and chunked again.
+=======================================================
+"""
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import hashlib
+from collections import namedtuple
+
+from simple_nlp.pipeline import STAGES, Pipeline
+
+UpdateInfo = namedtuple("UpdateInfo", ["paragraphs", "processed", "reused"])
+
+
+# ==============================================================================
+#                                                           INCREMENTAL DOCUMENT
+# ==============================================================================
+class IncrementalDocument(object):
+    """
+    A document that is processed through the tokenize -> pos_tag -> chunk
+    stages, and that only re-processes the paragraphs that have changed each
+    time its text is updated.
+
+    As with tokenize(text, levels_out=3), each line of the text is a
+    paragraph. Paragraphs are processed independently of each other, so the
+    result is always exactly the same as processing the whole text again,
+    ie the same as:
+
+        chunk(pos_tag(tokenize(text, levels_out=3)), pattern=pattern)
+
+    Note that the results of unchanged paragraphs are the very same objects
+    as in the previous result, so they should not be modified in place.
+
+    :param text: (str) The initial text of the document. (optional)
+    :param stages: (tuple of strings) The stages to run. Must start with
+                   "tokenize". See Pipeline.
+    :param pattern: (str) the chunking pattern passed on to chunk()
+    :param ne: (boolean) Use named entity chunking in the chunk stage?
+    :param binary: (boolean) Use binary named entity classification?
+    :param engine: (str) the tokenizer engine passed on to tokenize()
+
+    :examples:
+        doc = IncrementalDocument(text, pattern=CHUNK_PATTERN_NP1)
+        doc.result              # chunked paragraphs of the text
+
+        chunked = doc.update(edited_text)
+        doc.last_update         # UpdateInfo(paragraphs=120, processed=2,
+                                #            reused=118)
+    """
+    def __init__(self, text="", stages=STAGES, pattern=None, ne=False,
+                 binary=False, engine="nltk"):
+        stages = tuple(stages)
+        assert (len(stages) > 0) and (stages[0] == "tokenize"), \
+            "Argument *stages* in IncrementalDocument() must start with " \
+            "'tokenize'"
+        self.pipeline = Pipeline(stages=stages, levels_out=3, pattern=pattern,
+                                 ne=ne, binary=binary, engine=engine)
+        self.text = ""
+        self.result = []
+        self.last_update = UpdateInfo(0, 0, 0)
+        self._paragraphs = {}       # paragraph result, keyed by hash
+        self.update(text)
+
+    def update(self, text):
+        """
+        Updates the text of the document, processing only the paragraphs that
+        were not in the previous version of the text.
+
+        :param text: (str) The new text of the document.
+        :return: (list) The processed paragraphs of the whole text.
+        """
+        assert isinstance(text, str), \
+            "Argument *text* in IncrementalDocument.update() must be a string"
+        paragraphs = {}
+        result = []
+        processed = 0
+        for line in text.split("\n"):
+            # Skip blank lines, as tokenize() does
+            if line == "":
+                continue
+            key = hashlib.sha1(line.encode("utf-8")).digest()
+            output = paragraphs.get(key)
+            if output is None:
+                output = self._paragraphs.get(key)
+            if output is None:
+                output = self._process_paragraph(line)
+                processed += 1
+            paragraphs[key] = output
+            result.append(output)
+
+        # Only keep the paragraphs that are in the current text
+        self._paragraphs = paragraphs
+        self.text = text
+        self.result = result
+        self.last_update = UpdateInfo(len(result), processed,
+                                      len(result) - processed)
+        return result
+
+    def _process_paragraph(self, paragraph):
+        """ Runs the pipeline on a single paragraph (a line with no newlines) """
+        # A line of whitespace is a paragraph without any sentences
+        if paragraph.strip() == "":
+            return []
+        return self.pipeline.process(paragraph)[0]
+
+    def __len__(self):
+        return len(self.result)
+
+    def __repr__(self):
+        return "<IncrementalDocument paragraphs={0} stages={1}>".format(
+            len(self.result), self.pipeline.stages)
@@ -0,0 +1,276 @@
+"""====================================================
+                    PIPELINE
+
+Corpus level processing. Runs the tokenize -> pos_tag -> chunk stages over an
+iterable of documents, optionally fanning the work out over a pool of worker
+processes.
+=======================================================
+"""
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import multiprocessing
+import threading
+
+import simple_nlp
+
+# The stages a pipeline can run, in the order they must be run.
+STAGES = ("tokenize", "pos_tag", "chunk")
+
+
+# ==============================================================================
+#                                                                       PIPELINE
+# ==============================================================================
+class Pipeline(object):
+    """
+    Chains the tokenize, pos_tag and chunk stages together so that a whole
+    document (or a whole corpus of documents) can be processed in one call.
+
+    The output of each document is exactly what you would get by calling the
+    stage functions one after the other yourself, eg:
+
+        chunk(pos_tag(tokenize(doc, levels_out=3)), pattern=pattern)
+
+    :param stages: (tuple of strings) The stages to run. Must be taken from
+                   "tokenize", "pos_tag", "chunk" and be in that order. You can
+                   leave out stages at the start (eg if your documents are
+                   already tokenized) or at the end.
+    :param levels_out: (int) the nesting level passed on to tokenize()
+    :param pattern: (str) the chunking pattern passed on to chunk()
+    :param ne: (boolean) Use named entity chunking in the chunk stage?
+    :param binary: (boolean) Use binary named entity classification?
+    :param engine: (str) the tokenizer engine passed on to tokenize()
+    :param spans: (boolean) passed on to tokenize(), to keep track of the
+                   character offsets of the tokens
+
+    :examples:
+        pipe = Pipeline(levels_out=3, pattern=CHUNK_PATTERN_NP1)
+        chunked = pipe.process("Some text. With sentences.\nAnd paragraphs.")
+
+        # Process a large corpus with 4 worker processes
+        for chunked in pipe.process_corpus(documents, workers=4):
+            ...
+    """
+    def __init__(self, stages=STAGES, levels_out=3,
+                 pattern=None, ne=False, binary=False, engine="nltk",
+                 spans=False):
+        stages = tuple(stages)
+        assert len(stages) > 0, \
+            "Argument *stages* in Pipeline() must contain at least one stage"
+        for stage in stages:
+            assert stage in STAGES, \
+                "Argument *stages* in Pipeline() only accepts the values " \
+                "'tokenize', 'pos_tag' or 'chunk'"
+        indices = [STAGES.index(stage) for stage in stages]
+        assert indices == list(range(indices[0], indices[0] + len(indices))), \
+            "Argument *stages* in Pipeline() must be consecutive stages in " \
+            "the order 'tokenize', 'pos_tag', 'chunk'"
+        assert engine in simple_nlp.TOKENIZER_ENGINES, \
+            "Argument *engine* in Pipeline() can only take the values " \
+            "'nltk' or 'fast'"
+
+        self.stages = stages
+        self.levels_out = levels_out
+        self.pattern = simple_nlp.CHUNK_PATTERN_NP2 if pattern is None \
+                       else pattern
+        self.ne = ne
+        self.binary = binary
+        self.engine = engine
+        self.spans = spans
+
+    def process(self, document):
+        """
+        Runs all the stages of the pipeline on a single document, in the
+        current process.
+
+        :param document: The input to the first stage. A string if the first
+                         stage is "tokenize", otherwise a (nested) list of
+                         tokens or POS tagged tuples.
+        :return: The output of the last stage.
+        """
+        x = document
+        for stage in self.stages:
+            if stage == "tokenize":
+                x = simple_nlp.tokenize(x, levels_out=self.levels_out,
+                                        engine=self.engine,
+                                        spans=self.spans)
+            elif stage == "pos_tag":
+                x = simple_nlp.pos_tag(x)
+            elif stage == "chunk":
+                x = simple_nlp.chunk(x, pattern=self.pattern, ne=self.ne,
+                                     binary=self.binary)
+        return x
+
+    def process_corpus(self, documents, workers=None, chunksize=16,
+                       ordered=True, max_pending=None):
+        """
+        Runs the pipeline over an iterable of documents, spreading the work
+        over a pool of worker processes. Each worker loads the nltk models
+        once when it starts up, rather than once per document.
+
+        :param documents: (iterable) The documents to process.
+        :param workers: (int) Number of worker processes. Defaults to the
+                        number of CPUs. If it is 1, then the documents are
+                        processed serially in the current process.
+        :param chunksize: (int) Number of documents sent to a worker at a time.
+        :param ordered: (boolean)
+                        - True  - results are yielded in the same order as
+                                  the input documents.
+                        - False - results are yielded as soon as they are
+                                  ready, as (index, result) tuples, where
+                                  index is the position of the document in
+                                  the input.
+        :param max_pending: (int) Maximum number of documents taken from
+                        *documents* ahead of the results that have been
+                        yielded, so that a large (or endless) stream of
+                        documents is never read into memory all at once.
+                        Defaults to 2 * workers * chunksize.
+        :return: a generator of results.
+        """
+        assert (workers is None) or (isinstance(workers, int) and workers >= 1),\
+            "Argument *workers* in process_corpus() must be a positive integer"
+        assert isinstance(chunksize, int) and chunksize >= 1, \
+            "Argument *chunksize* in process_corpus() must be a positive integer"
+
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        if max_pending is None:
+            max_pending = 2 * workers * chunksize
+        assert isinstance(max_pending, int) and max_pending >= chunksize, \
+            "Argument *max_pending* in process_corpus() must be an integer " \
+            "no smaller than *chunksize*"
+        return self._iter_corpus(documents, workers, chunksize, ordered,
+                                 max_pending)
+
+    def _iter_corpus(self, documents, workers, chunksize, ordered,
+                     max_pending):
+        # ---------------------------------------------------------- Serial
+        if workers == 1:
+            for i, document in enumerate(documents):
+                result = self.process(document)
+                yield result if ordered else (i, result)
+            return
+
+        # ---------------------------------------------------------- Parallel
+        pool = multiprocessing.Pool(processes=workers,
+                                    initializer=_init_worker,
+                                    initargs=(self,))
+        # The pool reads its input as fast as it can, so the documents are fed
+        # to it through a window that only lets max_pending of them in ahead
+        # of the results that have been yielded.
+        window = _Window(max_pending)
+        try:
+            if ordered:
+                results = pool.imap(_process_document,
+                                    window.feed(documents),
+                                    chunksize=chunksize)
+            else:
+                results = pool.imap_unordered(_process_indexed_document,
+                                              window.feed(enumerate(documents)),
+                                              chunksize=chunksize)
+            for result in results:
+                yield result
+                # Only once the result has been taken, so that the window
+                # also bounds the documents the caller is keeping track of
+                window.release()
+            pool.close()
+        finally:
+            window.close()
+            pool.terminate()
+            pool.join()
+
+
+class _Window(object):
+    """
+    Limits how many documents can be taken from an iterable ahead of the
+    results that have been released.
+    """
+    def __init__(self, size):
+        self._slots = threading.Semaphore(size)
+        self._closed = False
+
+    def feed(self, documents):
+        """ Generator that yields the documents, waiting for a free slot """
+        documents = iter(documents)
+        while True:
+            self._slots.acquire()
+            if self._closed:
+                return
+            try:
+                document = next(documents)
+            except StopIteration:
+                return
+            yield document
+
+    def release(self):
+        """ Frees up a slot, once a result has been handed on """
+        self._slots.release()
+
+    def close(self):
+        """ Stops feeding documents, waking up feed() if it is waiting """
+        self._closed = True
+        self._slots.release()
+
+
+# ==============================================================================
+#                                                                 PROCESS CORPUS
+# ==============================================================================
+def process_corpus(documents, stages=STAGES, levels_out=3, pattern=None,
+                   ne=False, binary=False, workers=None, chunksize=16,
+                   ordered=True, engine="nltk", spans=False, max_pending=None):
+    """
+    Convenience function that creates a Pipeline and runs it over an iterable
+    of documents using a pool of worker processes.
+
+    See Pipeline and Pipeline.process_corpus() for a description of the
+    arguments.
+
+    :return: a generator of results, one for each document.
+
+    :examples:
+        docs = ["First document. Two sentences.", "Second document."]
+        for chunked in process_corpus(docs, levels_out=2, workers=4):
+            print(chunked)
+    """
+    pipe = Pipeline(stages=stages, levels_out=levels_out, pattern=pattern,
+                    ne=ne, binary=binary, engine=engine, spans=spans)
+    return pipe.process_corpus(documents, workers=workers,
+                               chunksize=chunksize, ordered=ordered,
+                               max_pending=max_pending)
+
+
+# ==============================================================================
+#                                                                 WORKER PROCESS
+# ==============================================================================
+# The pipeline used by the current worker process. Set by _init_worker().
+_worker_pipeline = None
+
+
+def _init_worker(pipeline):
+    """
+    Initializer for each worker process. Stores the pipeline, and loads the
+    nltk models needed by its stages so that this cost is paid once per worker
+    instead of on the first document.
+    """
+    global _worker_pipeline
+    _worker_pipeline = pipeline
+    stages = [stage for stage in pipeline.stages if stage != "chunk"]
+    if ("chunk" in pipeline.stages) and pipeline.ne:
+        stages.append("ne_chunk")
+    try:
+        simple_nlp.warm_up(stages)
+    except LookupError:
+        # Let the error be raised when processing the documents instead, where
+        # it gets passed back to the parent process. Raising it here would
+        # just make the pool keep restarting the worker.
+        pass
+
+
+def _process_document(document):
+    return _worker_pipeline.process(document)
+
+
+def _process_indexed_document(indexed_document):
+    i, document = indexed_document
+    return (i, _worker_pipeline.process(document))
@@ -0,0 +1,264 @@
+"""====================================================
+                    PROFILING
+
+Optional instrumentation of the individual processing stages (sentence
+splitting, word tokenization, POS tagging, chunking and named entity
+chunking). While a Profiler is active, it records the wall time, number of
+calls and number of tokens processed by each stage, as well as the fan-out at
+each level of nesting. When no profiler is active, the only overhead is a
+check of whether one is.
+=======================================================
+"""
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import logging
+import threading
+import time
+import types
+
+try:
+    timer = time.perf_counter
+except AttributeError:
+    timer = time.time
+
+# Names of the levels of nesting, used when reporting the fan-out.
+LEVEL_NAMES = {2: "sentences", 3: "paragraphs"}
+
+# The profilers that are currently recording.
+_active_profilers = []
+
+
+# ==============================================================================
+#                                                                       PROFILER
+# ==============================================================================
+class Profiler(object):
+    """
+    Records per-stage timing statistics while it is active. Use it as a
+    context manager, or call start() and stop() yourself.
+
+    Note that only work done in the current process is recorded. Work done by
+    the worker processes of process_corpus() is not.
+
+    :param hooks: (list of functions) Each hook is called every time a stage
+                  finishes, as hook(stage, seconds, tokens), eg to feed the
+                  numbers into a metrics system.
+
+    :examples:
+        with Profiler() as profiler:
+            chunk(pos_tag(tokenize(text, levels_out=3)))
+        profiler.stats()
+        # {"stages": {"sent_tokenize": {"calls": 3, "seconds": 0.01, ...},
+        #             "word_tokenize": {...}, "pos_tag": {...}, ...},
+        #  "fanout": {"paragraphs": {"lists": 1, "elements": 3, ...}, ...}}
+
+        profiler.log()          # Logs one line per stage
+    """
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """ Clears all of the recorded statistics. """
+        with self._lock:
+            self._stages = {}
+            self._fanout = {}
+
+    # --------------------------------------------------------------------------
+    #                                                                  RECORDING
+    # --------------------------------------------------------------------------
+    def record(self, stage, seconds, tokens=0):
+        """
+        Records one call to *stage*, that took *seconds* and processed
+        *tokens* tokens.
+        """
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = [0, 0.0, 0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] += tokens
+        for hook in self.hooks:
+            hook(stage, seconds, tokens)
+
+    def record_fanout(self, level, n_elements):
+        """
+        Records that a list at nesting *level* containing *n_elements*
+        elements was processed.
+        """
+        with self._lock:
+            stats = self._fanout.get(level)
+            if stats is None:
+                stats = self._fanout[level] = [0, 0]
+            stats[0] += 1
+            stats[1] += n_elements
+
+    # --------------------------------------------------------------------------
+    #                                                                  REPORTING
+    # --------------------------------------------------------------------------
+    def stats(self):
+        """
+        Returns the recorded statistics as a dictionary with two keys:
+
+            - "stages": for each stage, a dictionary with the number of
+              "calls", total "seconds", number of "tokens", and
+              "tokens_per_second".
+            - "fanout": for each level of nesting ("paragraphs",
+              "sentences"), a dictionary with the number of "lists" processed
+              at that level, the total number of "elements" in them, and the
+              "mean" number of elements per list.
+        """
+        with self._lock:
+            stages = {}
+            for stage, (calls, seconds, tokens) in self._stages.items():
+                stages[stage] = {
+                    "calls": calls,
+                    "seconds": seconds,
+                    "tokens": tokens,
+                    "tokens_per_second": tokens / seconds if seconds > 0
+                                         else None}
+            fanout = {}
+            for level, (lists, elements) in self._fanout.items():
+                fanout[LEVEL_NAMES.get(level, level)] = {
+                    "lists": lists,
+                    "elements": elements,
+                    "mean": float(elements) / lists if lists > 0 else 0.0}
+        return {"stages": stages, "fanout": fanout}
+
+    def log(self, logger=None, level=logging.INFO):
+        """
+        Logs the statistics, one line per stage and per level of nesting.
+
+        :param logger: (logging.Logger) defaults to the "simple_nlp" logger.
+        :param level: (int) logging level to use.
+        """
+        if logger is None:
+            logger = logging.getLogger("simple_nlp")
+        stats = self.stats()
+        for stage in sorted(stats["stages"]):
+            s = stats["stages"][stage]
+            logger.log(level, "%s: calls=%d seconds=%.6f tokens=%d",
+                       stage, s["calls"], s["seconds"], s["tokens"])
+        for name in sorted(stats["fanout"], key=str):
+            f = stats["fanout"][name]
+            logger.log(level, "fanout %s: lists=%d elements=%d mean=%.2f",
+                       name, f["lists"], f["elements"], f["mean"])
+
+    # --------------------------------------------------------------------------
+    #                                                           START/STOP
+    # --------------------------------------------------------------------------
+    def start(self):
+        """ Starts recording. """
+        if self not in _active_profilers:
+            _active_profilers.append(self)
+        return self
+
+    def stop(self):
+        """ Stops recording. """
+        if self in _active_profilers:
+            _active_profilers.remove(self)
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+# ==============================================================================
+#                                                          INSTRUMENTATION HOOKS
+# ==============================================================================
+# These are used by the rest of the package to report what it is doing.
+def enabled():
+    """ Returns True if any profiler is currently recording. """
+    return bool(_active_profilers)
+
+
+def record(stage, seconds, tokens=0):
+    """ Records a call to *stage* in all of the active profilers. """
+    for profiler in list(_active_profilers):
+        profiler.record(stage, seconds, tokens)
+
+
+def record_fanout(level, n_elements):
+    """ Records the fan-out of a list in all of the active profilers. """
+    for profiler in list(_active_profilers):
+        profiler.record_fanout(level, n_elements)
+
+
+def timed_call(stage, count_tokens, func, *args, **kwargs):
+    """
+    Calls func(*args, **kwargs). If a profiler is active, then the call is
+    timed and recorded under *stage*, where count_tokens(*args) gives the
+    number of tokens processed. If func returns a generator, then the time
+    spent consuming it is included, and the call is recorded once it has
+    been used up.
+    """
+    if not _active_profilers:
+        return func(*args, **kwargs)
+    start = timer()
+    result = func(*args, **kwargs)
+    seconds = timer() - start
+    if isinstance(result, types.GeneratorType):
+        # A generator does its work as it is consumed, so keep timing it then
+        return _timed_generator(stage, result, seconds, count_tokens(*args))
+    record(stage, seconds, count_tokens(*args))
+    return result
+
+
+def _timed_generator(stage, generator, seconds, tokens):
+    """
+    Yields the items of *generator*, adding the time spent producing each one
+    to *seconds*, and records the total under *stage* once the generator is
+    exhausted (or closed).
+    """
+    try:
+        while True:
+            start = timer()
+            try:
+                item = next(generator)
+            except StopIteration:
+                seconds += timer() - start
+                return
+            seconds += timer() - start
+            yield item
+    finally:
+        record(stage, seconds, tokens)
+
+
+def timed(stage, func, count_tokens):
+    """
+    Returns a wrapped version of func that records each call to it under
+    *stage*. If no profiler is active, then func is returned unchanged, so
+    there is no overhead.
+
+    :param stage: (str) name of the stage
+    :param func: the function to wrap
+    :param count_tokens: function that takes the same positional arguments as
+                         func, and returns the number of tokens processed.
+    """
+    if not _active_profilers:
+        return func
+
+    def timed_func(*args, **kwargs):
+        return timed_call(stage, count_tokens, func, *args, **kwargs)
+    return timed_func
+
+
+def count_sentence_tokens(sentence, *args):
+    """ Token counter for functions that process a single sentence """
+    return len(sentence)
+
+
+def count_sentences_tokens(sentences, *args):
+    """ Token counter for functions that process a list of sentences """
+    return sum(len(sentence) for sentence in sentences)
+
+
+def count_nothing(*args):
+    """ Token counter for functions that do not process tokens """
+    return 0
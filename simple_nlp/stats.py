@@ -0,0 +1,407 @@
+"""====================================================
+                    STATS
+
+Corpus statistics over POS tagged and chunked text: tag frequencies, tag
+bigram counts (as frequency distributions or as a co-occurrence matrix), and
+phrase frequencies.
+
+The tags are encoded as small integer codes, and counted in bulk. If NumPy is
+installed, the counting is vectorized, which makes it fast enough for corpora
+of tens of millions of tokens, especially ones stored as a CompactDocument or
+a MappedCorpus, whose tags are already integer coded. Without NumPy, the same
+results are worked out with plain Python counters.
+=======================================================
+"""
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+from collections import Counter
+
+import simple_nlp
+from simple_nlp.compact import CompactDocument
+from simple_nlp.corpus import MappedCorpus
+from simple_nlp.extract import extract_chunks
+
+# Array backed corpora are counted in blocks of about this many tokens, so that
+# the temporary arrays stay a reasonable size.
+BLOCK_SIZE = 1 << 22
+
+# NumPy takes a while to import, so it is not imported until the first
+# TagStatistics is created. Stays None if NumPy is not installed.
+numpy = None
+_numpy_checked = False
+
+
+def _load_numpy():
+    """ Imports NumPy (if it is installed) the first time it is called """
+    global numpy, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy_checked = True
+
+
+# ==============================================================================
+#                                                                 TAG STATISTICS
+# ==============================================================================
+class TagStatistics(object):
+    """
+    Accumulates tag and tag bigram counts over one or more POS tagged (or
+    chunked) documents. Bigrams are only counted between tokens in the same
+    sentence.
+
+    add() accepts:
+        - POS tagged lists nested 1 to 3 levels deep, as returned by pos_tag()
+        - chunked output nested to the same depths, as returned by chunk()
+        - tagged CompactDocuments and MappedCorpus objects, whose tag codes
+          are counted directly, without building any tuples
+        - a generator (or other iterable) of any of the above
+
+    :examples:
+        stats = TagStatistics()
+        for document in documents:
+            stats.add(pos_tag(tokenize(document, levels_out=3)))
+        stats.tag_frequencies().most_common(10)
+        matrix, tags = stats.bigram_matrix()
+    """
+    def __init__(self):
+        self.tags = []              # tag for each code
+        self._codes = {}            # code for each tag
+        self.n_tokens = 0
+        self.n_sentences = 0
+        _load_numpy()
+        if numpy is None:
+            self._unigrams = Counter()
+            self._bigrams = Counter()
+        else:
+            self._unigrams = numpy.zeros(0, dtype=numpy.int64)
+            self._bigrams = numpy.zeros((0, 0), dtype=numpy.int64)
+
+    def add(self, tagged_list):
+        """
+        Adds the counts from a tagged or chunked document (or an iterable of
+        them) to the totals.
+
+        :param tagged_list: the tagged or chunked text. See TagStatistics.
+        :return: self, so that calls can be chained.
+        """
+        if isinstance(tagged_list, (CompactDocument, MappedCorpus)):
+            assert tagged_list.is_tagged, \
+                "Argument *tagged_list* in TagStatistics.add() must be POS " \
+                "tagged"
+            tag_names = tagged_list.vocabulary.tags \
+                if isinstance(tagged_list, CompactDocument) \
+                else tagged_list.tag_names
+            self._add_coded(tag_names, tagged_list.tags,
+                            tagged_list.sentence_bounds)
+        elif simple_nlp._is_stream(tagged_list):
+            for document in tagged_list:
+                self.add(document)
+        else:
+            self._add_sentences(_tagged_sentences(tagged_list))
+        return self
+
+    def _encode(self, tag):
+        code = self._codes.get(tag)
+        if code is None:
+            code = len(self.tags)
+            self.tags.append(tag)
+            self._codes[tag] = code
+        return code
+
+    def _add_sentences(self, sentences):
+        """ Counts a list of sentences, each a list of (word, tag) tuples """
+        tags = [token[1] for sentence in sentences for token in sentence]
+        for tag in set(tags).difference(self._codes):
+            self._encode(tag)
+        lengths = [len(sentence) for sentence in sentences]
+        if numpy is None:
+            codes = [self._codes[tag] for tag in tags]
+            bounds = [0]
+            for length in lengths:
+                bounds.append(bounds[-1] + length)
+        else:
+            codes = numpy.fromiter(map(self._codes.__getitem__, tags),
+                                   dtype=numpy.intp, count=len(tags))
+            bounds = numpy.zeros(len(lengths) + 1, dtype=numpy.intp)
+            numpy.cumsum(lengths, out=bounds[1:])
+        self._count(codes, bounds)
+
+    def _add_coded(self, tag_names, codes, sentence_bounds):
+        """
+        Counts tokens that are already integer coded, using *tag_names* to
+        map them to this object's own codes.
+        """
+        mapping = [self._encode(tag) for tag in tag_names]
+        if numpy is None:
+            codes = [mapping[code] for code in codes]
+            self._count(codes, list(sentence_bounds))
+            return
+
+        mapping = numpy.array(mapping, dtype=numpy.intp)
+        codes = numpy.asarray(codes)
+        bounds = numpy.asarray(sentence_bounds).astype(numpy.intp)
+        if len(bounds) < 2:
+            return
+        # Split into blocks of whole sentences, about BLOCK_SIZE tokens each
+        cuts = numpy.searchsorted(bounds, numpy.arange(BLOCK_SIZE,
+                                                       bounds[-1], BLOCK_SIZE))
+        cuts = numpy.unique(numpy.concatenate([[0], cuts,
+                                               [len(bounds) - 1]]))
+        for first, last in zip(cuts[:-1], cuts[1:]):
+            start, stop = bounds[first], bounds[last]
+            self._count(mapping[codes[start:stop]],
+                        bounds[first:last + 1] - start)
+
+    def _count(self, codes, bounds):
+        """
+        Adds the counts of a run of coded tokens, where *bounds* holds the
+        index of the first token of each sentence, plus the number of tokens.
+        """
+        self.n_tokens += len(codes)
+        self.n_sentences += len(bounds) - 1
+        if numpy is None:
+            self._unigrams.update(codes)
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                sentence = codes[start:stop]
+                self._bigrams.update(zip(sentence, sentence[1:]))
+            return
+
+        n = len(self.tags)
+        unigrams = numpy.bincount(codes, minlength=n)
+        # A pair of neighbouring tokens is a bigram, unless the second token
+        # starts a new sentence
+        keep = numpy.ones(max(len(codes) - 1, 0), dtype=bool)
+        breaks = bounds[1:-1] - 1
+        keep[breaks[(breaks >= 0) & (breaks < len(keep))]] = False
+        pairs = codes[:-1][keep] * n + codes[1:][keep]
+        bigrams = numpy.bincount(pairs, minlength=n * n).reshape(n, n)
+
+        self._grow(n)
+        self._unigrams += unigrams
+        self._bigrams += bigrams
+
+    def _grow(self, n):
+        """ Pads the count arrays with zeros to cover *n* tags """
+        old = len(self._unigrams)
+        if old < n:
+            unigrams = numpy.zeros(n, dtype=numpy.int64)
+            unigrams[:old] = self._unigrams
+            bigrams = numpy.zeros((n, n), dtype=numpy.int64)
+            bigrams[:old, :old] = self._bigrams
+            self._unigrams, self._bigrams = unigrams, bigrams
+
+    # --------------------------------------------------------------------------
+    #                                                                    RESULTS
+    # --------------------------------------------------------------------------
+    def tag_frequencies(self):
+        """
+        :return: (nltk.FreqDist) The number of tokens with each tag.
+        """
+        if numpy is None:
+            items = self._unigrams.items()
+        else:
+            codes = numpy.flatnonzero(self._unigrams)
+            items = zip(codes.tolist(), self._unigrams[codes].tolist())
+        return simple_nlp.nltk.FreqDist({self.tags[code]: count
+                                         for code, count in items})
+
+    def bigram_frequencies(self):
+        """
+        :return: (nltk.FreqDist) The number of times each (tag, next_tag)
+                 pair occurs within a sentence.
+        """
+        if numpy is None:
+            items = self._bigrams.items()
+        else:
+            first, second = numpy.nonzero(self._bigrams)
+            items = zip(zip(first.tolist(), second.tolist()),
+                        self._bigrams[first, second].tolist())
+        return simple_nlp.nltk.FreqDist({(self.tags[a], self.tags[b]): count
+                                         for (a, b), count in items})
+
+    def bigram_matrix(self):
+        """
+        The tag bigram counts as a co-occurrence matrix, where matrix[i][j]
+        is the number of times that a token tagged tags[i] is followed by a
+        token tagged tags[j] in the same sentence. The tags are sorted, and
+        only the tags that occur in the text are included.
+
+        :return: (tuple) (matrix, tags). The matrix is a 2D NumPy array, or
+                 a list of lists if NumPy is not installed.
+        """
+        if numpy is None:
+            tags = sorted(self.tags[code] for code in self._unigrams)
+            codes = [self._codes[tag] for tag in tags]
+            matrix = [[self._bigrams.get((a, b), 0) for b in codes]
+                      for a in codes]
+            return matrix, tags
+        used = numpy.flatnonzero(self._unigrams).tolist()
+        used.sort(key=self.tags.__getitem__)
+        return self._bigrams[numpy.ix_(used, used)], [self.tags[code]
+                                                      for code in used]
+
+    def __setstate__(self, state):
+        # An unpickled object (eg sent back from a worker process) skips
+        # __init__, so NumPy may not have been loaded yet
+        _load_numpy()
+        self.__dict__.update(state)
+
+    def __repr__(self):
+        return "<TagStatistics tokens={0} sentences={1} tags={2}>".format(
+            self.n_tokens, self.n_sentences, len(self.tags))
+
+
+def _tagged_sentences(x):
+    """
+    Takes a POS tagged or chunked list nested 1 to 3 levels deep, and returns
+    a flat list of its sentences, each a list of (word, tag) tuples.
+    """
+    assert isinstance(x, list), \
+        "Argument *tagged_list* must be a list, CompactDocument, MappedCorpus " \
+        "or an iterable of documents"
+    if len(x) == 0:
+        return []
+
+    # Chunked output has nltk.Tree sentences, which are lists themselves, so
+    # get_level() cannot be used to find how deep they are.
+    Tree = simple_nlp.nltk.Tree
+    if isinstance(x, Tree):
+        return [x.leaves()]
+    if isinstance(x[0], Tree):
+        return [tree.leaves() for tree in x]
+    if isinstance(x[0], list) and (len(x[0]) > 0) \
+            and isinstance(x[0][0], Tree):
+        return [tree.leaves() for paragraph in x for tree in paragraph]
+
+    levels = simple_nlp.get_level(x, type="pos_tagged")
+    if levels == 1:
+        return [x]
+    elif levels == 2:
+        return x
+    else:
+        return [sentence for paragraph in x for sentence in paragraph]
+
+
+# ==============================================================================
+#                                                                 TAG FREQUENCIES
+# ==============================================================================
+def tag_frequencies(tagged_list):
+    """
+    Counts how many tokens have each POS tag.
+
+    :param tagged_list: POS tagged or chunked text, nested 1 to 3 levels
+                        deep, a tagged CompactDocument or MappedCorpus, or an
+                        iterable of these. See TagStatistics.
+    :return: (nltk.FreqDist) tag counts
+
+    :examples:
+        tag_frequencies(pos_tag(tokenize(text, levels_out=3)))
+        # FreqDist({'NN': 1021, 'DT': 588, 'IN': 570, ...})
+    """
+    return TagStatistics().add(tagged_list).tag_frequencies()
+
+
+def tag_bigrams(tagged_list):
+    """
+    Counts how many times each tag is followed by each other tag, within a
+    sentence.
+
+    :param tagged_list: POS tagged or chunked text. See tag_frequencies()
+    :return: (nltk.FreqDist) counts of (tag, next_tag) tuples
+
+    :examples:
+        tag_bigrams(tagged)[("DT", "NN")]
+    """
+    return TagStatistics().add(tagged_list).bigram_frequencies()
+
+
+def tag_bigram_matrix(tagged_list):
+    """
+    Counts the tag bigrams in the same way as tag_bigrams(), but returns them
+    as a co-occurrence matrix. See TagStatistics.bigram_matrix()
+
+    :param tagged_list: POS tagged or chunked text. See tag_frequencies()
+    :return: (tuple) (matrix, tags)
+
+    :examples:
+        matrix, tags = tag_bigram_matrix(load_corpus("tagged_corpus"))
+        matrix[tags.index("DT"), tags.index("NN")]
+    """
+    return TagStatistics().add(tagged_list).bigram_matrix()
+
+
+# ==============================================================================
+#                                                              PHRASE FREQUENCIES
+# ==============================================================================
+def phrase_frequencies(tagged_list, pattern=simple_nlp.CHUNK_PATTERN_NP2,
+                       ne=False, binary=False, labels=None):
+    """
+    Counts how many times each phrase (eg each noun phrase or named entity)
+    occurs.
+
+    Chunked text (the output of chunk()) is counted as it is. POS tagged text
+    is chunked first, using extract_chunks(), which does not need to build
+    any trees.
+
+    :param tagged_list: POS tagged or chunked text, nested 1 to 3 levels
+                        deep, a tagged CompactDocument or MappedCorpus, or an
+                        iterable of these.
+    :param pattern: the chunking pattern used for POS tagged text. See chunk()
+    :param ne: (boolean) Use named entity chunking for POS tagged text?
+    :param binary: (boolean) Use binary named entity classification?
+    :param labels: (list of strings) Only count chunks with these labels, eg
+                   ["PERSON", "ORGANIZATION"]. By default all chunks are
+                   counted.
+    :return: (nltk.FreqDist) counts of the text of each phrase, with the words
+             joined by spaces.
+
+    :examples:
+        phrase_frequencies(tagged, pattern=CHUNK_PATTERN_NP1).most_common(20)
+        phrase_frequencies(chunked_ne, labels=["PERSON"])
+    """
+    counts = Counter()
+    if isinstance(tagged_list, MappedCorpus) \
+            or simple_nlp._is_stream(tagged_list):
+        documents = tagged_list
+    else:
+        documents = [tagged_list]
+    for document in documents:
+        if isinstance(document, CompactDocument):
+            document = document.tolist()
+        if len(document) == 0:
+            continue
+        if _is_chunked(document):
+            phrases = ((tree.label(), " ".join(token[0]
+                                                for token in tree.leaves()))
+                       for sentence in _chunked_sentences(document)
+                       for tree in sentence
+                       if isinstance(tree, simple_nlp.nltk.Tree))
+        else:
+            phrases = ((c.label, c.text)
+                       for c in extract_chunks(document, pattern=pattern,
+                                               ne=ne, binary=binary))
+        counts.update(text for label, text in phrases
+                      if (labels is None) or (label in labels))
+    return simple_nlp.nltk.FreqDist(counts)
+
+
+def _is_chunked(x):
+    """ Returns True if x is the output of chunk() """
+    Tree = simple_nlp.nltk.Tree
+    while isinstance(x, list) and not isinstance(x, Tree) and len(x) > 0:
+        x = x[0]
+    return isinstance(x, Tree)
+
+
+def _chunked_sentences(x):
+    """ Returns a flat list of the sentence trees in the output of chunk() """
+    Tree = simple_nlp.nltk.Tree
+    if isinstance(x, Tree):
+        return [x]
+    if isinstance(x[0], Tree):
+        return x
+    return [tree for paragraph in x for tree in paragraph]
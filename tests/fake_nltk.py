@@ -0,0 +1,151 @@
+"""====================================================
+                    FAKE NLTK
+
+Small rule based stand-ins for the nltk tokenizers, tagger and named entity
+chunker, so that the tests can run without downloading any nltk models.
+They follow the same calling conventions as the real ones, including
+parse_sents() returning a lazy generator, and the named entity chunker
+predicting IOB tags with a _tagger.
+=======================================================
+"""
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import re
+import unittest
+
+import nltk
+import nltk.chunk.named_entity
+import nltk.tokenize
+from nltk.tokenize.punkt import PunktSentenceTokenizer
+
+import simple_nlp
+
+
+def sent_tokenize(text, language="english"):
+    return [s for s in re.split(r"(?<=[.!?])\s+", text.strip()) if s]
+
+
+def word_tokenize(text, language="english", preserve_line=False):
+    return re.findall(r"\w+|[^\w\s]", text)
+
+
+def pos_tag(tokens, tagset=None, lang="eng"):
+    return [(token, "NNP" if token[:1].isupper()
+             else ("JJ" if token.endswith("ous") else "NN"))
+            for token in tokens]
+
+
+def pos_tag_sents(sentences, tagset=None, lang="eng"):
+    return [pos_tag(sentence) for sentence in sentences]
+
+
+class IOBTagger(object):
+    """
+    Gives each (word, tag) token an IOB tag, as the tagger inside nltk's
+    named entity chunker does. Runs of NNP tagged tokens are entities.
+    """
+    def __init__(self, label):
+        self.label = label
+
+    def tag(self, tagged_sentence):
+        iob = []
+        for i, (word, tag) in enumerate(tagged_sentence):
+            if tag != "NNP":
+                iob.append("O")
+            elif (i > 0) and (tagged_sentence[i - 1][1] == "NNP"):
+                iob.append("I-" + self.label)
+            else:
+                iob.append("B-" + self.label)
+        return list(zip(tagged_sentence, iob))
+
+
+class NEChunker(object):
+    """
+    Chunks runs of NNP tagged tokens as named entities. Like nltk's chunker,
+    it has a _tagger that predicts IOB tags, which are then turned into a
+    Tree by nltk's own code.
+    """
+    def __init__(self, binary=False, tagger=None):
+        self._tagger = tagger or IOBTagger("NE" if binary else "PERSON")
+
+    def parse(self, tagged_sentence):
+        return nltk.chunk.named_entity.NEChunkParser._tagged_to_parse(
+            self, self._tagger.tag(tagged_sentence))
+
+    def parse_sents(self, tagged_sentences):
+        # Lazy, as with nltk's chunkers
+        return (self.parse(sentence) for sentence in tagged_sentences)
+
+
+def ne_chunker(fmt="multiclass"):
+    return NEChunker(binary=(fmt == "binary"))
+
+
+def ne_chunk(tagged_sentence, binary=False):
+    return NEChunker(binary).parse(tagged_sentence)
+
+
+def ne_chunk_sents(tagged_sentences, binary=False):
+    return NEChunker(binary).parse_sents(tagged_sentences)
+
+
+_FAKES = {"sent_tokenize": sent_tokenize,
+          "word_tokenize": word_tokenize,
+          "pos_tag": pos_tag,
+          "pos_tag_sents": pos_tag_sents,
+          "ne_chunker": ne_chunker,
+          "ne_chunk": ne_chunk,
+          "ne_chunk_sents": ne_chunk_sents}
+_TOKENIZERS = ("sent_tokenize", "word_tokenize")
+_originals = {}
+_original_punkt = []
+
+
+def install(real_tokenizers=False):
+    """
+    Replaces the nltk functions with the fakes. With real_tokenizers=True,
+    nltk's own sentence and word tokenizers are kept, and if the trained
+    punkt model is not installed, an untrained punkt tokenizer is used in its
+    place.
+    """
+    if real_tokenizers:
+        _install_punkt()
+    for name, fake in _FAKES.items():
+        if real_tokenizers and (name in _TOKENIZERS):
+            continue
+        _originals.setdefault(name, getattr(nltk, name))
+        setattr(nltk, name, fake)
+    simple_nlp._ne_chunkers.clear()
+    simple_nlp._fast_tokenizer = None
+
+
+def uninstall():
+    """ Puts the real nltk functions back """
+    for name, original in _originals.items():
+        setattr(nltk, name, original)
+    _originals.clear()
+    if _original_punkt:
+        nltk.tokenize._get_punkt_tokenizer = _original_punkt.pop()
+    simple_nlp._ne_chunkers.clear()
+    simple_nlp._fast_tokenizer = None
+
+
+def _install_punkt():
+    get_punkt = getattr(nltk.tokenize, "_get_punkt_tokenizer", None)
+    if get_punkt is None:
+        raise unittest.SkipTest("needs nltk 3.8.2 or later")
+    try:
+        get_punkt("english")
+    except LookupError:
+        punkt = PunktSentenceTokenizer()
+        _original_punkt.append(get_punkt)
+        nltk.tokenize._get_punkt_tokenizer = lambda language="english": punkt
+
+
+TEXT = ("Joe Blogs gave us tickets to the show.\n"
+        "The humorous comedian entertained Alice and Bob. The clown, however, "
+        "frightened us.\n"
+        "\n"
+        "Big dogs bark loudly at night.")
@@ -0,0 +1,75 @@
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import subprocess
+import sys
+import unittest
+
+import simple_nlp
+
+from tests import fake_nltk
+
+try:
+    import asyncio
+    from simple_nlp import aio
+except (ImportError, SyntaxError):
+    aio = None
+
+
+class LazyImportTest(unittest.TestCase):
+    def test_import_does_not_load_asyncio(self):
+        code = "import sys, simple_nlp; print('asyncio' in sys.modules)"
+        output = subprocess.check_output([sys.executable, "-c", code])
+        self.assertEqual(output.strip(), b"False")
+
+    @unittest.skipIf(aio is None, "needs asyncio")
+    def test_async_names_are_loaded_on_use(self):
+        self.assertIs(simple_nlp.AsyncNLP, aio.AsyncNLP)
+        self.assertIs(simple_nlp.async_pos_tag, aio.async_pos_tag)
+        with self.assertRaises(AttributeError):
+            simple_nlp.not_a_function
+
+
+@unittest.skipIf(aio is None, "needs asyncio")
+class MicroBatcherCancelTest(unittest.TestCase):
+    def setUp(self):
+        fake_nltk.install()
+        self.batches = []
+        self.process_batch = aio._process_batch
+
+        def spy(kind, sentences, kwargs):
+            self.batches.append(len(sentences))
+            return self.process_batch(kind, sentences, kwargs)
+        aio._process_batch = spy
+
+    def tearDown(self):
+        aio._process_batch = self.process_batch
+        fake_nltk.uninstall()
+
+    def test_cancelled_requests_are_not_processed(self):
+        async def run():
+            nlp = aio.AsyncNLP(batch_window=0.05)
+            try:
+                cancelled = asyncio.ensure_future(
+                    nlp.pos_tag([["Some", "words"], ["More"]]))
+                kept = asyncio.ensure_future(nlp.pos_tag([["Hello"]]))
+                await asyncio.sleep(0.01)
+                cancelled.cancel()
+                result = await kept
+                return result, cancelled.cancelled()
+            finally:
+                nlp.close()
+
+        loop = asyncio.new_event_loop()
+        try:
+            result, was_cancelled = loop.run_until_complete(run())
+        finally:
+            loop.close()
+        self.assertEqual(result, [[("Hello", "NNP")]])
+        self.assertTrue(was_cancelled)
+        self.assertEqual(self.batches, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import unittest
+
+import nltk
+
+import simple_nlp
+from simple_nlp.benchmark import corpus_text, synthetic_corpus
+
+from tests import fake_nltk
+
+
+class BatchedCallTest(unittest.TestCase):
+    """
+    Batching must give exactly the same output as tagging (or chunking) one
+    paragraph at a time, however the sentences get split into batches.
+    """
+    def setUp(self):
+        fake_nltk.install()
+        self.calls = []
+        pos_tag_sents = nltk.pos_tag_sents
+
+        def counting_pos_tag_sents(sentences, *args, **kwargs):
+            self.calls.append(len(sentences))
+            return pos_tag_sents(sentences, *args, **kwargs)
+        nltk.pos_tag_sents = counting_pos_tag_sents
+
+        # Documents of 3 paragraphs, with empty paragraphs at the start, in
+        # the middle and at the end of some of them, and an empty document
+        texts = [corpus_text(synthetic_corpus(3, sentences_per_paragraph=3,
+                                              seed=seed))
+                 for seed in range(6)]
+        texts[1] = "  \n" + texts[1]
+        texts[2] = texts[2].replace("\n", "\n\t\n", 1)
+        texts[3] = texts[3] + "\n "
+        texts[4] = " "
+        self.documents = [simple_nlp.tokenize(text, levels_out=3)
+                          for text in texts]
+        self.sentences = [[sentence for paragraph in document
+                           for sentence in paragraph]
+                          for document in self.documents]
+
+    def tearDown(self):
+        fake_nltk.uninstall()
+
+    def test_pos_tag_lists(self):
+        for documents in (self.documents, self.sentences):
+            for document in documents:
+                expected = simple_nlp.pos_tag(document)
+                for max_batch_size in (None, 1, 2, 5):
+                    del self.calls[:]
+                    self.assertEqual(simple_nlp.pos_tag(
+                        document, batch=True, max_batch_size=max_batch_size),
+                        expected)
+                    self.assertTrue(all(n <= (max_batch_size or n)
+                                        for n in self.calls))
+
+    def test_pos_tag_streams_across_documents(self):
+        for documents in (self.documents, self.sentences):
+            expected = [simple_nlp.pos_tag(document) for document in documents]
+            for max_batch_size in (1, 4, 7, 100):
+                del self.calls[:]
+                tagged = simple_nlp.pos_tag(iter(documents), batch=True,
+                                            max_batch_size=max_batch_size)
+                self.assertEqual(list(tagged), expected)
+                self.assertTrue(all(n <= max_batch_size for n in self.calls))
+                if max_batch_size == 100:
+                    # All the documents were tagged in a single call
+                    self.assertEqual(len(self.calls), 1)
+
+    def test_named_entities(self):
+        for documents in (self.documents, self.sentences):
+            tagged = [simple_nlp.pos_tag(document) for document in documents]
+            expected = [simple_nlp.named_entities(document, False)
+                        for document in tagged]
+            for max_batch_size in (None, 1, 4):
+                self.assertEqual(
+                    [simple_nlp.named_entities(document, False, batch=True,
+                                               max_batch_size=max_batch_size)
+                     for document in tagged], expected)
+            for max_batch_size in (1, 4, 100):
+                stream = simple_nlp.named_entities(
+                    iter(tagged), False, batch=True,
+                    max_batch_size=max_batch_size)
+                self.assertEqual(list(stream), expected)
+                stream = simple_nlp.chunk(iter(tagged), ne=True, batch=True,
+                                          max_batch_size=max_batch_size)
+                self.assertEqual(list(stream), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from simple_nlp import cache
+
+
+class ResultCacheStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "cache.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_threads_share_one_store(self):
+        opened = []
+        original = cache.SQLiteStore
+
+        class SlowStore(original):
+            def __init__(self, path):
+                opened.append(path)
+                time.sleep(0.05)
+                original.__init__(self, path)
+
+        cache.SQLiteStore = SlowStore
+        try:
+            results = cache.ResultCache(path=self.path)
+            threads = [threading.Thread(target=results.put,
+                                        args=("key{0}".format(i), i))
+                       for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            cache.SQLiteStore = original
+        self.assertEqual(len(opened), 1)
+        results.memory.clear()
+        self.assertEqual([results.get("key{0}".format(i)) for i in range(8)],
+                         list(range(8)))
+        results.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import os
+import subprocess
+import sys
+import unittest
+
+import simple_nlp
+from simple_nlp.benchmark import synthetic_corpus
+
+from tests import fake_nltk
+
+# Several stages, with chinking, and a stage that builds on the chunks of the
+# one before
+MULTI_STAGE_PATTERN = r"""
+    NP:     {<DT>?<JJ>*<NN.*>+}
+            }<NNS>{
+    PP:     {<IN><NP>}
+    CLAUSE: {<NP><VBD><NP|PP>*}
+"""
+
+
+class ChunkMultiTest(unittest.TestCase):
+    def setUp(self):
+        fake_nltk.install()
+        self.patterns = {"np1": simple_nlp.CHUNK_PATTERN_NP1,
+                         "np2": simple_nlp.CHUNK_PATTERN_NP2,
+                         "np3": simple_nlp.CHUNK_PATTERN_NP3,
+                         "multi": MULTI_STAGE_PATTERN}
+        self.tagged = synthetic_corpus(20)
+        self.tagged[3] = []                 # an empty paragraph
+
+    def tearDown(self):
+        fake_nltk.uninstall()
+
+    def expected(self, tagged):
+        return dict((name, simple_nlp.chunk(tagged, pattern=pattern))
+                    for name, pattern in self.patterns.items())
+
+    def test_same_as_chunk_at_each_level(self):
+        sentences = [s for paragraph in self.tagged for s in paragraph]
+        for tagged in (self.tagged, sentences, sentences[0]):
+            self.assertEqual(simple_nlp.chunk_multi(tagged, self.patterns),
+                             self.expected(tagged))
+
+    def test_multi_stage_pattern_builds_nested_chunks(self):
+        trees = simple_nlp.chunk_multi(self.tagged, self.patterns)["multi"]
+        labels = set(subtree.label() for paragraph in trees
+                     for tree in paragraph for subtree in tree.subtrees())
+        self.assertTrue({"NP", "PP", "CLAUSE"} <= labels, labels)
+
+    def test_compact_and_stream(self):
+        compact = simple_nlp.CompactDocument.from_nested(self.tagged)
+        self.assertEqual(simple_nlp.chunk_multi(compact, self.patterns),
+                         self.expected(self.tagged))
+        stream = simple_nlp.chunk_multi(iter(self.tagged), self.patterns)
+        self.assertEqual(list(stream),
+                         [self.expected(paragraph)
+                          for paragraph in self.tagged])
+
+
+class ChunkerCacheTest(unittest.TestCase):
+    def setUp(self):
+        simple_nlp.clear_chunker_cache()
+
+    def tearDown(self):
+        simple_nlp.clear_chunker_cache()
+
+    @staticmethod
+    def pattern(i):
+        return "NP%d: {<DT>?<JJ>*<NN>{1,%d}}" % (i, i + 1)
+
+    def test_hits_and_misses(self):
+        first = simple_nlp.get_chunker(self.pattern(0))
+        self.assertIs(simple_nlp.get_chunker(self.pattern(0)), first)
+        simple_nlp.get_chunker(self.pattern(1))
+        info = simple_nlp.chunker_cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 2, 2))
+        self.assertEqual(info.maxsize, simple_nlp.CHUNKER_CACHE_SIZE)
+
+        # chunk() goes through the same cache
+        simple_nlp.chunk([("the", "DT"), ("dog", "NN")],
+                         pattern=self.pattern(1))
+        self.assertEqual(simple_nlp.chunker_cache_info().hits, 2)
+
+        simple_nlp.clear_chunker_cache()
+        info = simple_nlp.chunker_cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (0, 0, 0))
+
+    def test_least_recently_used_is_evicted(self):
+        size = simple_nlp.CHUNKER_CACHE_SIZE
+        first = simple_nlp.get_chunker(self.pattern(0))
+        second = simple_nlp.get_chunker(self.pattern(1))
+        for i in range(2, size):
+            simple_nlp.get_chunker(self.pattern(i))
+        simple_nlp.get_chunker(self.pattern(0))     # now the most recent
+        simple_nlp.get_chunker(self.pattern(size))  # one more than fits
+        info = simple_nlp.chunker_cache_info()
+        self.assertEqual(info.currsize, size)
+        self.assertEqual(info.misses, size + 1)
+
+        self.assertIs(simple_nlp.get_chunker(self.pattern(0)), first)
+        self.assertIsNot(simple_nlp.get_chunker(self.pattern(1)), second)
+        self.assertEqual(simple_nlp.chunker_cache_info().misses, size + 2)
+
+    def test_presets_are_compiled_lazily_and_never_evicted(self):
+        self.assertEqual(simple_nlp.chunker_cache_info().currsize, 0)
+        preset = simple_nlp.get_chunker(simple_nlp.CHUNK_PATTERN_NP2)
+        info = simple_nlp.chunker_cache_info()
+        self.assertEqual((info.misses, info.currsize), (1, 1))
+
+        for i in range(simple_nlp.CHUNKER_CACHE_SIZE + 1):
+            simple_nlp.get_chunker(self.pattern(i))
+        self.assertIs(simple_nlp.get_chunker(simple_nlp.CHUNK_PATTERN_NP2),
+                      preset)
+        self.assertEqual(simple_nlp.chunker_cache_info().currsize,
+                         simple_nlp.CHUNKER_CACHE_SIZE + 1)
+
+    def test_importing_does_not_compile_presets(self):
+        code = "import simple_nlp, sys; " \
+               "sys.exit(simple_nlp.chunker_cache_info().currsize)"
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(subprocess.call([sys.executable, "-c", code],
+                                         cwd=root), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import simple_nlp
+from simple_nlp import cli
+
+from tests import fake_nltk
+from tests.test_pipeline import needs_fork
+
+
+class NamedEntityCommandLineTest(unittest.TestCase):
+    def setUp(self):
+        fake_nltk.install()
+        self.directory = tempfile.mkdtemp()
+        self.documents = [fake_nltk.TEXT, "Alice met Bob.\nThey talked."] * 5
+        self.input = os.path.join(self.directory, "docs.jsonl")
+        with io.open(self.input, "w", encoding="utf-8") as f:
+            for i, text in enumerate(self.documents):
+                f.write(json.dumps({"id": i, "text": text}) + "\n")
+        self.output = os.path.join(self.directory, "out.jsonl")
+
+    def tearDown(self):
+        fake_nltk.uninstall()
+        shutil.rmtree(self.directory)
+
+    def run_cli(self, *options):
+        status = cli.main([self.input, "-o", self.output, "--ne",
+                           "--chunksize", "2", "--flush-every", "3"]
+                          + list(options))
+        self.assertEqual(status, 0)
+        with io.open(self.output, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def check_output(self, records):
+        self.assertEqual([record["id"] for record in records],
+                         list(range(len(self.documents))))
+        for record, text in zip(records, self.documents):
+            expected = simple_nlp.chunk(simple_nlp.pos_tag(
+                simple_nlp.tokenize(text, levels_out=3)), ne=True)
+            self.assertEqual(record["result"], cli.to_json(expected))
+        # The named entities come out as label/children trees
+        sentence = records[0]["result"][0][0]
+        self.assertEqual(sentence["label"], "S")
+        self.assertEqual(sentence["children"][0]["label"], "PERSON")
+
+    def test_one_worker(self):
+        self.check_output(self.run_cli("--workers", "1"))
+
+    @needs_fork
+    def test_two_workers(self):
+        self.check_output(self.run_cli("--workers", "2"))
+
+    @needs_fork
+    def test_two_workers_with_checkpoint(self):
+        checkpoint = os.path.join(self.directory, "out.ckpt")
+        self.check_output(self.run_cli("--workers", "2",
+                                       "--checkpoint", checkpoint))
+        with open(checkpoint) as f:
+            self.assertEqual(json.load(f)["documents_done"],
+                             len(self.documents))
+
+    @needs_fork
+    def test_small_max_pending(self):
+        # main() checks that no more than --max-pending ids are kept aside
+        self.check_output(self.run_cli("--workers", "2",
+                                       "--max-pending", "2"))
+
+    def run_cli_stderr(self, *options):
+        stderr = sys.stderr
+        sys.stderr = io.StringIO() if sys.version_info[0] >= 3 \
+            else io.BytesIO()
+        try:
+            self.run_cli(*options)
+            return sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+
+    def test_progress_only_reported_when_asked_for(self):
+        self.assertEqual(self.run_cli_stderr("--workers", "1"), "")
+        report = self.run_cli_stderr("--workers", "1", "--progress")
+        self.assertIn("Done: {0} documents".format(len(self.documents)),
+                      report)
+
+    def test_max_pending_smaller_than_chunksize(self):
+        with self.assertRaises(SystemExit):
+            cli.main([self.input, "-o", self.output, "--chunksize", "4",
+                      "--max-pending", "2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import pickle
+import unittest
+
+from simple_nlp.compact import CompactDocument, TagVocabulary
+
+PARAGRAPHS = [[["Joe", "Blogs", "gave", "us", "tickets", "."]],
+              [["The", "café", "was", "busy", "."],
+               ["Ça", "va", "?"]],
+              [["Big", "dogs", "bark", "."]]]
+TAGGED = [[[(word, "NNP" if word[0].isupper() else "NN")
+            for word in sentence] for sentence in paragraph]
+          for paragraph in PARAGRAPHS]
+
+
+def _levels(paragraphs):
+    """ The same text nested 1, 2 and 3 levels deep """
+    sentences = [sentence for paragraph in paragraphs
+                 for sentence in paragraph]
+    tokens = [token for sentence in sentences for token in sentence]
+    return {1: tokens, 2: sentences, 3: paragraphs}
+
+
+class TagVocabularyTest(unittest.TestCase):
+    def test_encode_and_decode(self):
+        vocabulary = TagVocabulary(["NN", "JJ"])
+        self.assertEqual(vocabulary.encode("JJ"), 1)
+        self.assertEqual(vocabulary.encode("VBD"), 2)
+        self.assertEqual(vocabulary.decode(2), "VBD")
+        self.assertEqual(len(vocabulary), 3)
+        self.assertIn("NN", vocabulary)
+        self.assertNotIn("DT", vocabulary)
+
+    def test_pickle(self):
+        vocabulary = pickle.loads(pickle.dumps(TagVocabulary(["NN", "JJ"])))
+        self.assertEqual(vocabulary.tags, ["NN", "JJ"])
+        self.assertEqual(vocabulary.encode("DT"), 2)
+
+
+class CompactDocumentTest(unittest.TestCase):
+    def test_from_nested_round_trip(self):
+        for paragraphs in (PARAGRAPHS, TAGGED):
+            for levels, x in _levels(paragraphs).items():
+                doc = CompactDocument.from_nested(x, TagVocabulary())
+                self.assertEqual(doc.levels, levels)
+                self.assertEqual(doc.tolist(), x)
+                self.assertEqual(list(doc), x)
+                self.assertEqual(len(doc), len(x))
+                self.assertEqual(doc.is_tagged, paragraphs is TAGGED)
+
+    def test_indexing_and_slicing(self):
+        for paragraphs in (PARAGRAPHS, TAGGED):
+            for levels, x in _levels(paragraphs).items():
+                doc = CompactDocument.from_nested(x)
+                for i in range(-len(x), len(x)):
+                    self.assertEqual(doc[i], x[i])
+                self.assertEqual(doc[1:], x[1:])
+                self.assertEqual(doc[::-2], x[::-2])
+                self.assertEqual(doc[5:100], x[5:100])
+                with self.assertRaises(IndexError):
+                    doc[len(x)]
+        doc = CompactDocument.from_nested(TAGGED)
+        self.assertEqual(doc.sentence(2), TAGGED[1][1])
+        self.assertEqual(doc.token(7), ("café", "NN"))
+        self.assertEqual(doc.tokens(6, 8), [("The", "NNP"), ("café", "NN")])
+
+    def test_pickle_with_vocabulary(self):
+        vocabulary = TagVocabulary(["DT"])
+        doc = CompactDocument.from_nested(TAGGED, vocabulary)
+        copy = pickle.loads(pickle.dumps(doc))
+        self.assertEqual(copy, doc)
+        self.assertEqual(copy.tolist(), TAGGED)
+        self.assertEqual(copy.vocabulary.tags, vocabulary.tags)
+        self.assertEqual(list(copy.tags), list(doc.tags))
+
+    def test_empty_first_paragraph(self):
+        # tokenize(text, levels_out=3) gives an empty paragraph for a line of
+        # whitespace at the start of the text
+        for paragraphs in (PARAGRAPHS, TAGGED):
+            x = [[]] + paragraphs + [[]]
+            doc = CompactDocument.from_nested(x)
+            self.assertEqual(doc.levels, 3)
+            self.assertEqual(doc.tolist(), x)
+            self.assertEqual(doc[0], [])
+
+    def test_empty_documents(self):
+        self.assertEqual(CompactDocument.from_nested([]).tolist(), [])
+        doc = CompactDocument.from_nested([[]])
+        self.assertEqual(doc.tolist(), [[]])
+
+    def test_mixed_tagging_is_rejected(self):
+        with self.assertRaises(AssertionError):
+            CompactDocument.from_nested([["a", ("b", "NN")]])
+        with self.assertRaises(AssertionError):
+            CompactDocument.from_nested([[("a", "NN"), "b"]])
+
+    def test_with_tags_shares_the_tokens(self):
+        doc = CompactDocument.from_nested(PARAGRAPHS)
+        tags = [tag for paragraph in TAGGED for sentence in paragraph
+                for word, tag in sentence]
+        tagged = doc.with_tags(tags)
+        self.assertEqual(tagged.tolist(), TAGGED)
+        self.assertIs(tagged.token_ends, doc.token_ends)
+        with self.assertRaises(AssertionError):
+            doc.with_tags(tags[:-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
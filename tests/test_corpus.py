@@ -0,0 +1,144 @@
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from simple_nlp.compact import CompactDocument
+from simple_nlp.corpus import (CorpusWriter, MappedCorpus, load_corpus,
+                               save_corpus)
+
+
+def _tag(x):
+    """ Tags the tokens of a nested list with made up tags """
+    if isinstance(x, list):
+        return [_tag(item) for item in x]
+    return (x, "NNP" if x[:1].isupper() else "NN")
+
+
+DOCUMENTS = [
+    # Paragraphs, with an empty one (a whitespace only line) in the middle
+    [[["Joe", "Blogs", "gave", "us", "tickets", "."]],
+     [],
+     [["The", "café", "was", "busy", "."], ["Ça", "va", "?"]]],
+    # Sentences
+    [["Zoë", "saw", "the", "naïve", "señor", "."], ["日本", "語", "!"]],
+    # Tokens
+    ["Big", "dogs", "bark", "."],
+    # Paragraphs, starting with an empty one
+    [[], [["Alice", "met", "Bob", "."]]],
+    # Nothing at all
+    [],
+]
+
+
+class CorpusTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "corpus")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def save_and_load(self, documents):
+        self.assertEqual(save_corpus(iter(documents), self.path),
+                         len(documents))
+        return load_corpus(self.path)
+
+    def test_round_trip(self):
+        for documents in (DOCUMENTS, _tag(DOCUMENTS)):
+            with self.save_and_load(documents) as corpus:
+                self.assertEqual(len(corpus), len(documents))
+                self.assertEqual(list(corpus), documents)
+                self.assertEqual(corpus[:], documents)
+                self.assertEqual(corpus.is_tagged, documents is not DOCUMENTS)
+                # A flat list of tokens is stored as one paragraph with one
+                # sentence, even if it is empty
+                self.assertEqual(corpus.n_paragraphs, 3 + 1 + 1 + 2 + 1)
+                self.assertEqual(corpus.n_sentences, 3 + 2 + 1 + 1 + 1)
+
+    def test_random_access(self):
+        documents = _tag(DOCUMENTS)
+        with self.save_and_load(documents) as corpus:
+            for i in (3, 0, -4, 1):
+                self.assertEqual(corpus[i], documents[i])
+            with self.assertRaises(IndexError):
+                corpus[len(documents)]
+            sentences = [documents[0][0][0]] + documents[0][2] \
+                        + documents[1] + [documents[2]] + documents[3][1] \
+                        + [documents[4]]
+            self.assertEqual(corpus.sentences(), sentences)
+            self.assertEqual(corpus.sentences(2, 5), sentences[2:5])
+            self.assertEqual(corpus.sentence(3), _tag(["Zoë", "saw", "the",
+                                                       "naïve", "señor", "."]))
+            self.assertEqual(corpus.tokens(20, 22), _tag(["日本", "語"]))
+            self.assertEqual(corpus.paragraph(1), [])
+            self.assertEqual(corpus.compact_document(1),
+                             CompactDocument.from_nested(documents[1]))
+
+    def test_reopen(self):
+        documents = _tag(DOCUMENTS)
+        self.save_and_load(documents).close()
+        first = load_corpus(self.path)
+        second = MappedCorpus(self.path)
+        self.assertEqual(list(first), documents)
+        first.close()
+        self.assertEqual(list(second), documents)
+        second.close()
+        with load_corpus(self.path) as corpus:
+            self.assertEqual(corpus[4], [])
+
+    def test_compact_documents(self):
+        compact = [CompactDocument.from_nested(document)
+                   for document in _tag(DOCUMENTS)]
+        with self.save_and_load(compact) as corpus:
+            self.assertEqual(list(corpus), _tag(DOCUMENTS))
+
+    def test_empty_corpus(self):
+        with self.save_and_load([]) as corpus:
+            self.assertEqual(len(corpus), 0)
+            self.assertEqual(list(corpus), [])
+            self.assertEqual(corpus.n_tokens, 0)
+
+    def test_bad_document_leaves_the_writer_intact(self):
+        documents = _tag(DOCUMENTS)
+        with CorpusWriter(self.path) as writer:
+            writer.add(documents[0])
+            # The last token is not tagged
+            with self.assertRaises(AssertionError):
+                writer.add([[("A", "DT"), ("dog", "NN"), "barked"]])
+            with self.assertRaises(AssertionError):
+                writer.add([("A", "DT"), (7, "CD")])
+            writer.add(documents[1])
+        with load_corpus(self.path) as corpus:
+            self.assertEqual(list(corpus), documents[:2])
+            self.assertEqual(corpus.n_tokens, 6 + 5 + 3 + 6 + 3)
+
+    def test_incomplete_or_foreign_corpus_is_rejected(self):
+        writer = CorpusWriter(self.path)
+        writer.add(DOCUMENTS[0])
+        with self.assertRaises(ValueError):
+            load_corpus(self.path)          # not closed yet
+        writer.close()
+
+        meta_path = os.path.join(self.path, "meta.json")
+        with open(meta_path) as f:
+            meta = json.load(f)
+        self.assertEqual(meta["byteorder"], sys.byteorder)
+        for key, value in [("byteorder", "little" if sys.byteorder == "big"
+                            else "big"),
+                           ("version", meta["version"] + 1),
+                           ("format", "something else")]:
+            with open(meta_path, "w") as f:
+                json.dump(dict(meta, **{key: value}), f)
+            with self.assertRaises(ValueError):
+                load_corpus(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
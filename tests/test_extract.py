@@ -0,0 +1,160 @@
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import unittest
+
+import nltk
+
+import simple_nlp
+from simple_nlp import extract_chunks
+from simple_nlp.benchmark import synthetic_corpus
+from simple_nlp.extract import _single_chunk_stage
+
+from tests import fake_nltk
+from tests.test_chunk import MULTI_STAGE_PATTERN
+
+
+def _tree_walk(chunked):
+    """
+    The chunks found by walking through the trees returned by chunk(), as
+    (label, text, paragraph, sentence, start, end) tuples.
+    """
+    found = []
+
+    def walk(tree, i, j, start):
+        for child in tree:
+            if isinstance(child, nltk.Tree):
+                leaves = child.leaves()
+                found.append((child.label(),
+                              " ".join(word for word, tag in leaves), i, j,
+                              start, start + len(leaves)))
+                walk(child, i, j, start)
+                start += len(leaves)
+            else:
+                start += 1
+
+    for i, paragraph in enumerate(chunked):
+        for j, tree in enumerate(paragraph):
+            walk(tree, i, j, 0)
+    return found
+
+
+def _records(chunks):
+    return [(c.label, c.text, c.paragraph, c.sentence, c.start, c.end)
+            for c in chunks]
+
+
+class RegexpExtractTest(unittest.TestCase):
+    def setUp(self):
+        fake_nltk.install()
+        self.tagged = synthetic_corpus(30)
+        self.tagged[2] = []                 # an empty paragraph
+
+    def tearDown(self):
+        fake_nltk.uninstall()
+
+    def check_pattern(self, pattern):
+        expected = _tree_walk(simple_nlp.chunk(self.tagged, pattern=pattern))
+        self.assertTrue(len(expected) > 0)
+        self.assertEqual(_records(extract_chunks(self.tagged,
+                                                 pattern=pattern)),
+                         expected)
+
+    def test_presets_match_chunk(self):
+        for pattern in (simple_nlp.CHUNK_PATTERN_NP1,
+                        simple_nlp.CHUNK_PATTERN_NP2,
+                        simple_nlp.CHUNK_PATTERN_NP3):
+            # The presets are read from the ChunkString encoding directly
+            self.assertIsNotNone(
+                _single_chunk_stage(simple_nlp.get_chunker(pattern)))
+            self.check_pattern(pattern)
+
+    def test_chinking_pattern_matches_chunk(self):
+        self.check_pattern("NP: {<DT>?<JJ>*<NN.*>+<VBD>?}\n    }<VBD>{")
+
+    def test_multi_stage_pattern_matches_chunk(self):
+        self.assertIsNone(_single_chunk_stage(
+            simple_nlp.get_chunker(MULTI_STAGE_PATTERN)))
+        self.check_pattern(MULTI_STAGE_PATTERN)
+
+    def test_levels(self):
+        expected = _records(extract_chunks(self.tagged[:2]))
+        sentences = self.tagged[0] + self.tagged[1]
+        n = len(self.tagged[0])
+        self.assertEqual([(label, text, 0, j + n * i, start, end)
+                          for label, text, i, j, start, end in expected],
+                         _records(extract_chunks(sentences)))
+        self.assertEqual([record for record in expected
+                          if record[2:4] == (0, 0)],
+                         _records(extract_chunks(sentences[0])))
+
+
+class CountingIOBTagger(fake_nltk.IOBTagger):
+    """ Gives each word a fixed IOB tag, and counts the calls """
+    IOB = {"Joe": "B-PERSON", "Blogs": "I-PERSON",
+           "Acme": "I-ORGANIZATION",        # I- with nothing to continue
+           "Sydney": "B-GPE", "London": "B-GPE",
+           "Alice": "B-PERSON", "Bob": "I-GPE"}
+
+    def __init__(self):
+        self.calls = 0
+
+    def tag(self, tagged_sentence):
+        self.calls += 1
+        return [(token, self.IOB.get(token[0], "O"))
+                for token in tagged_sentence]
+
+
+class NamedEntityExtractTest(unittest.TestCase):
+    def setUp(self):
+        fake_nltk.install()
+        self.tagger = CountingIOBTagger()
+        self.chunker = fake_nltk.NEChunker(tagger=self.tagger)
+        simple_nlp._ne_chunkers[False] = self.chunker
+        self.tagged = [
+            [[("Joe", "NNP"), ("Blogs", "NNP"), ("met", "VBD"),
+              ("Alice", "NNP"), ("Bob", "NNP"), ("in", "IN"),
+              ("Sydney", "NNP"), ("London", "NNP"), (".", ".")],
+             [("Acme", "NNP"), ("Acme", "NNP"), ("sold", "VBD"),
+              ("Blogs", "NNP"), (".", ".")]],
+            [],
+            [[("Nobody", "NN"), ("came", "VBD"), (".", ".")]]]
+
+    def tearDown(self):
+        fake_nltk.uninstall()
+
+    def test_iob_path_matches_chunk(self):
+        expected = _tree_walk(simple_nlp.chunk(self.tagged, ne=True))
+        calls = self.tagger.calls
+        chunks = extract_chunks(self.tagged, ne=True)
+        self.assertEqual(_records(chunks), expected)
+        # Each sentence was tagged once, and no Trees were built
+        self.assertEqual(self.tagger.calls - calls, 3)
+        self.assertEqual([(c.label, c.text) for c in chunks],
+                         [("PERSON", "Joe Blogs"), ("PERSON", "Alice"),
+                          ("GPE", "Bob"), ("GPE", "Sydney"),
+                          ("GPE", "London"), ("ORGANIZATION", "Acme Acme"),
+                          ("PERSON", "Blogs")])
+
+    def test_chunker_without_tagger_falls_back_to_trees(self):
+        del self.chunker._tagger
+        self.chunker.parse = lambda sentence: nltk.Tree("S", [
+            nltk.Tree("PERSON", [token]) if token[1] == "NNP" else token
+            for token in sentence])
+        chunks = extract_chunks(self.tagged, ne=True)
+        self.assertEqual(_records(chunks),
+                         _tree_walk(simple_nlp.chunk(self.tagged, ne=True)))
+        self.assertEqual(len(chunks), 9)
+
+    def test_default_fake_chunker(self):
+        simple_nlp._ne_chunkers.clear()
+        for binary in (False, True):
+            self.assertEqual(
+                _records(extract_chunks(self.tagged, ne=True, binary=binary)),
+                _tree_walk(simple_nlp.chunk(self.tagged, ne=True,
+                                            binary=binary)))
+
+
+if __name__ == "__main__":
+    unittest.main()
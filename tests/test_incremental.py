@@ -0,0 +1,55 @@
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import unittest
+
+import simple_nlp
+from simple_nlp import IncrementalDocument
+
+from tests import fake_nltk
+
+
+class IncrementalDocumentTest(unittest.TestCase):
+    def setUp(self):
+        fake_nltk.install()
+        self.text = fake_nltk.TEXT
+        self.edited = self.text.replace("Big dogs", "Small Cats") \
+                      + "\nAlice waved at Bob."
+
+    def tearDown(self):
+        fake_nltk.uninstall()
+
+    def full_run(self, text, **kwargs):
+        return simple_nlp.Pipeline(levels_out=3, **kwargs).process(text)
+
+    def check_updates(self, **kwargs):
+        doc = IncrementalDocument(self.text, **kwargs)
+        self.assertEqual(doc.result, self.full_run(self.text, **kwargs))
+
+        result = doc.update(self.edited)
+        self.assertEqual(result, self.full_run(self.edited, **kwargs))
+        self.assertEqual(doc.last_update.reused, 2)
+        self.assertEqual(doc.last_update.processed, 2)
+
+        # Unchanged paragraphs are reused again, and must still be complete
+        result = doc.update(self.edited + "\nOne more.")
+        self.assertEqual(doc.last_update.processed, 1)
+        self.assertEqual(doc.last_update.reused, 4)
+        self.assertEqual(result, self.full_run(self.edited + "\nOne more.",
+                                               **kwargs))
+
+    def test_pattern_chunking(self):
+        self.check_updates()
+
+    def test_named_entities(self):
+        self.check_updates(ne=True)
+
+    def test_named_entity_paragraphs_are_lists(self):
+        doc = IncrementalDocument(self.text, ne=True)
+        for paragraph in doc.result:
+            self.assertIsInstance(paragraph, list)
+
+
+if __name__ == "__main__":
+    unittest.main()
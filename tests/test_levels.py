@@ -0,0 +1,79 @@
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import unittest
+
+import nltk
+
+import simple_nlp
+from simple_nlp import get_level
+
+from tests import fake_nltk
+
+
+class GetLevelTest(unittest.TestCase):
+    def test_levels(self):
+        self.assertEqual(get_level(["a", "b"]), 1)
+        self.assertEqual(get_level([["a"], ["b"]]), 2)
+        self.assertEqual(get_level([[["a"]], [["b"]]]), 3)
+        self.assertEqual(get_level([[("a", "DT")]], type="pos_tagged"), 2)
+
+    def test_empty_branches_are_skipped(self):
+        # tokenize(" \nA b.", levels_out=3) starts with an empty paragraph
+        for x in ([[], [["a", "b"]]], [[], [], [["a"]], []]):
+            self.assertEqual(get_level(x), 3)
+            self.assertEqual(get_level(x, check_consistent=True), 3)
+        self.assertEqual(get_level([[], ["a"]], check_consistent=True), 2)
+
+    def test_only_empty_lists(self):
+        self.assertEqual(get_level([]), 1)
+        self.assertEqual(get_level([[]]), 2)
+        self.assertEqual(get_level([[[]]]), 3)
+
+    def test_wrong_element_type(self):
+        with self.assertRaisesRegex(AssertionError, "nested list of strings"):
+            get_level([[], [("a", "DT")]])
+        with self.assertRaisesRegex(AssertionError, "nested list of tuples"):
+            get_level([[], ["a"]], type="pos_tagged")
+        with self.assertRaisesRegex(AssertionError, "You are in too deep"):
+            get_level([[], [[["a"]]]])
+
+    def test_inconsistent_level_gives_the_index(self):
+        cases = [([["a", "b"], [["c", "d"]]], r"depth 2 to be strings, but "
+                                             r"x\[1\]\[0\] is \['c', 'd'\]"),
+                 ([[["a"]], [["b"], "c"]], r"depth 2 to be lists, but "
+                                          r"x\[1\]\[1\] is 'c'"),
+                 ([[], [["a", ["b"]]]], r"depth 3 to be strings, but "
+                                        r"x\[1\]\[0\]\[1\] is \['b'\]")]
+        for x, message in cases:
+            with self.assertRaisesRegex(AssertionError, message):
+                get_level(x, check_consistent=True)
+
+
+class LeadingEmptyParagraphTest(unittest.TestCase):
+    def setUp(self):
+        fake_nltk.install()
+        self.text = "   \nJoe Blogs gave us tickets.\n\t\nAlice met Bob."
+        self.tokens = simple_nlp.tokenize(self.text, levels_out=3)
+
+    def tearDown(self):
+        fake_nltk.uninstall()
+
+    def test_stages_accept_a_leading_empty_paragraph(self):
+        self.assertEqual(self.tokens[0], [])
+        expected = [[]] + simple_nlp.pos_tag(self.tokens[1:2]) + [[]] \
+                   + simple_nlp.pos_tag(self.tokens[3:])
+        for batch in (False, True):
+            tagged = simple_nlp.pos_tag(self.tokens, batch=batch)
+            self.assertEqual(tagged, expected)
+            chunked = simple_nlp.chunk(tagged)
+            self.assertEqual(chunked[0], [])
+            self.assertIsInstance(chunked[1][0], nltk.Tree)
+            named = simple_nlp.named_entities(tagged, False, batch=batch)
+            self.assertEqual(named[2], [])
+            self.assertEqual(named[3][0][0].label(), "PERSON")
+
+
+if __name__ == "__main__":
+    unittest.main()
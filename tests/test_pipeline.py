@@ -0,0 +1,105 @@
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import multiprocessing
+import unittest
+
+import simple_nlp
+from simple_nlp import Pipeline, process_corpus
+
+from tests import fake_nltk
+
+needs_fork = unittest.skipUnless(
+    multiprocessing.get_start_method() == "fork",
+    "worker processes only see the fake nltk models when forked")
+
+
+class PipelineNamedEntityTest(unittest.TestCase):
+    def setUp(self):
+        fake_nltk.install()
+        self.documents = [fake_nltk.TEXT, "Alice met Bob.\nThey talked."] * 3
+        self.expected = [
+            simple_nlp.chunk(simple_nlp.pos_tag(
+                simple_nlp.tokenize(document, levels_out=3)), ne=True)
+            for document in self.documents]
+
+    def tearDown(self):
+        fake_nltk.uninstall()
+
+    def test_named_entities_returns_lists(self):
+        for paragraph in self.expected[0]:
+            self.assertIsInstance(paragraph, list)
+        tagged = simple_nlp.pos_tag(simple_nlp.tokenize(fake_nltk.TEXT, 2))
+        self.assertIsInstance(simple_nlp.named_entities(tagged, False), list)
+
+    def test_process_is_repeatable(self):
+        pipe = Pipeline(ne=True)
+        result = pipe.process(self.documents[0])
+        self.assertEqual(result, self.expected[0])
+        # The result must not be a one-shot iterator
+        self.assertEqual(result, self.expected[0])
+
+    def test_process_corpus_serial(self):
+        results = list(process_corpus(self.documents, ne=True, workers=1))
+        self.assertEqual(results, self.expected)
+
+    @needs_fork
+    def test_process_corpus_workers(self):
+        results = list(process_corpus(self.documents, ne=True, workers=2,
+                                      chunksize=1))
+        self.assertEqual(results, self.expected)
+
+    @needs_fork
+    def test_process_corpus_workers_unordered(self):
+        results = process_corpus(self.documents, ne=True, binary=True,
+                                 workers=2, chunksize=1, ordered=False)
+        expected = [simple_nlp.chunk(simple_nlp.pos_tag(
+                        simple_nlp.tokenize(document, levels_out=3)),
+                        ne=True, binary=True)
+                    for document in self.documents]
+        self.assertEqual(sorted(results), list(enumerate(expected)))
+
+
+class ProcessCorpusBackpressureTest(unittest.TestCase):
+    def setUp(self):
+        fake_nltk.install()
+        self.pulled = 0
+
+    def tearDown(self):
+        fake_nltk.uninstall()
+
+    def documents(self, n):
+        for i in range(n):
+            self.pulled += 1
+            yield "Document number {0}. It is short.".format(i)
+
+    @needs_fork
+    def test_input_is_read_in_a_bounded_window(self):
+        results = process_corpus(self.documents(2000), stages=["tokenize"],
+                                 workers=2, chunksize=4, max_pending=16)
+        next(results)
+        self.assertLessEqual(self.pulled, 16)
+        self.assertEqual(len(list(results)), 1999)
+        self.assertEqual(self.pulled, 2000)
+
+    @needs_fork
+    def test_unordered_input_is_read_in_a_bounded_window(self):
+        results = process_corpus(self.documents(500), stages=["tokenize"],
+                                 workers=2, chunksize=4, ordered=False)
+        next(results)
+        self.assertLessEqual(self.pulled, 2 * 2 * 4)
+        indices = sorted(i for i, result in results)
+        self.assertEqual(len(indices), 499)
+
+    @needs_fork
+    def test_stopping_early_does_not_hang(self):
+        results = process_corpus(self.documents(2000), stages=["tokenize"],
+                                 workers=2, chunksize=4)
+        next(results)
+        results.close()
+        self.assertLess(self.pulled, 2000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import time
+import unittest
+
+import simple_nlp
+from simple_nlp import Profiler, profiling
+
+from tests import fake_nltk
+
+
+def _slow_items(n, delay):
+    for i in range(n):
+        time.sleep(delay)
+        yield i
+
+
+class TimedGeneratorTest(unittest.TestCase):
+    def test_generator_time_is_recorded_when_consumed(self):
+        with Profiler() as profiler:
+            func = profiling.timed("slow", _slow_items,
+                                   profiling.count_nothing)
+            items = func(5, 0.01)
+            self.assertNotIn("slow", profiler.stats()["stages"])
+            self.assertEqual(list(items), list(range(5)))
+        stats = profiler.stats()["stages"]["slow"]
+        self.assertEqual(stats["calls"], 1)
+        self.assertGreaterEqual(stats["seconds"], 0.04)
+
+
+class NamedEntityStageTest(unittest.TestCase):
+    def setUp(self):
+        fake_nltk.install()
+        self.parse = fake_nltk.NEChunker.parse
+
+        def slow_parse(chunker, tagged_sentence):
+            time.sleep(0.01)
+            return self.parse(chunker, tagged_sentence)
+        fake_nltk.NEChunker.parse = slow_parse
+
+    def tearDown(self):
+        fake_nltk.NEChunker.parse = self.parse
+        fake_nltk.uninstall()
+
+    def test_ne_chunk_stage_includes_chunking_time(self):
+        tagged = simple_nlp.pos_tag(simple_nlp.tokenize(fake_nltk.TEXT, 3))
+        n_sentences = sum(len(paragraph) for paragraph in tagged)
+        with Profiler() as profiler:
+            simple_nlp.chunk(tagged, ne=True)
+        stats = profiler.stats()["stages"]["ne_chunk"]
+        self.assertGreaterEqual(stats["seconds"], 0.01 * n_sentences * 0.9)
+
+
+if __name__ == "__main__":
+    unittest.main()
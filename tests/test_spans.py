@@ -0,0 +1,157 @@
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import nltk
+
+import simple_nlp
+from simple_nlp import SpanToken, process_corpus
+
+from tests import fake_nltk
+from tests.test_pipeline import needs_fork
+
+# Quotes, contractions, repeated sentences, non-ASCII text, runs of spaces,
+# tabs, blank lines and a line of whitespace
+TEXT = ("Joe Blogs gave us tickets.  He didn't go!\n"
+        "\n"
+        "\"Can't we go home?\" asked Zoë (or was it Ana?).\tNobody said.\n"
+        "   \n"
+        "Joe Blogs gave us tickets. Joe Blogs gave us tickets.")
+
+
+def _tokens(x):
+    """ All of the tokens in a nested list, or in the leaves of trees """
+    if isinstance(x, nltk.Tree):
+        return [word for word, tag in x.leaves()]
+    if isinstance(x, tuple):
+        return [x[0]]
+    if isinstance(x, list):
+        return [token for item in x for token in _tokens(item)]
+    return [x]
+
+
+class SpanTestCase(unittest.TestCase):
+    def setUp(self):
+        fake_nltk.install(real_tokenizers=True)
+
+    def tearDown(self):
+        fake_nltk.uninstall()
+
+    def assertSpans(self, x, text=TEXT):
+        tokens = _tokens(x)
+        self.assertTrue(len(tokens) > 0)
+        previous_end = 0
+        for token in tokens:
+            self.assertIsInstance(token, SpanToken)
+            if token in ("``", "''"):
+                # nltk turns " into `` or '', but the offsets point to the "
+                self.assertEqual(text[token.start:token.end], '"')
+            else:
+                self.assertEqual(text[token.start:token.end], token)
+            self.assertGreaterEqual(token.start, previous_end)
+            previous_end = token.end
+
+
+class TokenizeSpansTest(SpanTestCase):
+    def test_eager(self):
+        for engine in simple_nlp.TOKENIZER_ENGINES:
+            for levels in (1, 2, 3):
+                spanned = simple_nlp.tokenize(TEXT, levels, engine=engine,
+                                              spans=True)
+                self.assertSpans(spanned)
+                # The tokens themselves are unchanged
+                self.assertEqual(spanned, simple_nlp.tokenize(TEXT, levels,
+                                                              engine=engine))
+                self.assertIn("``", spanned if levels == 1 else
+                              _tokens(spanned))
+
+    def test_lazy(self):
+        for engine in simple_nlp.TOKENIZER_ENGINES:
+            for levels in (2, 3):
+                expected = simple_nlp.tokenize(TEXT, levels, engine=engine,
+                                               spans=True)
+                for lines in (TEXT, io.StringIO(TEXT)):
+                    spanned = list(simple_nlp.tokenize(
+                        lines, levels, lazy=True, engine=engine, spans=True))
+                    self.assertSpans(spanned)
+                    self.assertEqual(spanned, expected)
+                    self.assertEqual([(t.start, t.end)
+                                      for t in _tokens(spanned)],
+                                     [(t.start, t.end)
+                                      for t in _tokens(expected)])
+
+    def test_repeated_sentences_get_their_own_offsets(self):
+        sentences = simple_nlp.tokenize(TEXT, 2, spans=True)
+        starts = [sentence[0].start for sentence in sentences
+                  if sentence[:2] == ["Joe", "Blogs"]]
+        self.assertEqual(starts, [0, TEXT.rindex("Joe Blogs gave us tickets. "
+                                                 "Joe"), TEXT.rindex("Joe")])
+
+
+class DownstreamSpansTest(SpanTestCase):
+    def setUp(self):
+        SpanTestCase.setUp(self)
+        self.directory = None
+
+    def tearDown(self):
+        simple_nlp.disable_result_cache()
+        if self.directory is not None:
+            shutil.rmtree(self.directory)
+        SpanTestCase.tearDown(self)
+
+    def check_stages(self):
+        for levels in (1, 2, 3):
+            tokens = simple_nlp.tokenize(TEXT, levels, spans=True)
+            for batch in (False, True):
+                tagged = simple_nlp.pos_tag(tokens, batch=batch)
+                self.assertSpans(tagged)
+                self.assertSpans(simple_nlp.chunk(tagged))
+                self.assertSpans(simple_nlp.named_entities(tagged, False,
+                                                           batch=batch))
+        stream = simple_nlp.pos_tag(simple_nlp.tokenize(TEXT, 3, lazy=True,
+                                                        spans=True))
+        self.assertSpans(list(simple_nlp.chunk(stream, ne=True)))
+
+    def test_pos_tag_chunk_and_named_entities(self):
+        self.check_stages()
+
+    def test_result_cache(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, "cache.sqlite")
+        simple_nlp.enable_result_cache(path=path)
+        # The repeated sentences are served from the cache, but still get
+        # their own offsets
+        self.check_stages()
+        self.assertGreater(simple_nlp.result_cache_info().hits, 0)
+        # And from the disk cache
+        simple_nlp.enable_result_cache(path=path)
+        self.check_stages()
+        self.assertGreater(simple_nlp.result_cache_info().disk_hits, 0)
+
+    def test_pickle(self):
+        tagged = simple_nlp.pos_tag(simple_nlp.tokenize(TEXT, 3, spans=True))
+        for x in (tagged, simple_nlp.chunk(tagged),
+                  simple_nlp.chunk(tagged, ne=True)):
+            copy = pickle.loads(pickle.dumps(x, pickle.HIGHEST_PROTOCOL))
+            self.assertEqual(copy, x)
+            self.assertSpans(copy)
+            self.assertEqual([(t.start, t.end) for t in _tokens(copy)],
+                             [(t.start, t.end) for t in _tokens(x)])
+
+    @needs_fork
+    def test_process_corpus_workers(self):
+        results = list(process_corpus([TEXT] * 4, ne=True, spans=True,
+                                      workers=2, chunksize=1))
+        for result in results:
+            self.assertSpans(result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import subprocess
+import sys
+import unittest
+
+import simple_nlp
+from simple_nlp import TagStatistics, stats
+
+from tests import fake_nltk
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class LazyImportTest(unittest.TestCase):
+    def test_import_does_not_load_numpy(self):
+        code = "import sys, simple_nlp; print('numpy' in sys.modules)"
+        output = subprocess.check_output([sys.executable, "-c", code])
+        self.assertEqual(output.strip(), b"False")
+
+
+class TagStatisticsTest(unittest.TestCase):
+    def setUp(self):
+        fake_nltk.install()
+        self.tagged = simple_nlp.pos_tag(simple_nlp.tokenize(fake_nltk.TEXT,
+                                                             levels_out=3))
+        stats._load_numpy()
+        self.numpy = stats.numpy
+
+    def tearDown(self):
+        stats.numpy = self.numpy
+        fake_nltk.uninstall()
+
+    def counts(self):
+        tag_stats = TagStatistics()
+        tag_stats.add(self.tagged)
+        # A tagged CompactDocument goes through the integer coded path
+        tag_stats.add(simple_nlp.pos_tag(simple_nlp.tokenize(
+            fake_nltk.TEXT, levels_out=3, compact=True)))
+        matrix, tags = tag_stats.bigram_matrix()
+        return (dict(tag_stats.tag_frequencies()),
+                dict(tag_stats.bigram_frequencies()),
+                [list(row) for row in matrix], tags)
+
+    def test_counts(self):
+        unigrams, bigrams, matrix, tags = self.counts()
+        self.assertEqual(unigrams, {"NNP": 14, "NN": 48, "JJ": 2})
+        self.assertEqual(tags, ["JJ", "NN", "NNP"])
+        self.assertEqual(bigrams[("NNP", "NNP")], 2)     # Joe Blogs, twice
+        # No bigrams across the 4 sentence breaks of each copy of the text
+        self.assertEqual(sum(bigrams.values()), 64 - 2 * 4)
+
+    @unittest.skipIf(numpy is None, "needs numpy")
+    def test_same_counts_without_numpy(self):
+        expected = self.counts()
+        stats.numpy = None
+        self.assertEqual(self.counts(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+from __future__ import print_function
+
+__author__ = 'ronny'
+
+import unittest
+
+import nltk
+
+import simple_nlp
+
+from tests import fake_nltk
+
+
+class LazyStreamTest(unittest.TestCase):
+    def setUp(self):
+        fake_nltk.install()
+        self.text = "One paragraph. Two sentences.\n   \nAnother paragraph."
+        self.tagged = simple_nlp.pos_tag(simple_nlp.tokenize(self.text, 3))
+
+    def tearDown(self):
+        fake_nltk.uninstall()
+
+    def stream(self):
+        return simple_nlp.pos_tag(simple_nlp.tokenize(self.text, levels_out=3,
+                                                      lazy=True))
+
+    def test_whitespace_line_gives_empty_paragraph(self):
+        self.assertEqual(self.tagged[1], [])
+        self.assertEqual(list(self.stream()), self.tagged)
+
+    def test_downstream_stages_accept_empty_paragraphs(self):
+        self.assertEqual(list(simple_nlp.chunk(self.stream())),
+                         simple_nlp.chunk(self.tagged))
+        self.assertEqual(list(simple_nlp.chunk(self.stream(), ne=True)),
+                         simple_nlp.chunk(self.tagged, ne=True))
+        self.assertEqual(list(simple_nlp.named_entities(self.stream(), False,
+                                                        batch=True)),
+                         simple_nlp.named_entities(self.tagged, False))
+        self.assertEqual(list(simple_nlp.extract_chunks(self.stream()))[1], [])
+
+
+def _baseline_tokenize(text, levels_out=1):
+    """ tokenize() as it was before the tokenizer engines were added """
+    if (levels_out == 1):
+        return(nltk.word_tokenize(text))
+    if (levels_out == 2):
+        sentences = nltk.sent_tokenize(text)
+        return([nltk.word_tokenize(sentence) for sentence in sentences])
+    if (levels_out == 3):
+        paragraphs = text.split("\n")
+        paragraphs = [item for item in paragraphs if item != ""]
+        tokenized = []
+        for paragraph in paragraphs:
+            sentences = nltk.sent_tokenize(paragraph)
+            tokenized.append([nltk.word_tokenize(sentence)
+                              for sentence in sentences])
+        return(tokenized)
+
+
+class TokenizerEngineRegressionTest(unittest.TestCase):
+    """
+    Checks that both tokenizer engines give the same tokens as the original
+    implementation of tokenize(), on a fixed text. This uses nltk's real
+    punkt and treebank tokenizers. If the trained punkt model is not
+    installed, an untrained punkt tokenizer is used in its place.
+    """
+    TEXT = ("Mr. Smith paid $3.50 for a 1.5kg bag of flour at 9 a.m. on a "
+            "Monday. He didn't think it was worth it... but Mrs. O'Neil said "
+            "it's the best in town.\n"
+            "\n"
+            "\"Can't we just go home?\" asked the child (or was it her "
+            "brother?). Nobody answered! The e-mail from info@example.com "
+            "pointed to https://www.example.com/faq?id=12, which was 404'd.\n"
+            "Prices rose 12.5% vs. last year -- a record.\n"
+            "   \n"
+            "'Quoted,' she said. \"Nested 'quotes' too,\" he replied.")
+
+    def setUp(self):
+        fake_nltk.install(real_tokenizers=True)
+
+    def tearDown(self):
+        fake_nltk.uninstall()
+
+    def test_engines_match_original_tokenize(self):
+        # The real treebank tokenizer splits contractions
+        self.assertIn("n't", _baseline_tokenize(self.TEXT))
+        for levels in (1, 2, 3):
+            expected = _baseline_tokenize(self.TEXT, levels_out=levels)
+            for engine in simple_nlp.TOKENIZER_ENGINES:
+                self.assertEqual(simple_nlp.tokenize(self.TEXT, levels,
+                                                     engine=engine),
+                                 expected, (levels, engine))
+
+    def test_lazy_and_compact_match_original_tokenize(self):
+        expected = _baseline_tokenize(self.TEXT, levels_out=3)
+        for engine in simple_nlp.TOKENIZER_ENGINES:
+            lazy = simple_nlp.tokenize(self.TEXT, 3, lazy=True, engine=engine)
+            self.assertEqual(list(lazy), expected)
+            compact = simple_nlp.tokenize(self.TEXT, 3, compact=True,
+                                          engine=engine)
+            self.assertEqual(compact.tolist(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()